@@ -0,0 +1,6 @@
+"""Fulkerson's Tactical Air Game (1957). See airForce.py, airGame.py for the
+batched strategy search, and campaignSolver.py for the optimal campaign policies."""
+
+from .airForce import AirCampaign, AirForce
+from .airGame import campaign_grid, saddle_point, solve_game, strategy_schedules
+from .campaignSolver import CampaignSolver
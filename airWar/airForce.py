@@ -51,13 +51,15 @@ class AirCampaign:
     duration -- the number of phases to simulate.
     payoffRate -- the modifier applied to CAS missions for scoring. For instance,
                   '0.5' would mean CAS is half as effective. Defaults to 1.
+    verbose -- whether the score is printed every turn. Defaults to True.
     """
     
-    def __init__(self, blue, red, duration, payoffRate = 1):
+    def __init__(self, blue, red, duration, payoffRate = 1, verbose = True):
         self.blue = blue
         self.red = red
         self.duration = duration + 1
         self.payoffRate = payoffRate
+        self.verbose = verbose
         self.turn = 0
         self.score = 0
         
@@ -77,11 +79,13 @@ class AirCampaign:
         self.blue.reinforce()
         self.red.reinforce()
         
-        print(self)
+        if self.verbose:
+            print(self)
         
     def resolve(self):
         """ Resolve the simulation to its conclusion."""
-        print("CAMPAIGN: {} vs. {}\n".format(self.blue.name, self.red.name))
+        if self.verbose:
+            print("CAMPAIGN: {} vs. {}\n".format(self.blue.name, self.red.name))
         for i in range(self.duration):
             self.advance()
             
@@ -92,10 +96,11 @@ class AirCampaign:
         
 
        
-# TEST ENGAGEMENT #
+if __name__ == "__main__":
+    # TEST ENGAGEMENT #
 
-blue = AirForce('Blue', 120, 0.2, 0, 2)
-red = AirForce('Red', 120, 0.2, 0.3, 2)
+    blue = AirForce('Blue', 120, 0.2, 0, 2)
+    red = AirForce('Red', 120, 0.2, 0.3, 2)
 
-campaign = AirCampaign(blue, red, 30)
-campaign.resolve()
\ No newline at end of file
+    campaign = AirCampaign(blue, red, 30)
+    campaign.resolve()
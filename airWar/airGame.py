@@ -0,0 +1,175 @@
+''' Batched strategy evaluation and solution of Fulkerson's 1957 Tactical Air Game.
+
+    Each side's strategies are CAS ratios, either one ratio for the whole
+    campaign or a schedule with one ratio per turn. Every pairing of a blue
+    strategy with a red strategy is played out at once, with the same rules as
+    AirCampaign.resolve(), over NumPy arrays of plane counts. The final scores
+    form the payoff matrix of a zero-sum game (blue maximises), which is solved
+    for a saddle point or, failing that, for the optimal mixed strategies.
+'''
+
+import numpy as np
+
+
+def strategy_schedules(strategies, turns):
+    """ Returns the strategies as a 2D array of CAS ratios, one row per strategy
+    and one column per turn.
+
+    Arguments:
+    strategies -- a 1D array of constant CAS ratios, or a 2D array of per-turn
+                  schedules (one row per strategy, one column per turn).
+    turns -- the number of turns of the campaign.
+    """
+    strategies = np.asarray(strategies, dtype=float)
+    if strategies.ndim == 1:
+        return np.repeat(strategies[:, None], turns, axis=1)
+    if strategies.ndim != 2 or strategies.shape[1] != turns:
+        raise ValueError("Schedules need one CAS ratio per turn ({} turns)".format(turns))
+    return strategies
+
+def campaign_grid(blue, red, duration, blueStrategies, redStrategies, payoffRate = 1):
+    """ Returns the payoff matrix of every blue strategy against every red
+    strategy: the final score of each campaign, with blue strategies along the
+    rows and red strategies along the columns.
+
+    Arguments:
+    blue -- the blue side (an object of class AirForce). Its CASratio is ignored.
+    red -- the red side (an object of class AirForce). Its CASratio is ignored.
+    duration -- the duration of the campaign, as in AirCampaign (duration + 1
+                turns are played).
+    blueStrategies -- blue's strategies (see strategy_schedules).
+    redStrategies -- red's strategies (see strategy_schedules).
+    payoffRate -- the modifier applied to CAS missions for scoring.
+    """
+    turns = duration + 1
+    blueRatios = strategy_schedules(blueStrategies, turns)[:, None, :]
+    redRatios = strategy_schedules(redStrategies, turns)[None, :, :]
+    shape = (blueRatios.shape[0], redRatios.shape[1])
+    bluePlanes = np.full(shape, blue.planes, dtype=float)
+    redPlanes = np.full(shape, red.planes, dtype=float)
+    score = np.zeros(shape)
+
+    for turn in range(turns):
+        blueCAS = blueRatios[:, :, turn]
+        redCAS = redRatios[:, :, turn]
+        # int() truncation of the plane counts, and round() half to even, as in AirForce
+        score += np.trunc(bluePlanes * blueCAS) * payoffRate - np.trunc(redPlanes * redCAS) * payoffRate
+        blueCasualties = np.rint(np.trunc(redPlanes * (1 - redCAS)) * red.killRate)
+        redCasualties = np.rint(np.trunc(bluePlanes * (1 - blueCAS)) * blue.killRate)
+        bluePlanes = np.maximum(bluePlanes - blueCasualties, 0) + blue.reinforcements
+        redPlanes = np.maximum(redPlanes - redCasualties, 0) + red.reinforcements
+
+    return score
+
+def saddle_point(payoff):
+    """ Returns the (row, column, value) of a saddle point of the payoff matrix
+    in pure strategies, or None if there is none.
+
+    Arguments:
+    payoff -- the payoff matrix, for the row player (who maximises).
+    """
+    payoff = np.asarray(payoff, dtype=float)
+    rowMinima = payoff.min(axis=1)
+    columnMaxima = payoff.max(axis=0)
+    row = int(np.argmax(rowMinima))
+    column = int(np.argmin(columnMaxima))
+    if rowMinima[row] == columnMaxima[column]:
+        return row, column, float(payoff[row, column])
+    return None
+
+def simplex(tableau, basis, maxPivots = 10000):
+    """ Maximises a linear program in place, given its tableau in canonical form:
+    constraint rows first, then the objective row holding the negated objective
+    coefficients. The right-hand sides are in the last column. Bland's rule
+    is used to pick the pivots, so the method cannot cycle.
+
+    Arguments:
+    tableau -- the simplex tableau (a 2D float array), modified in place.
+    basis -- the index of the basic variable of each constraint row, modified
+             in place.
+    maxPivots -- the limit on the number of pivots.
+    """
+    rows = tableau.shape[0] - 1
+    for _ in range(maxPivots):
+        entering = np.flatnonzero(tableau[-1, :-1] < -1e-12)
+        if entering.size == 0:
+            return tableau
+        column = entering[0]
+        positive = tableau[:rows, column] > 1e-12
+        if not positive.any():
+            raise ValueError("The linear program is unbounded")
+        ratios = np.full(rows, np.inf)
+        ratios[positive] = tableau[:rows, -1][positive] / tableau[:rows, column][positive]
+        # Ties in the ratio test go to the lowest basic variable (Bland's rule)
+        ties = np.flatnonzero(ratios <= ratios.min() + 1e-12)
+        row = ties[np.argmin(basis[ties])]
+        tableau[row] /= tableau[row, column]
+        pivotColumn = tableau[:, column].copy()
+        pivotColumn[row] = 0
+        tableau -= np.outer(pivotColumn, tableau[row])
+        basis[row] = column
+    raise ValueError("The simplex method did not converge in {} pivots".format(maxPivots))
+
+def solve_game(payoff):
+    """ Solves a zero-sum matrix game. Returns the optimal mixed strategies of
+    the row player (who maximises) and of the column player, and the value of
+    the game. A saddle point, if there is one, is returned as pure strategies.
+
+    Arguments:
+    payoff -- the payoff matrix, for the row player.
+    """
+    payoff = np.asarray(payoff, dtype=float)
+    rows, columns = payoff.shape
+    saddle = saddle_point(payoff)
+    if saddle is not None:
+        row, column, value = saddle
+        rowStrategy = np.zeros(rows)
+        columnStrategy = np.zeros(columns)
+        rowStrategy[row] = 1
+        columnStrategy[column] = 1
+        return rowStrategy, columnStrategy, value
+
+    # Shift the payoffs so that the value of the game is positive. The column
+    # player's problem is then: maximise sum(y) subject to payoff * y <= 1,
+    # y >= 0, with value 1 / sum(y). The row player's strategy is the dual
+    # solution, read from the objective row under the slack variables.
+    shift = 1 - payoff.min()
+    tableau = np.zeros((rows + 1, columns + rows + 1))
+    tableau[:rows, :columns] = payoff + shift
+    tableau[:rows, columns:columns + rows] = np.eye(rows)
+    tableau[:rows, -1] = 1
+    tableau[-1, :columns] = -1
+    basis = np.arange(columns, columns + rows)
+    simplex(tableau, basis)
+
+    total = tableau[-1, -1]
+    columnStrategy = np.zeros(columns)
+    solved = basis < columns
+    columnStrategy[basis[solved]] = tableau[:rows, -1][solved]
+    rowStrategy = np.maximum(tableau[-1, columns:columns + rows], 0)
+    return rowStrategy / rowStrategy.sum(), columnStrategy / columnStrategy.sum(), 1 / total - shift
+
+
+if __name__ == "__main__":
+    from airForce import AirForce
+
+    # The test engagement of airForce.py, over a grid of constant CAS ratios
+    blue = AirForce('Blue', 120, 0.2, 0, 2)
+    red = AirForce('Red', 120, 0.2, 0, 2)
+    ratios = np.linspace(0, 1, 101)
+
+    payoff = campaign_grid(blue, red, 30, ratios, ratios)
+    blueStrategy, redStrategy, value = solve_game(payoff)
+    print("Value of the game: {}".format(round(value, 2)))
+    for name, strategy in (('Blue', blueStrategy), ('Red', redStrategy)):
+        support = np.flatnonzero(strategy > 1e-9)
+        print("{} CAS ratios: {}".format(name, ", ".join("{} ({}%)".format(round(ratios[i], 2), round(strategy[i] * 100, 1))
+                                                         for i in support)))
+
+    # Per-turn schedules: airfield attack only until a switching turn, then CAS only
+    turns = 31
+    schedules = (np.arange(turns)[None, :] >= np.arange(turns + 1)[:, None]).astype(float)
+    payoff = campaign_grid(blue, red, 30, schedules, schedules)
+    blueStrategy, redStrategy, value = solve_game(payoff)
+    print("Switching turns, value {}: blue {}, red {}".format(round(value, 2), np.flatnonzero(blueStrategy > 1e-9),
+                                                               np.flatnonzero(redStrategy > 1e-9)))
@@ -0,0 +1,195 @@
+''' Backward induction over the states of Fulkerson's Tactical Air Game.
+
+    Since AirForce rounds its kills and truncates its sorties to whole planes,
+    the state of a campaign at the start of a turn is a pair of integers (blue
+    planes, red planes). Each turn is a stage game in which both sides pick a
+    CAS ratio at once: the payoff is the score of the turn plus the value of
+    the state it leads to, with one turn fewer to go. Solving the stage games
+    backwards from the last turn gives the value and the optimal (possibly
+    mixed) CAS policy of every state, for every number of turns remaining.
+
+    States are held in NumPy tables, filled a whole turn at a time, when the
+    plane counts reachable in the campaign fit within maxTableSize entries.
+    The tables cover starting forces of up to maxPlanes planes, so what-if
+    queries near the starting state are lookups. Other states are solved on
+    demand, down to the first states found in the tables, and the solved
+    states are kept in a bounded least-recently-used cache.
+'''
+
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    from .airGame import solve_game
+except ImportError:
+    from airGame import solve_game
+
+
+class CampaignSolver:
+    """ The optimal CAS policies of a campaign between two air forces.
+
+    Arguments:
+    blue -- the blue side (an object of class AirForce). Its CASratio is ignored.
+    red -- the red side (an object of class AirForce), likewise.
+    duration -- the duration of the campaign, as in AirCampaign (duration + 1
+                turns are played).
+    ratios -- the CAS ratios open to both sides each turn. Defaults to 0, 0.1 ... 1.
+    payoffRate -- the modifier applied to CAS missions for scoring.
+    maxPlanes -- the largest starting force of either side covered by the tables.
+                 Defaults to a quarter more than each side's planes.
+    maxTableSize -- the largest number of table entries (turns times blue
+                    plane counts times red plane counts) to solve in full.
+    cacheSize -- the number of states kept when solving on demand.
+    """
+
+    def __init__(self, blue, red, duration, ratios = None, payoffRate = 1, maxPlanes = None,
+                 maxTableSize = 20000000, cacheSize = 1000000):
+        self.blue = blue
+        self.red = red
+        self.turns = duration + 1
+        self.ratios = np.linspace(0, 1, 11) if ratios is None else np.asarray(ratios, dtype=float)
+        self.payoffRate = payoffRate
+        self.cacheSize = cacheSize
+        self.cache = OrderedDict()
+        # The most planes each side can have at the start of any turn, from a
+        # starting force of up to maxPlanes
+        blueStart = max(blue.planes, int(np.ceil(1.25 * blue.planes)) if maxPlanes is None else maxPlanes)
+        redStart = max(red.planes, int(np.ceil(1.25 * red.planes)) if maxPlanes is None else maxPlanes)
+        self.blueMax = int(blueStart + blue.reinforcements * self.turns)
+        self.redMax = int(redStart + red.reinforcements * self.turns)
+        self.tabulated = (self.turns + 1) * (self.blueMax + 1) * (self.redMax + 1) <= maxTableSize
+        if self.tabulated:
+            self.solve_tables()
+
+    def sorties(self, planes, killRate):
+        """ Returns the CAS sorties and the enemy planes killed by an air force of
+        (planes) aircraft, for each CAS ratio, as in AirForce."""
+        planes = np.asarray(planes, dtype=float)[..., None]
+        cas = np.trunc(planes * self.ratios)
+        kills = np.rint(np.trunc(planes * (1 - self.ratios)) * killRate)
+        return cas, kills
+
+    def stage_payoffs(self, bluePlanes, redPlanes, values):
+        """ Returns the payoff matrices of the stage games at the given states (arrays
+        of blue and red planes of the same shape), with blue's CAS ratios along the
+        second last axis and red's along the last one.
+
+        Arguments:
+        values -- a function returning the values of the next states, given arrays
+                  of blue and red planes.
+        """
+        blueCAS, blueKills = self.sorties(bluePlanes, self.blue.killRate)
+        redCAS, redKills = self.sorties(redPlanes, self.red.killRate)
+        blueNext = np.maximum(bluePlanes[..., None] - redKills, 0) + self.blue.reinforcements
+        redNext = np.maximum(redPlanes[..., None] - blueKills, 0) + self.red.reinforcements
+        score = (blueCAS[..., :, None] - redCAS[..., None, :]) * self.payoffRate
+        return score + values(blueNext[..., None, :], redNext[..., :, None])
+
+    def solve_tables(self):
+        """ Solves every state of the tables, one turn at a time from the last."""
+        blueStates = np.arange(self.blueMax + 1)
+        redStates = np.arange(self.redMax + 1)
+        shape = (self.turns + 1, self.blueMax + 1, self.redMax + 1)
+        self.values = np.zeros(shape)
+        # The blue and red CAS ratio indices of pure strategy solutions, or -1
+        self.bluePolicy = np.full(shape, -1, dtype=np.int16)
+        self.redPolicy = np.full(shape, -1, dtype=np.int16)
+        self.mixed = {}
+
+        for turnsLeft in range(1, self.turns + 1):
+            # Successors beyond the tables are clipped to its edge. The states this
+            # affects are never read from the tables (see in_tables).
+            nextValues = self.values[turnsLeft - 1]
+            def values(bluePlanes, redPlanes):
+                return nextValues[np.minimum(bluePlanes, self.blueMax).astype(int),
+                                  np.minimum(redPlanes, self.redMax).astype(int)]
+            # A few blue plane counts at a time, to bound the memory used
+            step = max(1, 4000000 // ((self.redMax + 1) * len(self.ratios) ** 2))
+            for start in range(0, self.blueMax + 1, step):
+                bluePlanes, redPlanes = np.meshgrid(blueStates[start:start + step], redStates, indexing='ij')
+                payoff = self.stage_payoffs(bluePlanes, redPlanes, values)
+                rowMinima = payoff.min(axis=-1)
+                columnMaxima = payoff.max(axis=-2)
+                maximin = rowMinima.max(axis=-1)
+                minimax = columnMaxima.min(axis=-1)
+                saddle = np.isclose(maximin, minimax, rtol=1e-12, atol=1e-9)
+                rows = slice(start, start + step)
+                self.values[turnsLeft, rows] = maximin
+                self.bluePolicy[turnsLeft, rows] = np.where(saddle, rowMinima.argmax(axis=-1), -1)
+                self.redPolicy[turnsLeft, rows] = np.where(saddle, columnMaxima.argmin(axis=-1), -1)
+                for b, r in zip(*np.nonzero(~saddle)):
+                    blueStrategy, redStrategy, value = solve_game(payoff[b, r])
+                    self.values[turnsLeft, start + b, r] = value
+                    self.mixed[(turnsLeft, start + b, r)] = (blueStrategy, redStrategy)
+
+    def solve_state(self, bluePlanes, redPlanes, turnsLeft):
+        """ Solves the stage game of a single state, solving the states it leads to
+        first unless they are in the tables, and returns (value, blue strategy, red
+        strategy). Used for states beyond the tables."""
+        key = (turnsLeft, bluePlanes, redPlanes)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        if turnsLeft == 0:
+            return 0.0, None, None
+
+        def values(blueNext, redNext):
+            blueNext, redNext = np.broadcast_arrays(blueNext, redNext)
+            result = np.empty(blueNext.shape)
+            for index in np.ndindex(blueNext.shape):
+                result[index] = self.value(blueNext[index], redNext[index], turnsLeft - 1)
+            return result
+
+        payoff = self.stage_payoffs(np.array(bluePlanes), np.array(redPlanes), values)
+        blueStrategy, redStrategy, value = solve_game(payoff)
+        self.cache[key] = (value, blueStrategy, redStrategy)
+        if len(self.cache) > self.cacheSize:
+            self.cache.popitem(last=False)
+        return self.cache[key]
+
+    def in_tables(self, bluePlanes, redPlanes, turnsLeft):
+        """ Returns True if a state was solved exactly in the tables: none of the states
+        it can lead to, with (turnsLeft) rounds of reinforcements, is beyond their edge."""
+        return (self.tabulated and 0 <= turnsLeft <= self.turns and 0 <= bluePlanes and 0 <= redPlanes
+                and bluePlanes + self.blue.reinforcements * turnsLeft <= self.blueMax
+                and redPlanes + self.red.reinforcements * turnsLeft <= self.redMax)
+
+    def value(self, bluePlanes, redPlanes, turnsLeft = None):
+        """ Returns the value of the game (the final score under optimal play) from a
+        state with (turnsLeft) turns to go, the whole campaign by default."""
+        turnsLeft = self.turns if turnsLeft is None else turnsLeft
+        bluePlanes, redPlanes = int(bluePlanes), int(redPlanes)
+        if self.in_tables(bluePlanes, redPlanes, turnsLeft):
+            return float(self.values[turnsLeft, bluePlanes, redPlanes])
+        return self.solve_state(bluePlanes, redPlanes, turnsLeft)[0]
+
+    def policy(self, bluePlanes, redPlanes, turnsLeft = None):
+        """ Returns the optimal strategies of blue and red from a state with (turnsLeft)
+        turns to go: the probability of playing each CAS ratio."""
+        turnsLeft = self.turns if turnsLeft is None else turnsLeft
+        bluePlanes, redPlanes = int(bluePlanes), int(redPlanes)
+        if not self.in_tables(bluePlanes, redPlanes, turnsLeft):
+            return self.solve_state(bluePlanes, redPlanes, turnsLeft)[1:]
+        key = (turnsLeft, bluePlanes, redPlanes)
+        if key in self.mixed:
+            return self.mixed[key]
+        blueStrategy = np.zeros(len(self.ratios))
+        redStrategy = np.zeros(len(self.ratios))
+        blueStrategy[self.bluePolicy[key]] = 1
+        redStrategy[self.redPolicy[key]] = 1
+        return blueStrategy, redStrategy
+
+
+if __name__ == "__main__":
+    from airForce import AirForce
+
+    # The test engagement of airForce.py
+    blue = AirForce('Blue', 120, 0.2, 0, 2)
+    red = AirForce('Red', 100, 0.25, 0, 2)
+    solver = CampaignSolver(blue, red, 30)
+    print("Value of the campaign: {}".format(round(solver.value(120, 100), 2)))
+    for turnsLeft in (31, 20, 10, 5, 1):
+        blueStrategy, redStrategy = solver.policy(120, 100, turnsLeft)
+        print("{} turns left: blue CAS {}, red CAS {}".format(turnsLeft, solver.ratios[blueStrategy.argmax()],
+                                                             solver.ratios[redStrategy.argmax()]))
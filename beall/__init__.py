@@ -0,0 +1,4 @@
+"""Thomas Reagan Beall's naval combat model (1990). See beall.py."""
+
+from .beall import (ArrayRecorder, Battle, ConsoleRecorder, Group, NullRecorder, Side, StreamRecorder,
+                    monte_carlo)
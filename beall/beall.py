@@ -8,22 +8,65 @@
 # Data – Naval Postgraduate School (1990).
 # ===============================================
 
+import bisect
+import csv
+import heapq
+import json
+
+import numpy as np
+
 class Group:
     """ A group of ships.
     Parameters:
     - name (string) - the name of the group, for output labelling purposes.
     - continuousFire (float) - the continuous fire value of the group, in TPBE
-    - staying (float) – the staying power of the group.
-    Additional attribute:
+    - staying (float) – the staying power of the group.
+    Additional attributes:
     - pulse (list) - a list of pulse weapons (torpedoes, bombs) added by the
     "add_pulse_weapon()" method.
+    - salvo (float) - the theoretical pulse fire of the group (full salvos from all
+    platforms), updated whenever a weapon is added.
+    - side (Side object) - the side the group belongs to, if any.
+    
+    The staying power of the group (current, previous and original) is not held by the
+    group itself but in the arrays of its side, of which the group is a view. Until it is
+    added to a side, a group holds arrays of its own.
     """
     
     def __init__(self, name, continuousFire, staying):
         self.name = name
         self.continuousFire = continuousFire
-        self.originalStaying = self.previousStaying = self.staying = staying
         self.pulse = [] # An empty list, to store pulse weapons later.
+        self.salvo = 0
+        # Single-group arrays, replaced by those of the side when the group is added to one
+        self.side = None
+        self.index = 0
+        self.groupStaying = np.array([staying], dtype=float)
+        self.groupPrevious = self.groupStaying.copy()
+        self.groupOriginal = self.groupStaying.copy()
+        
+    def arrays(self):
+        """ Returns the object holding the staying power arrays of the group."""
+        return self if self.side is None else self.side
+        
+    @property
+    def staying(self):
+        return float(self.arrays().groupStaying[self.index])
+        
+    @staying.setter
+    def staying(self, staying):
+        if self.side is None:
+            self.groupStaying[0] = staying
+        else:
+            self.side.set_staying(self.index, staying)
+            
+    @property
+    def previousStaying(self):
+        return float(self.arrays().groupPrevious[self.index])
+        
+    @property
+    def originalStaying(self):
+        return float(self.arrays().groupOriginal[self.index])
         
     def add_pulse_weapon(self, power, number):
         """ Adds a pulse weapon platform to the group.
@@ -35,14 +78,19 @@ class Group:
         
         pp = (power, number)
         self.pulse.append(pp)
+        self.salvo += power * number
+        if self.side is not None:
+            self.side.build_pulse()
         
     def get_status(self):
         """ Returns the status of the group in the current minute."""
-        return self.staying / self.originalStaying
+        arrays = self.arrays()
+        return float(arrays.groupStaying[self.index] / arrays.groupOriginal[self.index])
         
     def previous_status(self):
         """ Returns the status of the group in the previous minute."""
-        return self.previousStaying / self.originalStaying
+        arrays = self.arrays()
+        return float(arrays.groupPrevious[self.index] / arrays.groupOriginal[self.index])
         
     def continuous_fire(self):
         return self.continuousFire * self.previous_status()
@@ -64,8 +112,7 @@ class Group:
         
         if type == 'all':
             # Return the total theoretical pulse power of the group
-            salvo = sum(weapon[0] * weapon[1] for weapon in self.pulse)
-            return salvo * self.previous_status()
+            return self.salvo * self.previous_status()
         else:
             # Return the total theoretical pulse power for a specific type of weapon
             if salvoSize == 'all':
@@ -85,17 +132,23 @@ class Group:
         to 1 or higher, which would result in no damage or negative damage, are ignored.
         """
         
-        if ratio < 0:
-            self.staying *= 0
-        if ratio <= 1:
-            self.staying *= ratio
+        if self.side is not None:
+            self.side.damage(ratio, self.index)
+        else:
+            if ratio < 0:
+                self.groupStaying *= 0
+            if ratio <= 1:
+                self.groupStaying *= ratio
             
     def refresh(self):
         """ Refreshes the group by advancing time one minute. The current staying power
         becomes the previous one.
         """ 
         
-        self.previousStaying = self.staying
+        if self.side is not None:
+            self.side.refresh(self.index)
+        else:
+            self.groupPrevious[:] = self.groupStaying
         
     def __str__(self):
         """ String override"""
@@ -110,11 +163,34 @@ class Side:
     Parameters:
     - name (string): the name of the side, for output labelling purposes.
     - groups (list): a list of the Group objects included in the side.
+    Other attributes:
+    - groupStaying, groupPrevious, groupOriginal (arrays): the current, previous and
+    original staying power of every group. The groups are views over these arrays.
+    - groupContinuous (array): the continuous fire value of every group.
+    - pulsePower, pulseNumber (arrays): the power and number of weapons of every pulse
+    weapon platform, one row per group and one column per weapon type (zero if a group
+    has fewer platforms). groupSalvo holds the theoretical pulse fire of every group.
+    - fireRates (array): the continuous (first row) and pulse (second row) fire of every
+    group per unit of staying power. aggregates adds a row of ones on top, so that the
+    three totals of the side are a single product once all groups are refreshed.
+    - currentStaying, currentContinuous, currentPulse (floats): the staying power,
+    continuous fire and pulse fire of the whole side, kept up to date by damage() and
+    refresh().
     """
     
     def __init__(self, name, groups):
         self.name = name
         self.groups = groups
+        self.groupStaying = np.array([group.staying for group in self.groups], dtype=float)
+        self.groupPrevious = np.array([group.previousStaying for group in self.groups], dtype=float)
+        self.groupOriginal = np.array([group.originalStaying for group in self.groups], dtype=float)
+        self.groupContinuous = np.array([group.continuousFire for group in self.groups], dtype=float)
+        self.selections = {}
+        for index, group in enumerate(self.groups):
+            group.side = self
+            group.index = index
+        self.build_pulse()
+        self.refresh()
         self.originalStaying = sum(_.staying for _ in self.groups)
         self.originalContinuous = sum(group.continuousFire for group in self.groups)
         self.originalPulse = sum(group.pulse_fire() for group in self.groups)
@@ -122,6 +198,41 @@ class Side:
         self.pulseEvents = []
         self.latestEvent = 0
         
+    def build_pulse(self):
+        """ Builds the pulse weapon matrices from the pulse weapons of the groups."""
+        types = max([len(group.pulse) for group in self.groups] + [0])
+        self.pulsePower = np.zeros((len(self.groups), types))
+        self.pulseNumber = np.zeros((len(self.groups), types))
+        for index, group in enumerate(self.groups):
+            for type, (power, number) in enumerate(group.pulse):
+                self.pulsePower[index, type] = power
+                self.pulseNumber[index, type] = number
+        self.groupSalvo = np.array([group.salvo for group in self.groups], dtype=float)
+        # Continuous and pulse fire per unit of staying power in the previous minute
+        self.fireRates = np.array([self.groupContinuous, self.groupSalvo]) / self.groupOriginal
+        self.aggregates = np.vstack((np.ones(len(self.groups)), self.fireRates))
+        self.currentPulse = float(self.fireRates[1] @ self.groupPrevious)
+        
+    def selection(self, groupSelection):
+        """ Returns an index into the group arrays for a group selection. Indices of tuple
+        selections are cached."""
+        if groupSelection == 'all':
+            return slice(None)
+        elif isinstance(groupSelection, int):
+            return groupSelection
+        elif isinstance(groupSelection, tuple):
+            return self.tuple_selection(groupSelection)[0]
+            
+    def tuple_selection(self, groupSelection):
+        """ Returns the (index, mask, continuous weights) of a tuple selection of groups: an
+        index into the group arrays, the number of times each group is selected, and the
+        continuous fire of the selected groups per unit of staying power. Cached."""
+        if groupSelection not in self.selections:
+            index = np.array(groupSelection, dtype=int)
+            mask = np.bincount(index, minlength=len(self.groups)).astype(float)
+            self.selections[groupSelection] = (index, mask, mask * self.fireRates[0])
+        return self.selections[groupSelection]
+        
     def staying_power(self, groupSelection = 'all'):
         """ Returns the staying power of the side, in the current minute.
         
@@ -134,15 +245,15 @@ class Side:
         
         if groupSelection == 'all':
         # Return the total staying power of all groups in the side
-            return sum(group.staying for group in self.groups)
+            return self.currentStaying
             
         elif isinstance(groupSelection, int):
         # Return the staying power for the specified group
-            return self.groups[groupSelection].staying
+            return float(self.groupStaying[groupSelection])
             
         elif isinstance(groupSelection, tuple):
         # Return the aggregated staying power of the selected groups only
-            return sum(self.groups[group].staying for group in groupSelection)
+            return float(self.tuple_selection(groupSelection)[1] @ self.groupStaying)
             
     def get_status(self):
         """ Returns the status (fraction) of the side."""
@@ -178,15 +289,16 @@ class Side:
         
         if groupSelection == 'all':
         # Return the total continuous fire value of all groups in the side
-            return sum(group.continuous_fire() for group in self.groups)
+            return self.currentContinuous
             
         elif isinstance(groupSelection, int):
         # Return the aggregated continuous fire value for the selected group only
-            return self.groups[groupSelection].continuous_fire()
+            status = self.groupPrevious[groupSelection] / self.groupOriginal[groupSelection]
+            return float(self.groupContinuous[groupSelection] * status)
             
         elif isinstance(groupSelection, tuple):
         # Return the aggregated continuous fire value of the selected groups only
-            return sum(self.groups[group].continuous_fire() for group in groupSelection)
+            return float(self.tuple_selection(groupSelection)[2] @ self.groupPrevious)
             
     def pulse_fire(self, groupSelection = 'all', type = 'all', size = 'all'):
         """ Returns the pulse fire value of the side.
@@ -203,7 +315,7 @@ class Side:
         
         if groupSelection == type == size == 'all':
             # Return the total maximum pulse fire of all groups and weapon types
-            return sum(group.pulse_fire() for group in self.groups)
+            return self.currentPulse
             
         elif all(isinstance(arg, int) for arg in (groupSelection, type, size)):
             # Return the pulse fire value of the specified group, weapon type, and salvo size
@@ -211,8 +323,10 @@ class Side:
             
         elif all(isinstance(arg, tuple) for arg in (groupSelection, size)) and isinstance(type, int):
             # Return the total pulse fire of weapon type [type] for selected groups and salvo sizes
-            pf = sum(self.groups[group].pulse_fire(type, size[index])for index, group in enumerate(groupSelection))
-            return pf
+            index = self.selection(groupSelection)
+            number = np.minimum(size, self.pulseNumber[index, type])
+            status = self.groupPrevious[index] / self.groupOriginal[index]
+            return float((self.pulsePower[index, type] * number * status).sum())
               
         else:
             raise ValueError('Invalid input for pulse fire')
@@ -225,18 +339,42 @@ class Side:
         If groupSelection is an int, the selected group is damaged by the given ratio.
         
         If groupSelection is a tuple, the selected groups are damaged by the given ratio.
+        
+        All values of ratio higher than 1 are ignored, and negative values wipe out the
+        selected groups. The staying power of the side is updated accordingly.
         """
         
+        if ratio > 1:
+            return
+        ratio = max(ratio, 0)
         if groupSelection == 'all':
-            for group in self.groups:
-                group.damage(ratio)
-                
+            self.groupStaying *= ratio
+            self.currentStaying = float(self.groupStaying.sum())
         elif isinstance(groupSelection, int):
-            self.groups[groupSelection].damage(ratio)
-            
+            before = float(self.groupStaying[groupSelection])
+            self.groupStaying[groupSelection] = before * ratio
+            self.currentStaying += before * ratio - before
         elif isinstance(groupSelection, tuple):
-            for target in groupSelection:
-                self.groups[target].damage(ratio)
+            # A group selected more than once is damaged once per selection
+            np.multiply.at(self.groupStaying, self.tuple_selection(groupSelection)[0], ratio)
+            self.currentStaying = float(self.groupStaying.sum())
+            
+    def set_staying(self, index, staying):
+        """ Sets the staying power of the group at the given index."""
+        self.currentStaying += staying - float(self.groupStaying[index])
+        self.groupStaying[index] = staying
+        
+    def refresh(self, groupSelection = 'all'):
+        """ Refreshes the selected groups by advancing time one minute: their current
+        staying power becomes the previous one. The fire values of the side are updated."""
+        if groupSelection == 'all':
+            self.groupPrevious[:] = self.groupStaying
+            self.currentStaying, self.currentContinuous, self.currentPulse = (self.aggregates @ self.groupStaying).tolist()
+        else:
+            index = self.selection(groupSelection)
+            self.groupPrevious[index] = self.groupStaying[index]
+            self.currentStaying = float(self.groupStaying.sum())
+            self.currentContinuous, self.currentPulse = (self.fireRates @ self.groupPrevious).tolist()
         
     def continuous_fire_event(self, firer, target, efficiency, start, duration):
         """ Add a continuous fire event to the side's event list."""
@@ -264,278 +402,693 @@ class Side:
         sideString = "{:<10s} – SP: {:<6} | CF: {:<6} | PF: {:<6}".format(self.name, sp, cf, pf)
         return sideString
         
+def group_indices(side, groupSelection):
+    """ Returns the indices of the groups in a group selection ('all', an int or a tuple)."""
+    if groupSelection == 'all':
+        return tuple(range(len(side.groups)))
+    elif isinstance(groupSelection, int):
+        return (groupSelection,)
+    else:
+        return tuple(groupSelection)
+
+def attrition_ratio(targetStaying, damage):
+    """ Returns the fraction of staying power left to a target after receiving a given
+    amount of damage."""
+    if targetStaying == 0:
+        return 0
+    return max((max((targetStaying - damage), 0)/ targetStaying), 0)
+
 class Battle:
     """ A battle between two opposing sides.
     Parameters:
     - name (string): name of the battle, for output labelling purposes.
     - sideA (Side object): the first of the opposing sides.
     - sideB (Side object): the second opposing side.
+    - recorder (recorder object): records the status of the battle as it is resolved (see
+    NullRecorder). By default nothing is recorded or printed; attach a ConsoleRecorder to
+    print the battle as Beall's original program did.
     Other attributes:
-    - Timelines for both sides continuous and pulse fire events (lists of tuples
-    specifying firer, target, time of fire, etc).
-    - Lists to hold the status of each side every minute, for plotting purposes.
+    - duration (int): the number of minutes covered by the events of both sides.
+    - schedule (list): a heap of (minute, kind, order, side, event) entries holding the
+    minutes in which something changes: a continuous fire event starts (kind 0) or stops
+    (kind 1), a pulse salvo is launched (kind 2) or lands (kind 3).
+    - activeA, activeB (lists): indices of the continuous fire events of each side taking
+    place in the current minute.
+    - aPlot, bPlot (lists): the status of each side before the battle, for plotting purposes.
+    An ArrayRecorder replaces them with the status of every recorded minute.
     - timePulse (int): the current minute of the battle. Starts at 0.
+    
+    Only the minutes in which something happens are visited one by one. Between them, the
+    continuous fire of both sides is applied in closed form (see skip_quiet()), unless the
+    recorder needs every minute.
     """
-    def __init__(self, name, sideA, sideB):
+    
+    START, STOP, LAUNCH, IMPACT = range(4)
+    
+    def __init__(self, name, sideA, sideB, recorder = None):
         self.name = name
         self.sideA = sideA
         self.sideB = sideB
-        # Timelines of A and B's continuous fire events
-        self.sideAtimeline = [[] for _ in range(max(self.sideA.latestEvent, self.sideB.latestEvent))]
-        self.sideBtimeline = [[] for _ in range(max(self.sideA.latestEvent, self.sideB.latestEvent))]
-        # Timelines of A and B's pulse fire events
-        self.sideApulseEvents = [[] for _ in range(max(self.sideA.latestEvent, self.sideB.latestEvent))]
-        self.sideBpulseEvents = [[] for _ in range(max(self.sideA.latestEvent, self.sideB.latestEvent))]
-        # Minutes in which A and B will receive pulsed fire damage
-        self.sideApulseDamage = [[] for _ in range(max(self.sideA.latestEvent, self.sideB.latestEvent))]
-        self.sideBpulseDamage = [[] for _ in range(max(self.sideA.latestEvent, self.sideB.latestEvent))]
+        self.recorder = recorder if recorder is not None else NullRecorder()
+        self.duration = max(self.sideA.latestEvent, self.sideB.latestEvent)
+        self.schedule = []
+        self.activeA = []
+        self.activeB = []
+        # Tie-breaker keeping same-minute entries in the order they were scheduled
+        self.order = 0
         # Status record for every minute of the battle
         self.aPlot = [(sideA.staying_power(), sideA.continuous_fire(), sideA.pulse_fire())]
         self.bPlot = [(sideB.staying_power(), sideB.continuous_fire(), sideB.pulse_fire())]
         # Time pulse of the battle, starting at 0
         self.timePulse = 0
         
-        # Build the timelines for the battle from the event lists of both sides 
-        
-        # Side A continuous fire events
-        if len(self.sideA.continuousEvents) > 0:
-            for event in self.sideA.continuousEvents:
-                for minute in range(event[3], event[4]):
-                    self.sideAtimeline[minute].append((event[0], event[1], event[2]))
-                    
-        # Side B continuous fire events
-        if len(self.sideB.continuousEvents) > 0:
-            for event in self.sideB.continuousEvents:
-                for i in range(event[3], event[4]):
-                    self.sideBtimeline[i].append((event[0], event[1], event[2]))
-                    
-        # Side A pulse fire events
-        if len(self.sideA.pulseEvents) > 0:
-            for event in self.sideA.pulseEvents:
-            # Append the event to the corresponding minute
-                pf = (event[0], event[1], event[2], event[3], event[4], event[6])
-                self.sideApulseEvents[event[5]].append(pf)
+        # Schedule the events of both sides: the intervals of continuous fire by their
+        # first and last minute, and the pulse salvos by the minute they are launched
+        for side, sideIndex in ((self.sideA, 0), (self.sideB, 1)):
+            for index, event in enumerate(side.continuousEvents):
+                self.schedule_entry(event[3], self.START, sideIndex, index)
+                self.schedule_entry(event[4], self.STOP, sideIndex, index)
+            for event in side.pulseEvents:
+                self.schedule_entry(event[5], self.LAUNCH, sideIndex, event)
                 
-        # Side B pulse fire events
-        if len(self.sideB.pulseEvents) > 0:
-            for event in self.sideB.pulseEvents:
-            # Append the event to the corresponding minute
-                pf = (event[0], event[1], event[2], event[3], event[4], event[6])
-                self.sideBpulseEvents[event[5]].append(pf)
+    def schedule_entry(self, minute, kind, side, event):
+        """ Push an entry to the schedule. Entries beyond the end of the battle are dropped."""
+        if minute < self.duration:
+            heapq.heappush(self.schedule, (minute, kind, self.order, side, event))
+            self.order += 1
+            
+    def next_change(self):
+        """ Returns the next minute in which an event starts, stops, is launched or lands."""
+        if self.schedule:
+            return self.schedule[0][0]
+        return self.duration
+        
+    def sides(self, sideIndex):
+        """ Returns the (firing, target) sides for the given side index (0 for A, 1 for B)."""
+        if sideIndex == 0:
+            return self.sideA, self.sideB
+        return self.sideB, self.sideA
+        
+    def continuous_fire(self, sideIndex, active):
+        """ Apply the continuous fire of the active events of a side for the current minute."""
+        firing, target = self.sides(sideIndex)
+        for index in active:
+            event = firing.continuousEvents[index]
+            continuousDamage = firing.continuous_fire(event[0]) * event[2]
+            ratio = attrition_ratio(target.staying_power(event[1]), continuousDamage)
+            target.damage(ratio, event[1])
+            
+    def step(self):
+        """ Resolve the current minute of the battle, without any output."""
+        launches = ([], [])
+        # Update the active continuous fire events and collect this minute's salvos
+        while self.schedule and self.schedule[0][0] == self.timePulse and self.schedule[0][1] < self.IMPACT:
+            minute, kind, order, side, event = heapq.heappop(self.schedule)
+            active = self.activeA if side == 0 else self.activeB
+            if kind == self.START:
+                bisect.insort(active, event)
+            elif kind == self.STOP:
+                active.remove(event)
+            else:
+                launches[side].append(event)
+                
+        # Continuous fire, A first and then B
+        self.continuous_fire(0, self.activeA)
+        self.continuous_fire(1, self.activeB)
+        
+        # Pulse fire: (firer, target, type, size, efficiency, start, start + tui)
+        for side in (0, 1):
+            firing, target = self.sides(side)
+            for event in launches[side]:
+                pulseDamage = firing.pulse_fire(event[0], event[2], event[3]) * event[4]
+                self.schedule_entry(event[6], self.IMPACT, 1 - side, (event[1], pulseDamage))
+                
+        # Pulse damage landing this minute, A first and then B
+        impacts = ([], [])
+        while self.schedule and self.schedule[0][0] == self.timePulse:
+            minute, kind, order, side, damage = heapq.heappop(self.schedule)
+            impacts[side].append(damage)
+        for side, target in ((0, self.sideA), (1, self.sideB)):
+            for damage in impacts[side]:
+                ratio = attrition_ratio(target.staying_power(damage[0]), damage[1])
+                target.damage(ratio, damage[0])
                 
+        # Refresh both sides
+        self.sideA.refresh()
+        self.sideB.refresh()
+            
     def advance_pulse(self):
         """ Advance the battle by one time pulse (one minute)"""
-        # Check whether any A continuous fire events are taking place this minute
-        if len(self.sideAtimeline[self.timePulse]) > 0:
-        # Apply damage to B accordingly for each event
-            for event in self.sideAtimeline[self.timePulse]:
-                continuousDamage = self.sideA.continuous_fire(event[0]) * event[2]
-                targetStaying = self.sideB.staying_power(event[1])
-                if targetStaying == 0:
-                    ratio = 0
-                else:
-                    ratio = max((max((targetStaying - continuousDamage), 0)/ targetStaying), 0)
-                    
-                self.sideB.damage(ratio, event[1])
+        self.step()
+        # Record both sides
+        self.recorder.record(self, self.timePulse)
+        # Advance the time pulse by one unit
+        self.timePulse += 1
+        
+    def linear_model(self):
+        """ Returns the continuous fire of the active events as an affine map over one minute.
+        
+        While no target is wiped out, every event multiplies the staying power of its target
+        groups by (S - D) / S, where S is their staying power and D the damage, which is
+        proportional to the staying power of the firers in the previous minute. If the
+        targets of each side are either identical or disjoint, the total staying power of
+        every distinct target selection ("block") therefore just loses the sum of the
+        damage dealt to it, and each group keeps its share of its block.
+        
+        Returns (blocks, shares, matrix) where blocks is a list of (side, groups) tuples,
+        shares maps each (side, group) pair in a block to its share of the block, and the
+        matrix maps (block totals, 1) from one minute to the next. Returns None if the
+        targets overlap and the minute has to be stepped through.
+        """
+        events = []
+        for side, active in ((0, self.activeA), (1, self.activeB)):
+            firing, target = self.sides(side)
+            for index in active:
+                event = firing.continuousEvents[index]
+                events.append((side, group_indices(firing, event[0]), 1 - side,
+                               group_indices(target, event[1]), event[2]))
                 
-        # Check whether any B continuous fire events are taking place this minute
-        if len(self.sideBtimeline[self.timePulse]) > 0:
-        # Apply damage to A accordingly for each event
-            for event in self.sideBtimeline[self.timePulse]:
-                continuousDamage = self.sideB.continuous_fire(event[0]) * event[2]
-                targetStaying = self.sideA.staying_power(event[1])
-                if targetStaying == 0:
-                    ratio = 0
+        # Group the targets into blocks, dropping those already wiped out
+        blocks = []
+        blockIndex = {}
+        shares = {}
+        for firer, firers, side, targets, efficiency in events:
+            key = (side, frozenset(targets))
+            if key in blockIndex:
+                continue
+            blockIndex[key] = None
+            groups = (self.sideA, self.sideB)[side].groups
+            total = sum(groups[group].staying for group in key[1])
+            if total == 0:
+                continue
+            for group in key[1]:
+                if (side, group) in shares:
+                    return None
+                shares[(side, group)] = groups[group].staying / total
+            blockIndex[key] = len(blocks)
+            blocks.append(key)
+            
+        size = len(blocks)
+        matrix = np.identity(size + 1)
+        for firer, firers, side, targets, efficiency in events:
+            row = blockIndex[(side, frozenset(targets))]
+            if row is None:
+                continue
+            groups = (self.sideA, self.sideB)[firer].groups
+            for group in firers:
+                rate = efficiency * groups[group].continuousFire / groups[group].originalStaying
+                column = self.block_of(blocks, blockIndex, firer, group)
+                if column is None:
+                    matrix[row, size] -= rate * groups[group].staying
                 else:
-                    ratio = max((max((targetStaying - continuousDamage), 0)/ targetStaying), 0)
-                    
-                self.sideA.damage(ratio, event[1])
-                
-        # Check whether any A pulse fire events are taking place this minute
+                    matrix[row, column] -= rate * shares[(firer, group)]
+        return blocks, shares, matrix
         
-        # (firer, target, type, size, efficiency, start, start + tui)
+    @staticmethod
+    def block_of(blocks, blockIndex, side, group):
+        """ Returns the index of the block holding a group, if any."""
+        for index, (blockSide, groups) in enumerate(blocks):
+            if blockSide == side and group in groups:
+                return index
+        return None
         
-        if len(self.sideApulseEvents[self.timePulse]) > 0:
-        # Append the damage and target group to B's pulse damage timeline
-            for event in self.sideApulseEvents[self.timePulse]:
-                pulseDamage = self.sideA.pulse_fire(event[0], event[2], event[3]) * event[4]
-                self.sideBpulseDamage[event[5]].append((event[1], pulseDamage))
+    def skip_quiet(self, until):
+        """ Advance the battle to minute 'until' (without any output), assuming that no
+        event starts, stops, is launched or lands in between.
+        
+        Minutes without continuous fire are skipped outright. Otherwise the affine map of
+        linear_model() is raised to the number of minutes to skip, as long as every target
+        block is still standing at the end of them. If not, the battle is advanced in
+        closed form up to the minute in which a target is wiped out, and that minute is
+        stepped through.
+        """
+        while self.timePulse < until and self.sideA.staying_power() > 0 and self.sideB.staying_power() > 0:
+            if not self.activeA and not self.activeB:
+                self.timePulse = until
+                return
+            model = self.linear_model()
+            if model is None:
+                self.step()
+                self.timePulse += 1
+                continue
+            blocks, shares, matrix = model
+            totals = [sum((self.sideA, self.sideB)[side].groups[group].staying for group in groups)
+                      for side, groups in blocks]
+            totals = np.array(totals + [1.0])
+            
+            def advance(minutes):
+                return np.linalg.matrix_power(matrix, minutes) @ totals
                 
-        # Check whether any B pulse fire events are taking place this minute
-        if len(self.sideBpulseEvents[self.timePulse]) > 0:
-        # Append the damage and target group to B's pulse damage timeline
-            for event in self.sideBpulseEvents[self.timePulse]:
-                pulseDamage = self.sideB.pulse_fire(event[0], event[2], event[3]) * event[4]
-                self.sideApulseDamage[event[5]].append((event[1], pulseDamage))
-
+            minutes = until - self.timePulse
+            result = advance(minutes)
+            if np.all(result[:-1] > 0):
+                wipedOut = False
+            else:
+                # Largest number of minutes leaving every block standing
+                low, high = 0, minutes
+                while high - low > 1:
+                    middle = (low + high) // 2
+                    if np.all(advance(middle)[:-1] > 0):
+                        low = middle
+                    else:
+                        high = middle
+                minutes = low
+                result = advance(minutes)
+                wipedOut = True
                 
-        # Check whether A is receiving any pulse damage this minute
-        if len(self.sideApulseDamage[self.timePulse]) > 0:
-        # Apply damage to the corresponding groups of A
-            for damage in self.sideApulseDamage[self.timePulse]:
-                targetStaying = self.sideA.staying_power(damage[0])
-                pulseDamage = damage[1]
-                if targetStaying == 0:
-                    ratio = 0
-                else:
-                    ratio = max((max((targetStaying - pulseDamage), 0)/ targetStaying), 0)
-                    
-                self.sideA.damage(ratio, damage[0])
+            for (side, groups), total in zip(blocks, result):
+                target = (self.sideA, self.sideB)[side]
+                for group in groups:
+                    target.groupStaying[group] = shares[(side, group)] * total
+            self.sideA.refresh()
+            self.sideB.refresh()
+            self.timePulse += minutes
+            if wipedOut:
+                self.step()
+                self.timePulse += 1
                 
-        # Check wheter B is receiving any pulse damage this minute
-        if len(self.sideBpulseDamage[self.timePulse]) > 0:
-        # Apply damage to the corresponding groups of B
-            for damage in self.sideBpulseDamage[self.timePulse]:
-                targetStaying = self.sideB.staying_power(damage[0])
-                pulseDamage = damage[1]
-                if targetStaying == 0:
-                    ratio = 0
-                else:
-                    ratio = max((max((targetStaying - pulseDamage), 0)/ targetStaying), 0)
-                    
-                self.sideB.damage(ratio, damage[0])
+    def resolve(self):
+        """ Resolve the battle until its conclusion.
+        
+        Every resolved minute is passed to the battle's recorder. If the recorder does not
+        need every minute, the quiet stretches between events are skipped in closed form,
+        and only the last minute of each stretch is recorded.
+        """
+        self.recorder.start(self)
+        while self.timePulse < self.duration and self.sideA.staying_power() > 0 and self.sideB.staying_power() > 0:
+            nextChange = self.next_change()
+            if self.recorder.perMinute or nextChange == self.timePulse:
+                self.advance_pulse()
+            else:
+                self.skip_quiet(nextChange)
+                self.recorder.record(self, self.timePulse - 1)
+        self.recorder.finish(self)
+        
+    def status(self):
+        """ Returns the staying power, continuous fire and pulse fire of side A, followed by
+        those of side B, in the current minute."""
+        return (self.sideA.staying_power(), self.sideA.continuous_fire(), self.sideA.pulse_fire(),
+                self.sideB.staying_power(), self.sideB.continuous_fire(), self.sideB.pulse_fire())
                 
-        # Refresh all groups on both sides
-        for group in self.sideA.groups:
-            group.refresh()
-        for group in self.sideB.groups:
-            group.refresh()
-        # Print both sides
-        print(self)
-        # Advance the time pulse by one unit
-        self.timePulse += 1
+    def summary(self):
+        """ Returns the losses (% lost) of the battle: staying power, continuous fire and
+        pulse fire of side A, followed by those of side B."""
+        sa = (1- self.sideA.get_status())*100
+        sb = (1- self.sideB.get_status())*100
+        fca = self.sideA.continuous_fire_loss()
+        fcb = self.sideB.continuous_fire_loss()
+        fpa = self.sideA.pulse_fire_loss()
+        fpb = self.sideB.pulse_fire_loss()
+        return sa, fca, fpa, sb, fcb, fpb
         
-    def resolve(self):
-        """ Resolve the battle until its conclusion."""
-        print("{:^55}".format(self.name.upper()))
-        print("\n{}".format(self.sideA.name.upper()))
-        for group in self.sideA.groups:
+    def __str__(self):
+        """String override."""
+        status = (round(value, 3) for value in self.status())
+        battleString = "{:<3} - {:<6.3f} | {:<6.3f} | {:<6.3f} | {:<6.3f} | {:<6.3f} | {:<6.3f}".format(
+        self.timePulse, *status)
+        return battleString
+        
+class NullRecorder:
+    """ A recorder which records nothing. The base class of all battle recorders.
+    
+    A recorder receives the battle when it starts (start()), after every resolved minute
+    (record()) and when it ends (finish()).
+    - perMinute (bool): whether the recorder needs every minute of the battle. If not, the
+    battle may skip quiet stretches without recording the minutes in between.
+    """
+    
+    def __init__(self, perMinute = False):
+        self.perMinute = perMinute
+        
+    def start(self, battle):
+        """ Called before the first minute of the battle is resolved."""
+        pass
+        
+    def record(self, battle, minute):
+        """ Called with the status of the battle at the end of the given minute."""
+        pass
+        
+    def finish(self, battle):
+        """ Called once the battle has been resolved."""
+        pass
+        
+class ConsoleRecorder(NullRecorder):
+    """ Prints the battle to the console, in the format of Beall's original program: both
+    sides, the status of the battle every minute and a summary of losses."""
+    
+    def __init__(self, perMinute = True):
+        NullRecorder.__init__(self, perMinute)
+        
+    def start(self, battle):
+        print("{:^55}".format(battle.name.upper()))
+        print("\n{}".format(battle.sideA.name.upper()))
+        for group in battle.sideA.groups:
             print(group)
         
-        print("\n{}".format(self.sideB.name.upper()))
-        for group in self.sideB.groups:
+        print("\n{}".format(battle.sideB.name.upper()))
+        for group in battle.sideB.groups:
             print(group)
         print("\n")
         battleInit = "{:<3} - {:<6} | {:<6} | {:<6} | {:<6} | {:<6} | {:<6}".format(
         "TP","SPA","CFA","PFA","SPB","CFB","PFB")
         print(battleInit)
-        while self.timePulse < (len(self.sideAtimeline)) and self.sideA.staying_power() > 0 and self.sideB.staying_power() > 0:
-            self.advance_pulse()
-            
+        
+    def record(self, battle, minute):
+        status = (round(value, 3) for value in battle.status())
+        print("{:<3} - {:<6.3f} | {:<6.3f} | {:<6.3f} | {:<6.3f} | {:<6.3f} | {:<6.3f}".format(
+        minute, *status))
+        
+    def finish(self, battle):
         print("\nSUMMARY OF LOSSES (% LOST)")
         header = "{:<5} | {:<5} | {:<5} | {:<5} | {:<5} | {:<5}".format(
         "SA", "FCA", "FPA", "SB", "FCB", "FPB")
-        sa = round((1- self.sideA.get_status())*100, 2)
-        sb = round((1- self.sideB.get_status())*100, 2)
-        fca = self.sideA.continuous_fire_loss()
-        fcb = self.sideB.continuous_fire_loss()
-        fpa = self.sideA.pulse_fire_loss()
-        fpb = self.sideB.pulse_fire_loss()
+        sa, fca, fpa, sb, fcb, fpb = battle.summary()
         lossesString = "{:<5.2f} | {:<5.2f} | {:<5.2f} | {:<5.2f} | {:<5.2f} | {:<5.2f}".format(
-        sa, fca, fpa, sb, fcb, fpb)
+        round(sa, 2), fca, fpa, round(sb, 2), fcb, fpb)
         print(header)
         print(lossesString)
         
-    def __str__(self):
-        """String override."""
-        sideAsp = round(self.sideA.staying_power(), 3)
-        sideBsp = round(self.sideB.staying_power(), 3)
-        sideAcf = round(self.sideA.continuous_fire(), 3)
-        sideBcf = round(self.sideB.continuous_fire(), 3)
-        sideApf = round(self.sideA.pulse_fire(), 3)
-        sideBpf = round(self.sideB.pulse_fire(), 3)
-        battleString = "{:<3} - {:<6.3f} | {:<6.3f} | {:<6.3f} | {:<6.3f} | {:<6.3f} | {:<6.3f}".format(
-        self.timePulse,sideAsp,sideAcf,sideApf,sideBsp,sideBcf,sideBpf)
-        return battleString
-
-# CORONEL 1914 (comment out the block below if you wish to play a different battle)
-britishOne = Group("Good Hope, Monmouth", 7.27, 3.21)
-britishTwo = Group("Glasgow", 0.42, 1.23)
+class ArrayRecorder(NullRecorder):
+    """ Records the status of both sides in NumPy arrays.
+    
+    Once the battle is resolved:
+    - minutes (array): the minute of every record. The first record holds the status of
+    both sides before the battle, at minute -1.
+    - aPlot, bPlot (arrays): one (staying power, continuous fire, pulse fire) row per
+    record for each side. They also replace the battle's own aPlot and bPlot lists.
+    """
+    
+    def __init__(self, perMinute = True):
+        NullRecorder.__init__(self, perMinute)
+        self.minutes = np.empty(0, dtype=int)
+        self.aPlot = self.bPlot = np.empty((0, 3))
+        self.rows = np.empty((0, 7))
+        self.count = 0
+        
+    def start(self, battle):
+        self.rows = np.empty((battle.duration + 1 if self.perMinute else 64, 7))
+        self.count = 0
+        self.record(battle, -1)
+        
+    def record(self, battle, minute):
+        if self.count == len(self.rows):
+            self.rows = np.concatenate((self.rows, np.empty_like(self.rows)))
+        self.rows[self.count, 0] = minute
+        self.rows[self.count, 1:] = battle.status()
+        self.count += 1
+        
+    def finish(self, battle):
+        rows = self.rows[:self.count]
+        self.minutes = rows[:, 0].astype(int)
+        self.aPlot = rows[:, 1:4].copy()
+        self.bPlot = rows[:, 4:].copy()
+        battle.aPlot, battle.bPlot = self.aPlot, self.bPlot
+        
+class StreamRecorder(NullRecorder):
+    """ Writes the status of both sides to a text stream as it is recorded, either as CSV
+    (with a header row) or as newline-delimited JSON (one object per minute).
+    Parameters:
+    - stream (file object): the stream to write to.
+    - format (string): 'csv' or 'ndjson'.
+    """
+    
+    columns = ("minute", "SPA", "CFA", "PFA", "SPB", "CFB", "PFB")
+    
+    def __init__(self, stream, format = 'csv', perMinute = True):
+        NullRecorder.__init__(self, perMinute)
+        if format not in ('csv', 'ndjson'):
+            raise ValueError("Invalid stream format: {}".format(format))
+        self.stream = stream
+        self.format = format
+        self.writer = None
+        
+    def start(self, battle):
+        if self.format == 'csv':
+            self.writer = csv.writer(self.stream)
+            self.writer.writerow(self.columns)
+            
+    def record(self, battle, minute):
+        row = (minute,) + battle.status()
+        if self.format == 'csv':
+            self.writer.writerow(row)
+        else:
+            self.stream.write(json.dumps(dict(zip(self.columns, row))) + "\n")
+            
+    def finish(self, battle):
+        self.stream.flush()
 
-germanOne = Group("Scharnhorst, Gneisenau", 4.32, 3.30)
-germanTwo = Group("Leipzig, Dresden", 4.33, 2.23)
+def pulse_weights(side, groupSelection = 'all', type = 'all', size = 'all'):
+    """ Returns the pulse fire of every group of a side per unit of status, for a pulse
+    fire event (see Side.pulse_fire())."""
+    weights = np.zeros(len(side.groups))
+    if groupSelection == type == size == 'all':
+        weights[:] = side.groupSalvo
+    elif all(isinstance(arg, int) for arg in (groupSelection, type, size)):
+        power, number = side.groups[groupSelection].pulse[type]
+        weights[groupSelection] = power * min(size, number)
+    elif all(isinstance(arg, tuple) for arg in (groupSelection, size)) and isinstance(type, int):
+        for index, group in enumerate(groupSelection):
+            power, number = side.groups[group].pulse[type]
+            weights[group] += power * min(size[index], number)
+    else:
+        raise ValueError('Invalid input for pulse fire')
+    return weights
+    
+def monte_carlo(sideA, sideB, replications, efficiencies = None, starts = None, staying = None, seed = None):
+    """ Resolves many replications of a battle between two sides at once, drawing the
+    uncertain inputs of every replication from the given distributions.
+    
+    The state of both sides is held in (replications, groups) arrays, and every minute is
+    resolved for all replications together, in the same order as Battle.advance_pulse().
+    Pulse damage landing on a side in the same minute is applied in the order the salvos
+    were launched in each replication (by drawn start minute, then by event), as Battle
+    does.
+    
+    Parameters:
+    - sideA, sideB (Side objects): the opposing sides, with their fire events added.
+    - replications (int): the number of replications.
+    - efficiencies (dict): distributions of the efficiency of fire events, keyed by
+    (side, kind, index) tuples: side is 'A' or 'B', kind is 'continuous' or 'pulse' and
+    index is the position of the event in the side's event list.
+    - starts (dict): distributions of the start minute of fire events, keyed as above.
+    Draws are rounded to the nearest minute; durations and times until impact are kept.
+    - staying (dict): distributions of the staying power of groups, keyed by (side, index)
+    tuples, e.g. ('B', 0). Draws must be positive.
+    - seed (int): seed for the random number generator.
+    
+    A distribution is a callable taking a NumPy random generator and a number of draws,
+    such as lambda rng, size: rng.normal(0.028, 0.005, size). Anything not given a
+    distribution keeps its value in every replication.
+    
+    Returns a dictionary of arrays with the losses (% lost) of every replication, as in
+    the summary of Battle.resolve(): 'SA', 'FCA', 'FPA', 'SB', 'FCB' and 'FPB'.
+    """
+    rng = np.random.default_rng(seed)
+    efficiencies = efficiencies or {}
+    starts = starts or {}
+    staying = staying or {}
+    sides = (sideA, sideB)
+    labels = ('A', 'B')
+    
+    def draw(distributions, key, value):
+        if key not in distributions:
+            return np.full(replications, value, dtype=float)
+        return np.asarray(distributions[key](rng, replications), dtype=float)
+        
+    # Staying power of every replication: (replications, groups) arrays for each side
+    original = []
+    for side, label in zip(sides, labels):
+        columns = [draw(staying, (label, index), group.originalStaying) for index, group in enumerate(side.groups)]
+        columns = np.column_stack(columns)
+        if np.any(columns <= 0):
+            raise ValueError("Staying power draws must be positive")
+        original.append(columns)
+    current = [array.copy() for array in original]
+    previous = [array.copy() for array in original]
+    
+    # Fire events of both sides, with their drawn efficiencies and start minutes
+    continuous = []
+    pulse = []
+    ends = []
+    for firing, label in ((0, 'A'), (1, 'B')):
+        side, target = sides[firing], sides[1 - firing]
+        for index, event in enumerate(side.continuousEvents):
+            key = (label, 'continuous', index)
+            start = np.maximum(np.rint(draw(starts, key, event[3])), 0).astype(int)
+            firers = list(group_indices(side, event[0]))
+            weights = np.zeros(len(side.groups))
+            np.add.at(weights, firers, side.groupContinuous[firers])
+            targets = np.unique(group_indices(target, event[1]))
+            continuous.append((firing, weights, targets, draw(efficiencies, key, event[2]),
+                               start, start + (event[4] - event[3])))
+            ends.append(start + (event[4] - event[3]))
+        for index, event in enumerate(side.pulseEvents):
+            key = (label, 'pulse', index)
+            start = np.maximum(np.rint(draw(starts, key, event[5])), 0).astype(int)
+            arrival = start + (event[6] - event[5])
+            pulse.append((firing, pulse_weights(side, event[0], event[2], event[3]),
+                          np.unique(group_indices(target, event[1])), draw(efficiencies, key, event[4]),
+                          start, arrival, np.zeros(replications)))
+            ends.append(arrival)
+            
+    duration = np.max(ends, axis=0) + 1 if ends else np.zeros(replications, dtype=int)
+    # Minutes in which a continuous fire event starts or a salvo is launched or lands
+    eventMinutes = np.unique([event[4] for event in continuous] + [event[4] for event in pulse] +
+                             [event[5] for event in pulse]) if ends else np.zeros(0, dtype=int)
+    # Salvos landing on each side, and the rank of each one in every replication: by drawn
+    # start minute, then by event, the order in which Battle schedules their impacts
+    impacts = [[event for event in pulse if event[0] == 1 - side] for side in (0, 1)]
+    ranks = [np.argsort(np.argsort([event[4] for event in events], axis=0, kind='stable'), axis=0)
+             for events in impacts]
+    
+    def fire(firing, weights, efficiency):
+        return efficiency * ((previous[firing] / original[firing]) @ weights)
+        
+    def hit(side, targets, damage, mask):
+        targetStaying = current[side][:, targets].sum(axis=1)
+        ratio = np.maximum(targetStaying - damage, 0) / np.where(targetStaying > 0, targetStaying, 1)
+        current[side][:, targets] *= np.where(mask, ratio, 1)[:, None]
+        
+    minute = 0
+    lastMinute = int(duration.max()) if replications else 0
+    while minute < lastMinute:
+        running = (minute < duration) & (current[0].sum(axis=1) > 0) & (current[1].sum(axis=1) > 0)
+        if not running.any():
+            break
+        busy = False
+        for firing, weights, targets, efficiency, start, end in continuous:
+            active = running & (start <= minute) & (minute < end)
+            if active.any():
+                busy = True
+                hit(1 - firing, targets, fire(firing, weights, efficiency), active)
+        for firing, weights, targets, efficiency, start, arrival, damage in pulse:
+            launching = running & (start == minute)
+            if launching.any():
+                busy = True
+                damage[launching] = fire(firing, weights, efficiency)[launching]
+        for side in (0, 1):
+            landing = []
+            for event, rank in zip(impacts[side], ranks[side]):
+                mask = running & (event[5] == minute)
+                if mask.any():
+                    landing.append((event[2], event[6], rank, mask))
+            busy = busy or bool(landing)
+            if len(landing) == 1:
+                targets, damage, rank, mask = landing[0]
+                hit(side, targets, damage, mask)
+            elif landing:
+                for position in range(len(impacts[side])):
+                    for targets, damage, rank, mask in landing:
+                        inTurn = mask & (rank == position)
+                        if inTurn.any():
+                            hit(side, targets, damage, inTurn)
+        previous[0][:] = current[0]
+        previous[1][:] = current[1]
+        
+        minute += 1
+        if not busy:
+            # Nothing happens until the next event minute
+            upcoming = eventMinutes[np.searchsorted(eventMinutes, minute):]
+            minute = int(upcoming[0]) if len(upcoming) else lastMinute
+            
+    results = {}
+    for index, (side, label) in enumerate(zip(sides, labels)):
+        loss = (1 - current[index].sum(axis=1) / original[index].sum(axis=1)) * 100
+        results['S' + label] = loss
+        results['FC' + label] = loss if side.originalContinuous != 0 else np.zeros(replications)
+        results['FP' + label] = loss if side.originalPulse != 0 else np.zeros(replications)
+    return results
+    
+# Example battles, run when the file is executed directly. The same battles can be loaded
+# from the scenario files in scenarios/examples (see scenarios/README.md).
+if __name__ == "__main__":
+    # CORONEL 1914 (comment out the block below if you wish to play a different battle)
+    britishOne = Group("Good Hope, Monmouth", 7.27, 3.21)
+    britishTwo = Group("Glasgow", 0.42, 1.23)
 
-british = Side("British", [britishOne, britishTwo])
-german = Side("German", [germanOne, germanTwo])
+    germanOne = Group("Scharnhorst, Gneisenau", 4.32, 3.30)
+    germanTwo = Group("Leipzig, Dresden", 4.33, 2.23)
 
-german.continuous_fire_event(0,0,0.028,1,28)
-british.continuous_fire_event(1,0,0.028,6,15)
-german.continuous_fire_event(1,1,0.012, 19, 2)
+    british = Side("British", [britishOne, britishTwo])
+    german = Side("German", [germanOne, germanTwo])
 
-battle = Battle("Coronel 1914", british, german)
+    german.continuous_fire_event(0,0,0.028,1,28)
+    british.continuous_fire_event(1,0,0.028,6,15)
+    german.continuous_fire_event(1,1,0.012, 19, 2)
 
-battle.resolve()
+    battle = Battle("Coronel 1914", british, german, ConsoleRecorder())
 
+    battle.resolve()
 
-# MIDWAY 1942 (uncomment the commented block below and run the file to play the battle)
 
-# usOne = Group("Yorktown", 0, 2.07)
-# usTwo = Group("Enterprise, Hornet", 0, 4.14)
-# 
-# usOne.add_pulse_weapon(0.4657, 19)
-# usTwo.add_pulse_weapon(0.4657, 37)
-# 
-# usOne.add_pulse_weapon(1, 18)
-# usTwo.add_pulse_weapon(1, 38)
-# 
-# usOne.add_pulse_weapon(0.758333333333333, 13)
-# usTwo.add_pulse_weapon(0.758333333333333, 29)
-# 
-# japanOne = Group("Haga, Akagi, Soryu", 0, 6.33)
-# japanTwo = Group("Hiryu", 0, 1.52)
-# 
-# japanOne.add_pulse_weapon(0.216212121212121, 54)
-# japanTwo.add_pulse_weapon(0.216212121212121, 18)
-# 
-# japanOne.add_pulse_weapon(0.931041666666667, 68)
-# japanTwo.add_pulse_weapon(0.931041666666667, 18)
-# 
-# us = Side("US Carrier Group", [usOne, usTwo])
-# japan = Side("Japanese Carrier Group", [japanOne, japanTwo])
-# 
-# us.pulse_fire_event(1, 0, 1, 17, 0.162, 1, 145)
-# us.pulse_fire_event(0, 1, 1, 16, 0.162, 1, 145)
-# us.pulse_fire_event(0, 0, 1, 17, 0.162, 65, 81)
-# us.pulse_fire_event(1, 1, 1, 24, 0.162, 470, 91)
-# 
-# japan.pulse_fire_event(1, 0, 0, 18, 0, 179, 61)
-# japan.pulse_fire_event(1, 0, 1, 10, 0.2, 259, 91)
-# 
-# battle = Battle("Midway", us, japan)
-# battle.resolve()
+    # MIDWAY 1942 (uncomment the commented block below and run the file to play the battle)
 
+    # usOne = Group("Yorktown", 0, 2.07)
+    # usTwo = Group("Enterprise, Hornet", 0, 4.14)
+    # 
+    # usOne.add_pulse_weapon(0.4657, 19)
+    # usTwo.add_pulse_weapon(0.4657, 37)
+    # 
+    # usOne.add_pulse_weapon(1, 18)
+    # usTwo.add_pulse_weapon(1, 38)
+    # 
+    # usOne.add_pulse_weapon(0.758333333333333, 13)
+    # usTwo.add_pulse_weapon(0.758333333333333, 29)
+    # 
+    # japanOne = Group("Haga, Akagi, Soryu", 0, 6.33)
+    # japanTwo = Group("Hiryu", 0, 1.52)
+    # 
+    # japanOne.add_pulse_weapon(0.216212121212121, 54)
+    # japanTwo.add_pulse_weapon(0.216212121212121, 18)
+    # 
+    # japanOne.add_pulse_weapon(0.931041666666667, 68)
+    # japanTwo.add_pulse_weapon(0.931041666666667, 18)
+    # 
+    # us = Side("US Carrier Group", [usOne, usTwo])
+    # japan = Side("Japanese Carrier Group", [japanOne, japanTwo])
+    # 
+    # us.pulse_fire_event(1, 0, 1, 17, 0.162, 1, 145)
+    # us.pulse_fire_event(0, 1, 1, 16, 0.162, 1, 145)
+    # us.pulse_fire_event(0, 0, 1, 17, 0.162, 65, 81)
+    # us.pulse_fire_event(1, 1, 1, 24, 0.162, 470, 91)
+    # 
+    # japan.pulse_fire_event(1, 0, 0, 18, 0, 179, 61)
+    # japan.pulse_fire_event(1, 0, 1, 10, 0.2, 259, 91)
+    # 
+    # battle = Battle("Midway", us, japan, ConsoleRecorder())
+    # battle.resolve()
 
-# CORAL SEA REVISED (uncomment the commented block below and run the file to play the battle)
 
-# usOne = Group("Lexington", 0, 2.42)
-# usTwo = Group("Yorktown", 0, 2.07)
-# 
-# usOne.add_pulse_weapon(1, 17)
-# usTwo.add_pulse_weapon(1, 17)
-# usOne.add_pulse_weapon(0.58, 15)
-# usTwo.add_pulse_weapon(0.58, 15)
-# usOne.add_pulse_weapon(0.758, 10)
-# usTwo.add_pulse_weapon(0.758, 9)
-# 
-# japanOne = Group("Shokaku", 0, 2.42)
-# japanTwo = Group("Zuikaku", 0, 2.24)
-# 
-# japanOne.add_pulse_weapon(0.2162, 17)
-# japanTwo.add_pulse_weapon(0.2162, 16)
-# japanOne.add_pulse_weapon(0.931, 13)
-# japanTwo.add_pulse_weapon(0.931, 12)
-# 
-# us = Side("US", [usOne, usTwo])
-# japan = Side("Japan", [japanOne, japanTwo])
-# 
-# # firer, target, type, size, efficiency, start, tui
-# us.pulse_fire_event((0,1), 0, 0, (17, 17), 0.065, 47, 111)
-# us.pulse_fire_event((0,1), 0, 0, (6, 6), 0.065, 47, 154)
-# 
-# japan.pulse_fire_event((0,1), (0,1), 0, (17, 16), 0.091, 55, 125)
-# japan.pulse_fire_event((0,1), 0, 1, (9, 9), 0.111, 55, 125)
-# 
-# battle = Battle("Coral Sea", us, japan)
-# 
-# battle.resolve()
+    # CORAL SEA REVISED (uncomment the commented block below and run the file to play the battle)
 
+    # usOne = Group("Lexington", 0, 2.42)
+    # usTwo = Group("Yorktown", 0, 2.07)
+    # 
+    # usOne.add_pulse_weapon(1, 17)
+    # usTwo.add_pulse_weapon(1, 17)
+    # usOne.add_pulse_weapon(0.58, 15)
+    # usTwo.add_pulse_weapon(0.58, 15)
+    # usOne.add_pulse_weapon(0.758, 10)
+    # usTwo.add_pulse_weapon(0.758, 9)
+    # 
+    # japanOne = Group("Shokaku", 0, 2.42)
+    # japanTwo = Group("Zuikaku", 0, 2.24)
+    # 
+    # japanOne.add_pulse_weapon(0.2162, 17)
+    # japanTwo.add_pulse_weapon(0.2162, 16)
+    # japanOne.add_pulse_weapon(0.931, 13)
+    # japanTwo.add_pulse_weapon(0.931, 12)
+    # 
+    # us = Side("US", [usOne, usTwo])
+    # japan = Side("Japan", [japanOne, japanTwo])
+    # 
+    # # firer, target, type, size, efficiency, start, tui
+    # us.pulse_fire_event((0,1), 0, 0, (17, 17), 0.065, 47, 111)
+    # us.pulse_fire_event((0,1), 0, 0, (6, 6), 0.065, 47, 154)
+    # 
+    # japan.pulse_fire_event((0,1), (0,1), 0, (17, 16), 0.091, 55, 125)
+    # japan.pulse_fire_event((0,1), 0, 1, (9, 9), 0.111, 55, 125)
+    # 
+    # battle = Battle("Coral Sea", us, japan, ConsoleRecorder())
+    # 
+    # battle.resolve()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cold import benchmark for the combat models.
+
+Every model package is imported in a fresh Python interpreter (so nothing is cached in
+sys.modules), several times, and the fastest import is kept. The benchmark fails if any
+import, or the import of all packages together, exceeds the time budget, or if importing
+a model pulls in a plotting library or prints anything (a demo running on import).
+
+Run from the root of the repository:
+
+    python benchmarks/import_time.py --budget 0.5 --repeat 5
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = (
+    'airWar',
+    'beall',
+    'chase',
+    'germantank',
+    'lanchester',
+    'lanchester_with_reinforcements',
+    'okun',
+    'salvo.deterministicSalvo',
+    'salvo.deterministicSalvoNoLeakers',
+    'scenarios',
+    'stochastic_salvo',
+    'suicide_bombing',
+)
+
+PLOTTING = ('matplotlib', 'seaborn')
+
+# Run in the child interpreter: import the modules, report the time taken and the
+# plotting libraries loaded as a JSON line on stderr (stdout must stay empty).
+PROBE = """
+import importlib, json, sys, time
+start = time.perf_counter()
+for name in sys.argv[1:]:
+    importlib.import_module(name)
+elapsed = time.perf_counter() - start
+plotting = sorted(name for name in sys.modules if name.split('.')[0] in {plotting!r})
+sys.stderr.write(json.dumps({{'elapsed': elapsed, 'plotting': plotting}}) + '\\n')
+""".format(plotting=set(PLOTTING))
+
+
+def cold_import(modules):
+    """Import the modules in a fresh interpreter. Returns (seconds, plotting modules, output)."""
+    process = subprocess.run([sys.executable, '-c', PROBE] + list(modules), cwd=ROOT,
+                             capture_output=True, text=True)
+    if process.returncode != 0:
+        raise RuntimeError("importing {} failed:\n{}".format(", ".join(modules), process.stderr))
+    report = json.loads(process.stderr.strip().splitlines()[-1])
+    return report['elapsed'], report['plotting'], process.stdout
+
+
+def benchmark(modules, repeat):
+    """Return the fastest of 'repeat' cold imports, with the plotting modules and output."""
+    runs = [cold_import(modules) for _ in range(repeat)]
+    return min(run[0] for run in runs), runs[0][1], runs[0][2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--budget', type=float, default=0.5,
+                        help='maximum seconds for the cold import of each package (default 0.5)')
+    parser.add_argument('--total-budget', type=float, default=1.0,
+                        help='maximum seconds to import every package at once (default 1.0)')
+    parser.add_argument('--repeat', type=int, default=5, help='imports per package; the fastest is kept')
+    arguments = parser.parse_args()
+
+    failures = []
+    print("{:<36} {:>8}".format("MODULE", "SECONDS"))
+    for name in MODULES:
+        seconds, plotting, output = benchmark([name], arguments.repeat)
+        print("{:<36} {:>8.3f}".format(name, seconds))
+        if seconds > arguments.budget:
+            failures.append("{} took {:.3f} s (budget {:.3f} s)".format(name, seconds, arguments.budget))
+        if plotting:
+            failures.append("{} imports {}".format(name, ", ".join(plotting)))
+        if output:
+            failures.append("{} prints on import".format(name))
+
+    seconds, plotting, output = benchmark(MODULES, arguments.repeat)
+    print("{:<36} {:>8.3f}".format("(all)", seconds))
+    if seconds > arguments.total_budget:
+        failures.append("importing every package took {:.3f} s (budget {:.3f} s)".format(
+            seconds, arguments.total_budget))
+
+    if failures:
+        print("\nFAILED:\n" + "\n".join(failures))
+        sys.exit(1)
+    print("\nAll imports within budget.")
+
+
+if __name__ == '__main__':
+    main()
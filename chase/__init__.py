@@ -0,0 +1,3 @@
+"""J.V. Chase's continuous fire equation. See chase.py."""
+
+from .chase import chase_battle, chase_events, chase_grid, plot_battle
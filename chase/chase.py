@@ -6,79 +6,217 @@ Created on Fri Aug 31 2017
 @author: Alvaro Radigales
 
 A simple Python implementation of J.V. Chase's continuous fire equation.
-Force strength for each time pulse of the simulation is stored in a NumPy
-array, and later plotted using MatPlotLib. A separate NumPy array keeps
-track of the equivalent ships remaining per side.
+The equation is solved in closed form, and force strength is sampled at
+each time pulse into a NumPy array, later plotted using MatPlotLib. A
+separate NumPy array keeps track of the equivalent ships remaining per side.
+chase_grid() solves many battles at once, and gives the exact times at
+which each side is down to each whole number of ships.
 
 """
 
+import math
+
 import numpy
 
-import matplotlib.pyplot as plot
-
-from math import ceil
-
-# The length of the time step will not alter the end result.
-# Use only to determine the resolution of the graph.
-
-timeStart = 0.0
-timeEnd = 90.0
-timeStep = 0.01
-
-steps = int((timeEnd - timeStart) / timeStep)
-
-# Initialise numpy arrays covering each step of the simulation.
-# Two auxiliary arrays are used to store the equivalent number
-# of ships left in each fleet.
-
-blue = numpy.zeros(steps)
-blueShips = numpy.zeros(steps)
-red = numpy.zeros(steps)
-redShips = numpy.zeros(steps)
-time = numpy.zeros(steps)
-
-blue[0] = 8
-blueShips[0] = 8
-red[0] = 7
-redShips[0] = 7
-
-blueLethality = 0.2
-redLethality = 0.2
-
-blueStaying = 12
-redStaying = 12
-
-time[0] = timeStart
-
-for i in range(steps -1):
-    blue[i+1] = max(0, blue[i] - (timeStep * (red[i] * redLethality)) / blueStaying)
-    red[i+1] = max(0, red[i] - (timeStep * (blue[i] * blueLethality)) / redStaying)
-    blueShips[i+1] = max(0, ceil(blue[i] - (timeStep * (red[i] * redLethality)) / blueStaying))
-    redShips[i+1] = max(0, ceil(red[i] - (timeStep * (blue[i] * blueLethality)) / redStaying))
-    time[i+1] = time[i] + timeStep
-    
-# Remaining forces at the end of the simulation, for plot label purposes.
-    
-blueRemaining = float("{0:.2f}".format(blue[len(blue)-1]))
-redRemaining = float("{0:.2f}".format(red[len(red)-1]))
-print(blue[len(blue)-1])
-
-# Plot code.
-    
-plot.figure()
-plot.gca().yaxis.grid(True)
-plot.step(time, blue, '-b', where = 'post', label = 'Blue strength')
-plot.step(time, blueShips, '-c', where = 'post', label = 'Blue ships')
-plot.step(time, red, '-r', where = 'post', label = 'Red strength')
-plot.step(time, redShips, '-m', where = 'post', label = 'Red ships')
-plot.ylabel('Strength')
-plot.xlabel('Time')
-plot.legend()
-plot.annotate(blueRemaining,
-              xy=(timeEnd, blue[len(blue)-1]),
-              xytext=(-15,10),
-              textcoords='offset points')
-plot.annotate(redRemaining,
-              xy=(timeEnd, red[len(red)-1]),
-              xytext=(-15,10),
-              textcoords='offset points')
+
+def _chase_batch(blue, red, blueLethality, redLethality, blueStaying, redStaying, timeEnd):
+    """Closed-form solution of Chase's equation for flat arrays of battles:
+
+        dBlue/dt = -redLethality * red / blueStaying
+        dRed/dt = -blueLethality * blue / redStaying
+
+    Returns the rates (blueRate, redRate), gamma, and the time at which one
+    side is annihilated (infinite if neither ever is), with the strengths of
+    both sides at that time (or at timeEnd if it comes first)."""
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        blueRate = redLethality / blueStaying
+        redRate = blueLethality / redStaying
+        gamma = numpy.sqrt(blueRate * redRate)
+        # The state equation: redRate * blue^2 - blueRate * red^2 is constant.
+        blueFighting = redRate * blue ** 2
+        redFighting = blueRate * red ** 2
+        blueWins = blueFighting > redFighting
+        redWins = redFighting > blueFighting
+
+        ratio = numpy.where(blueWins,
+                            red * numpy.sqrt(blueRate) / (blue * numpy.sqrt(redRate)),
+                            blue * numpy.sqrt(redRate) / (red * numpy.sqrt(blueRate)))
+        hyperbolic = numpy.arctanh(ratio) / gamma
+        linear = numpy.where(blueWins, red / (redRate * blue), blue / (blueRate * red))
+        time = numpy.where(gamma > 0, hyperbolic, linear)
+        time = numpy.where(blueWins | redWins, time, numpy.inf)
+        time = numpy.where((blue <= 0) | (red <= 0), 0.0, time)
+
+    stop = numpy.minimum(time, timeEnd)
+    blueEnd, redEnd = _chase_strengths(stop, blue, red, blueRate, redRate, gamma)
+    # Evenly matched sides both decay towards zero, and sides that cannot hurt
+    # each other stay as they are.
+    blueEnd = numpy.where(numpy.isinf(stop), numpy.where(gamma > 0, 0.0, blue), blueEnd)
+    redEnd = numpy.where(numpy.isinf(stop), numpy.where(gamma > 0, 0.0, red), redEnd)
+    ended = numpy.isfinite(time) & (time <= timeEnd)
+    blueEnd = numpy.where(ended & redWins, 0.0, blueEnd)
+    redEnd = numpy.where(ended & blueWins, 0.0, redEnd)
+    return blueRate, redRate, gamma, time, numpy.maximum(blueEnd, 0), numpy.maximum(redEnd, 0)
+
+
+def _chase_strengths(time, blue, red, blueRate, redRate, gamma):
+    """Strengths of both sides at the given time(s), before either side is
+    annihilated. The exponential form of the hyperbolic solution stays
+    accurate when both sides decay together."""
+    with numpy.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        blueScale = numpy.sqrt(blueRate / redRate)
+        growing = numpy.exp(gamma * time) / 2
+        decaying = numpy.exp(-gamma * time) / 2
+        blueNow = numpy.where(gamma > 0,
+                              (blue - blueScale * red) * growing + (blue + blueScale * red) * decaying,
+                              blue - numpy.where(blueRate * red > 0, blueRate * red * time, 0))
+        redNow = numpy.where(gamma > 0,
+                             (red - blue / blueScale) * growing + (red + blue / blueScale) * decaying,
+                             red - numpy.where(redRate * blue > 0, redRate * blue * time, 0))
+    return blueNow, redNow
+
+
+def _level_times(levels, start, other, rate, otherRate, gamma, endTime):
+    """Times at which a side's strength first drops to each of the given
+    levels, for flat arrays of battles (levels along the last axis). Zero for
+    levels at or above the starting strength, infinite for levels never
+    reached before the battle ends."""
+    start = start[:, None]
+    other = other[:, None]
+    rate = rate[:, None]
+    gamma = gamma[:, None]
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        # strength = A * x + C / x, with x = exp(gamma * t): the first root of
+        # A * x^2 - level * x + C = 0, in a form that is stable when A is 0.
+        scale = numpy.sqrt(rate / otherRate[:, None])
+        growing = (start - scale * other) / 2
+        decaying = (start + scale * other) / 2
+        root = 2 * decaying / (levels + numpy.sqrt(levels ** 2 - 4 * growing * decaying))
+        hyperbolic = numpy.log(root) / gamma
+        linear = numpy.where(rate * other > 0, (start - levels) / (rate * other), numpy.inf)
+        times = numpy.where(gamma > 0, hyperbolic, linear)
+    times = numpy.where(numpy.isnan(times) | (times > endTime[:, None]), numpy.inf, times)
+    return numpy.where(levels >= start, 0.0, numpy.maximum(times, 0))
+
+
+def chase_grid(blueStart, redStart, blueLethality, redLethality, blueStaying, redStaying,
+               timeEnd = math.inf):
+    """Solve many battles with Chase's equation at once.
+
+    The arguments are NumPy arrays (or scalars) broadcast against each other,
+    so a grid of scenarios can be given as arrays of different shapes.
+
+    Returns a dict of arrays with the broadcast shape:
+        * 'blue', 'red': the strengths at the end of the battle (or at timeEnd).
+        * 'winner': 1 if blue annihilates red by timeEnd, -1 if red
+          annihilates blue, and 0 otherwise.
+        * 'time': the annihilation time, infinite if no side is annihilated
+          by timeEnd.
+        * 'blueShips', 'redShips': with one more axis, indexed by ship count
+          n, the time at which the side is down to n ship-equivalents (its
+          strength first drops to n, so that n ships are still afloat). Zero
+          for counts at or above the starting strength, infinite for counts
+          never reached by timeEnd.
+    """
+    arrays = numpy.broadcast_arrays(*(numpy.asarray(value, dtype=float) for value in
+                                      (blueStart, redStart, blueLethality, redLethality, blueStaying, redStaying)))
+    shape = arrays[0].shape
+    blue, red, blueLethality, redLethality, blueStaying, redStaying = (array.ravel() for array in arrays)
+
+    blueRate, redRate, gamma, time, blueEnd, redEnd = _chase_batch(blue, red, blueLethality, redLethality,
+                                                                  blueStaying, redStaying, timeEnd)
+    endTime = numpy.minimum(time, timeEnd)
+    result = {
+        'blue': blueEnd.reshape(shape),
+        'red': redEnd.reshape(shape),
+        'time': numpy.where(time <= timeEnd, time, numpy.inf).reshape(shape),
+    }
+    decided = numpy.isfinite(time) & (time <= timeEnd)
+    winner = numpy.where(decided & (blueEnd > 0), 1, numpy.where(decided & (redEnd > 0), -1, 0))
+    result['winner'] = winner.astype(numpy.int8).reshape(shape)
+    for key, start, other, rate, otherRate, loser in (('blueShips', blue, red, blueRate, redRate, -1),
+                                                      ('redShips', red, blue, redRate, blueRate, 1)):
+        levels = numpy.arange(int(math.ceil(start.max(initial=0))), dtype=float)
+        times = _level_times(levels, start, other, rate, otherRate, gamma, endTime)
+        if len(levels):
+            # The loser's root for zero ships can round just past the annihilation time
+            times[:, 0] = numpy.where(winner == loser, time, times[:, 0])
+        result[key] = times.reshape(shape + (len(levels),))
+    return result
+
+
+def chase_events(blueStart, redStart, blueLethality, redLethality, blueStaying, redStaying,
+                 timeEnd = math.inf):
+    """Return the course of one battle as a list of (time, side, ships)
+    events, in order of time: each time a side ('blue' or 'red') is down to
+    a whole number of ship-equivalents."""
+    result = chase_grid(blueStart, redStart, blueLethality, redLethality, blueStaying, redStaying, timeEnd)
+    events = []
+    for side in ('blue', 'red'):
+        for ships, time in enumerate(result[side + 'Ships']):
+            if 0 < time < math.inf:
+                events.append((float(time), side, ships))
+    return sorted(events, key=lambda event: (event[0], event[1] != 'blue'))
+
+
+def chase_battle(blueStart, redStart, blueLethality, redLethality, blueStaying, redStaying,
+                 timeStart = 0.0, timeEnd = 90.0, timeStep = 0.01):
+    """ Sample a battle with Chase's continuous fire equation.
+
+    The battle is solved exactly, and the strengths are sampled every
+    timeStep. Returns the time, blue strength, blue ships, red strength and
+    red ships at each time step, as NumPy arrays. Strength is measured in
+    ship-equivalents; the number of ships counts every damaged ship still
+    afloat.
+    """
+
+    steps = int((timeEnd - timeStart) / timeStep)
+    time = timeStart + timeStep * numpy.arange(steps)
+
+    blue, red = (numpy.asarray(value, dtype=float) for value in (blueStart, redStart))
+    blueRate, redRate, gamma, end, blueEnd, redEnd = _chase_batch(blue, red, blueLethality, redLethality,
+                                                                  blueStaying, redStaying, math.inf)
+    elapsed = numpy.minimum(time - timeStart, end)
+    blue, red = _chase_strengths(elapsed, blue, red, blueRate, redRate, gamma)
+    finished = time - timeStart >= end
+    blue = numpy.where(finished, blueEnd, numpy.maximum(blue, 0))
+    red = numpy.where(finished, redEnd, numpy.maximum(red, 0))
+
+    return time, blue, numpy.ceil(blue), red, numpy.ceil(red)
+
+
+def plot_battle(time, blue, blueShips, red, redShips):
+    """ Plot the strength and ships of both sides as a function of time."""
+    import matplotlib.pyplot as plot
+
+    # Remaining forces at the end of the simulation, for plot label purposes.
+
+    blueRemaining = float("{0:.2f}".format(blue[len(blue)-1]))
+    redRemaining = float("{0:.2f}".format(red[len(red)-1]))
+
+    plot.figure()
+    plot.gca().yaxis.grid(True)
+    plot.step(time, blue, '-b', where = 'post', label = 'Blue strength')
+    plot.step(time, blueShips, '-c', where = 'post', label = 'Blue ships')
+    plot.step(time, red, '-r', where = 'post', label = 'Red strength')
+    plot.step(time, redShips, '-m', where = 'post', label = 'Red ships')
+    plot.ylabel('Strength')
+    plot.xlabel('Time')
+    plot.legend()
+    plot.annotate(blueRemaining,
+                  xy=(time[len(time)-1], blue[len(blue)-1]),
+                  xytext=(-15,10),
+                  textcoords='offset points')
+    plot.annotate(redRemaining,
+                  xy=(time[len(time)-1], red[len(red)-1]),
+                  xytext=(-15,10),
+                  textcoords='offset points')
+
+
+if __name__ == "__main__":
+    # The length of the time step will not alter the end result.
+    # Use only to determine the resolution of the graph.
+
+    time, blue, blueShips, red, redShips = chase_battle(8, 7, 0.2, 0.2, 12, 12, 0.0, 90.0, 0.01)
+    print(blue[len(blue)-1])
+    plot_battle(time, blue, blueShips, red, redShips)
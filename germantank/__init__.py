@@ -0,0 +1,6 @@
+"""The German Tank Problem. See germantankproblem.py, and estimators.py for the
+estimators and their evaluation over repeated experiments."""
+
+from .germantankproblem import estimate_tanks, experiment, generate_serials
+from .estimators import (StreamingEstimator, bayes_mean, bayes_median, confidence_interval, credible_interval,
+                         evaluate, evaluation_grid, mvue, sample_maxima, sample_serials)
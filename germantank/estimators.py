@@ -0,0 +1,334 @@
+""" Estimators for the German Tank Problem, and their evaluation over many
+    repeated experiments at once.
+
+    Serial numbers are sampled without replacement in memory proportional to
+    the sample size, never to the total number of tanks, so fleets of 10^9
+    serial numbers can be simulated. Every estimator works on the largest
+    serial number observed and the sample size (which together hold all the
+    information in the sample), given as NumPy arrays:
+
+    * mvue: the minimum-variance unbiased estimator, max + max / k - 1, as
+      used by estimate_tanks.
+    * bayes_mean and bayes_median: the posterior mean and median of the total
+      under an improper uniform prior.
+    * confidence_interval: the frequentist interval [max, max / alpha^(1/k)].
+    * credible_interval: the Bayesian interval with the same prior.
+
+    StreamingEstimator keeps the same estimates up to date as serial numbers
+    are observed one at a time.
+"""
+
+import math
+
+import numpy as np
+
+
+def sample_serials(total, samplesize, experiments, rng=None):
+    """ Return an array of shape (experiments, samplesize), each row a random
+    sample of distinct serial numbers out of 1 ... "total".
+
+    Serial numbers are drawn with replacement and rows with repeats are drawn
+    again, which leaves every sample equally likely. When repeats would be
+    common (samplesize squared larger than total), every serial number gets a
+    random key instead and the "samplesize" smallest keys are picked, a block
+    of rows at a time: O(total) per row, which is less than samplesize squared.
+    """
+    rng = np.random.default_rng(rng)
+    if samplesize > total:
+        raise ValueError("Cannot sample {} serial numbers out of {}".format(samplesize, total))
+    if samplesize * samplesize <= total:
+        samples = rng.integers(1, total + 1, size=(experiments, samplesize))
+        while True:
+            ordered = np.sort(samples, axis=1)
+            repeats = np.flatnonzero((np.diff(ordered, axis=1) == 0).any(axis=1))
+            if repeats.size == 0:
+                return samples
+            samples[repeats] = rng.integers(1, total + 1, size=(repeats.size, samplesize))
+
+    samples = np.empty((experiments, samplesize), dtype=np.int64)
+    rows = max(1, 2 ** 22 // total)
+    for start in range(0, experiments, rows):
+        keys = rng.random((min(rows, experiments - start), total))
+        picked = np.argpartition(keys, samplesize - 1, axis=1)[:, :samplesize]
+        samples[start:start + len(keys)] = picked + 1
+    return samples
+
+def sample_maxima(total, samplesize, experiments, rng=None, chunksize=100000):
+    """ Return the largest serial number of each of "experiments" random samples,
+    drawing the samples in chunks of "chunksize" experiments.
+    """
+    rng = np.random.default_rng(rng)
+    maxima = np.empty(experiments, dtype=np.int64)
+    for start in range(0, experiments, chunksize):
+        stop = min(start + chunksize, experiments)
+        maxima[start:stop] = sample_serials(total, samplesize, stop - start, rng).max(axis=1)
+    return maxima
+
+def mvue(maximum, samplesize):
+    """ The minimum-variance unbiased estimate of the total: max + max / k - 1."""
+    maximum = np.asarray(maximum, dtype=float)
+    return maximum + maximum / samplesize - 1
+
+def bayes_mean(maximum, samplesize):
+    """ The posterior mean of the total, (max - 1)(k - 1) / (k - 2). Only
+    finite for sample sizes of 3 or more.
+    """
+    maximum = np.asarray(maximum, dtype=float)
+    if samplesize < 3:
+        return np.full(maximum.shape, np.inf)
+    return (maximum - 1) * (samplesize - 1) / (samplesize - 2)
+
+_lgamma = np.frompyfunc(math.lgamma, 1, 1)
+
+def log_falling(x, terms):
+    """ The logarithm of x (x - 1) ... (x - terms + 1), for an array x. Long
+    products are taken as a difference of log-gamma functions."""
+    if terms > 256:
+        x = np.maximum(np.asarray(x, dtype=float), terms - 1)
+        return np.asarray(_lgamma(x + 1) - _lgamma(x - terms + 1), dtype=float)
+    total = np.zeros(np.shape(x))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for i in range(terms):
+            total += np.log(x - i)
+    return total
+
+def posterior_tail(n, maximum, samplesize):
+    """ The posterior probability that the total exceeds n, under an improper
+    uniform prior: C(max - 1, k - 1) / C(n, k - 1) for n >= max.
+    """
+    n, maximum = np.broadcast_arrays(np.asarray(n, dtype=float), np.asarray(maximum, dtype=float))
+    logtail = log_falling(maximum - 1, samplesize - 1) - log_falling(n, samplesize - 1)
+    return np.where(n < maximum, 1.0, np.exp(logtail))
+
+def posterior_quantile(probability, maximum, samplesize):
+    """ The smallest total n with a posterior probability of at most
+    "probability" of being exceeded, found by bisection over the integers.
+    Needs a sample size of 2 or more.
+    """
+    if samplesize < 2:
+        raise ValueError("The posterior needs a sample size of 2 or more")
+    maximum = np.asarray(maximum, dtype=float)
+    terms = samplesize - 1
+    logprobability = log_falling(maximum - 1, terms) - math.log(probability)
+
+    def enough(n):
+        return (n >= maximum) & (log_falling(n, terms) >= logprobability)
+
+    # Approximating the falling factorials by powers of their middle term
+    # gives a close first guess; widen the bracket around it until it holds.
+    middle = (terms - 1) / 2
+    guess = middle + (maximum - 1 - middle) * probability ** (-1 / terms)
+    gap = samplesize + 1
+    low = np.maximum(maximum, np.floor(guess) - gap)
+    high = np.maximum(maximum, np.ceil(guess) + gap)
+    while True:
+        short = ~enough(high)
+        wide = (low > maximum) & enough(low - 1)
+        if not (short.any() or wide.any()):
+            break
+        gap *= 2
+        high = np.where(short, high + gap, high)
+        low = np.where(wide, np.maximum(maximum, low - gap), low)
+    while (high > low).any():
+        middle = np.floor((low + high) / 2)
+        found = enough(middle)
+        high = np.where(found, middle, high)
+        low = np.where(found, low, middle + 1)
+    return high
+
+def bayes_median(maximum, samplesize):
+    """ The posterior median of the total."""
+    return posterior_quantile(0.5, maximum, samplesize)
+
+def credible_interval(maximum, samplesize, credibility=0.95):
+    """ The equal-tailed Bayesian credible interval for the total."""
+    tail = (1 - credibility) / 2
+    return posterior_quantile(1 - tail, maximum, samplesize), posterior_quantile(tail, maximum, samplesize)
+
+def confidence_interval(maximum, samplesize, confidence=0.95):
+    """ The frequentist confidence interval [max, max / (1 - confidence)^(1/k)]
+    for the total.
+    """
+    maximum = np.asarray(maximum, dtype=float)
+    return maximum, maximum * (1 - confidence) ** (-1 / samplesize)
+
+ESTIMATORS = {'mvue': mvue, 'bayes_mean': bayes_mean, 'bayes_median': bayes_median}
+
+def evaluate(total, samplesize, experiments, rng=None, confidence=0.95):
+    """ Run "experiments" repeated experiments with the given total and sample
+    size, and return a dict with the bias and mean squared error of every point
+    estimator, and the coverage and mean width of the confidence and credible
+    intervals.
+    """
+    maxima = sample_maxima(total, samplesize, experiments, rng)
+    results = {}
+    for name, estimator in ESTIMATORS.items():
+        if name == 'bayes_median' and samplesize < 2:
+            continue
+        error = estimator(maxima, samplesize) - total
+        results[name] = {'bias': float(error.mean()), 'mse': float((error ** 2).mean())}
+    intervals = {'confidence': confidence_interval(maxima, samplesize, confidence)}
+    if samplesize >= 2:
+        intervals['credible'] = credible_interval(maxima, samplesize, confidence)
+    for name, (lower, upper) in intervals.items():
+        results[name] = {'coverage': float(((lower <= total) & (total <= upper)).mean()),
+                         'width': float((upper - lower).mean())}
+    return results
+
+def evaluation_grid(totals, samplesizes, experiments, rng=None, confidence=0.95):
+    """ Evaluate the estimators over every (total, sample size) pair. Returns a
+    dict mapping each estimator to a dict of arrays of shape
+    (len(totals), len(samplesizes)): bias and mse for the point estimators,
+    coverage and width for the intervals. Pairs with a sample size larger than
+    the total are left as NaN.
+    """
+    rng = np.random.default_rng(rng)
+    grid = {}
+    for i, total in enumerate(totals):
+        for j, samplesize in enumerate(samplesizes):
+            if samplesize > total:
+                continue
+            for name, measures in evaluate(int(total), int(samplesize), experiments, rng, confidence).items():
+                for measure, value in measures.items():
+                    if name not in grid:
+                        grid[name] = {}
+                    if measure not in grid[name]:
+                        grid[name][measure] = np.full((len(totals), len(samplesizes)), math.nan)
+                    grid[name][measure][i, j] = value
+    return grid
+
+
+class StreamingEstimator:
+    """ An estimate of the total number of tanks, updated one serial number at
+    a time as the observations come in.
+
+    The state is the largest serial number seen, the number of distinct serial
+    numbers seen, and a compressed bitmap of the serial numbers seen, so that
+    repeated observations of the same tank are not counted twice. As in a
+    roaring bitmap, serial numbers are split into pages of 2^16: a page holds
+    the sorted offsets of its serial numbers (two bytes each) until it has
+    more than PAGE_LIMIT of them, and a plain bitmap (8 KB) from then on.
+    Memory is bounded by the smaller of about two bytes per distinct serial
+    number and one bit per serial number up to the largest, and no estimate
+    re-scans the observations.
+    """
+
+    PAGE_BITS = 16
+    PAGE_LIMIT = 4096
+
+    def __init__(self, serials=()):
+        self.maximum = 0
+        self.count = 0
+        self.pages = {}
+        self.update(serials)
+
+    def seen(self, serial):
+        """ Return whether the serial number has already been observed."""
+        page = self.pages.get((int(serial) - 1) >> self.PAGE_BITS)
+        if page is None:
+            return False
+        offset = (int(serial) - 1) & ((1 << self.PAGE_BITS) - 1)
+        if page.dtype == np.uint16:
+            index = np.searchsorted(page, offset)
+            return bool(index < len(page) and page[index] == offset)
+        return bool(page[offset >> 3] >> (offset & 7) & 1)
+
+    def add(self, serial):
+        """ Observe a single serial number. Returns whether it was new."""
+        return self.update(np.array([int(serial)], dtype=np.int64)) == 1
+
+    def merge_page(self, key, offsets):
+        """ Add an array of distinct, sorted offsets to a page, switching it to a
+        bitmap once it is dense. Returns the number of new serial numbers."""
+        page = self.pages.get(key)
+        if page is not None and page.dtype == np.uint8:
+            bits = np.unpackbits(page, bitorder='little')
+            new = int(np.count_nonzero(bits[offsets] == 0))
+            bits[offsets] = 1
+            self.pages[key] = np.packbits(bits, bitorder='little')
+            return new
+        if page is not None:
+            merged = np.sort(np.concatenate((page.astype(np.int64), offsets)))
+            offsets = merged[np.concatenate(([True], merged[1:] != merged[:-1]))]
+        new = len(offsets) - (0 if page is None else len(page))
+        if len(offsets) > self.PAGE_LIMIT:
+            bits = np.zeros(1 << self.PAGE_BITS, dtype=np.uint8)
+            bits[offsets] = 1
+            self.pages[key] = np.packbits(bits, bitorder='little')
+        else:
+            self.pages[key] = offsets.astype(np.uint16)
+        return new
+
+    def update(self, serials):
+        """ Observe a batch of serial numbers: a NumPy array, or any iterable such
+        as a list or a generator. Returns the number of new serial numbers.
+        """
+        if not isinstance(serials, np.ndarray):
+            serials = np.fromiter((int(serial) for serial in serials), dtype=np.int64)
+        serials = np.sort(serials.astype(np.int64).ravel())
+        if serials.size == 0:
+            return 0
+        if serials[0] < 1:
+            raise ValueError("Serial numbers start at 1, not {}".format(serials[0]))
+        serials = serials[np.concatenate(([True], serials[1:] != serials[:-1]))] - 1
+        keys = serials >> self.PAGE_BITS
+        starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+        offsets = np.split(serials & ((1 << self.PAGE_BITS) - 1), starts[1:])
+        new = sum(self.merge_page(key, page) for key, page in zip(keys[starts].tolist(), offsets))
+        self.count += new
+        self.maximum = max(self.maximum, int(serials[-1]) + 1)
+        return new
+
+    def read(self, path):
+        """ Observe every serial number in a text file, separated by whitespace or
+        commas. Returns the number of new serial numbers.
+        """
+        new = 0
+        with open(path) as observations:
+            for line in observations:
+                new += self.update(np.array(line.replace(',', ' ').split(), dtype=np.int64))
+        return new
+
+    def estimate(self):
+        """ Return the current estimate of the total, rounded as in estimate_tanks,
+        or None before the first observation.
+        """
+        if self.count == 0:
+            return None
+        return round(self.maximum + (self.maximum / self.count) - 1)
+
+    def credible_interval(self, credibility=0.95):
+        """ Return the current Bayesian credible interval for the total. Needs two
+        distinct serial numbers.
+        """
+        lower, upper = credible_interval(self.maximum, self.count, credibility)
+        return int(lower), int(upper)
+
+    def confidence_interval(self, confidence=0.95):
+        """ Return the current frequentist confidence interval for the total, or
+        None before the first observation.
+        """
+        if self.count == 0:
+            return None
+        lower, upper = confidence_interval(self.maximum, self.count, confidence)
+        return float(lower), float(upper)
+
+    def __str__(self):
+        """ Print method override."""
+        if self.count < 2:
+            return "{} serial numbers observed".format(self.count)
+        lower, upper = self.credible_interval()
+        return "{} serial numbers observed, largest {}: estimate {} (95% credible interval {} - {})".format(
+            self.count, self.maximum, self.estimate(), lower, upper)
+
+
+if __name__ == "__main__":
+    totals = [1500, 10 ** 6, 10 ** 9]
+    samplesizes = [5, 20, 100]
+    grid = evaluation_grid(totals, samplesizes, 100000, rng=1)
+    for name, measures in grid.items():
+        print(name)
+        for measure, values in measures.items():
+            print("  {}:".format(measure))
+            for total, row in zip(totals, values):
+                print("    {:>10}: {}".format(total, "  ".join("{:.4g}".format(value) for value in row)))
@@ -17,18 +17,28 @@
 
 from random import sample
 
+import numpy as np
+
     
 def generate_serials(total, samplesize):
-    """ Generate a list of consecutive serial numbers up to the specified limit
-    ("total") and return a random sample out of it, of size "sample".
+    """ Return a random sample of size "samplesize" out of the consecutive serial
+    numbers up to the specified limit ("total"). The serial numbers are sampled
+    from a range, so the full list is never built.
     """
     
-    serialnumbers = [i+1 for i in range(total)]
-    randomised =  sample(serialnumbers, samplesize)
+    randomised = sample(range(1, total + 1), samplesize)
     return randomised
     
 def estimate_tanks(sample):
-    estimate = max(sample) + (max(sample) / len(sample)) - 1
+    """ Estimate the total number of tanks from a sample of serial numbers. Given
+    a 2D NumPy array, each row is taken as the sample of a separate experiment,
+    and an array of estimates is returned.
+    """
+    if isinstance(sample, np.ndarray) and sample.ndim == 2:
+        maximum = sample.max(axis=1)
+        return np.rint(maximum + (maximum / sample.shape[1]) - 1).astype(np.int64)
+    maximum = max(sample)
+    estimate = maximum + (maximum / len(sample)) - 1
     return round(estimate)
 
 def experiment(realtanks, samplesize):
@@ -55,4 +65,5 @@ def experiment(realtanks, samplesize):
     
     print("Error: {}%".format(percentageoff))
 
-experiment(1500, 20)
\ No newline at end of file
+if __name__ == "__main__":
+    experiment(1500, 20)
@@ -0,0 +1,5 @@
+"""Lanchester's square and linear laws. See lanchester.py; lanchesterSquare.py and
+lanchesterLinear.py are plotting scripts."""
+
+from .lanchester import (DenseSolution, PiecewiseSolution, Solution, SquareSolution, battle_grid, linear_law,
+                         square_law)
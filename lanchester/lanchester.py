@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Solvers for the Lanchester Square and Linear Laws, as used by the
+lanchesterSquare.py and lanchesterLinear.py scripts.
+
+Each solver returns a Solution object, which can be queried for the
+strength of both sides at any time, and which knows the time at which
+one of the sides is annihilated, if any. Two methods are offered:
+
+* 'exact': the closed-form solution. The Square Law has an analytic
+  hyperbolic solution, and the Linear Law is piecewise linear between
+  the moments at which the number of units in contact changes. Queries
+  cost O(1) and O(log n) respectively.
+* 'adaptive': an adaptive Dormand-Prince Runge-Kutta integration with
+  dense output, stopping at the annihilation time. Queries cost O(log n)
+  in the number of accepted steps.
+
+As in the scripts, a side's strength never drops below zero, and the
+battle stops when one of the sides is annihilated.
+
+"""
+
+import math
+
+import numpy
+
+
+class Solution:
+    """The course of a Lanchester battle.
+
+    Attributes:
+        * blue0, red0 (float): the initial strengths.
+        * annihilationTime (float): the time at which one side is wiped out.
+          Infinite if neither side ever is.
+        * winner (str): 'blue', 'red', or None if there is no annihilation.
+        * blueFinal, redFinal (float): the strengths once the battle is over.
+    """
+
+    def strengths(self, time):
+        """Return the (blue, red) strengths at a given time, or at each time
+        of an array of times."""
+        times = numpy.asarray(time, dtype=float)
+        blue, red = self._evaluate(numpy.atleast_1d(times))
+        if times.ndim == 0:
+            return float(blue[0]), float(red[0])
+        return blue.reshape(times.shape), red.reshape(times.shape)
+
+    def _set_outcome(self, annihilationTime, blueFinal, redFinal):
+        self.annihilationTime = annihilationTime
+        self.blueFinal = blueFinal
+        self.redFinal = redFinal
+        if annihilationTime == math.inf:
+            self.winner = None
+        elif redFinal > 0:
+            self.winner = 'red'
+        elif blueFinal > 0:
+            self.winner = 'blue'
+        else:
+            self.winner = None
+
+
+class SquareSolution(Solution):
+    """Closed-form solution of the Square Law:
+
+        dBlue/dt = -redLethality * red
+        dRed/dt = -blueLethality * blue
+    """
+
+    def __init__(self, blue, red, blueLethality, redLethality):
+        self.blue0 = blue
+        self.red0 = red
+        self.blueLethality = blueLethality
+        self.redLethality = redLethality
+        self.gamma = math.sqrt(blueLethality * redLethality)
+
+        if blue <= 0 or red <= 0:
+            self._set_outcome(0.0, max(blue, 0), max(red, 0))
+        elif self.gamma == 0:
+            # Only one side (if any) inflicts casualties, at a constant rate.
+            blueTime = blue / (redLethality * red) if redLethality > 0 else math.inf
+            redTime = red / (blueLethality * blue) if blueLethality > 0 else math.inf
+            if blueTime < redTime:
+                self._set_outcome(blueTime, 0.0, red)
+            elif redTime < blueTime:
+                self._set_outcome(redTime, blue, 0.0)
+            else:
+                self._set_outcome(math.inf, blue, red)
+        else:
+            # The Square Law state equation: the side with the larger fighting
+            # strength (lethality times strength squared) wins.
+            blueFighting = blueLethality * blue ** 2
+            redFighting = redLethality * red ** 2
+            if blueFighting > redFighting:
+                ratio = red * math.sqrt(redLethality) / (blue * math.sqrt(blueLethality))
+                self._set_outcome(math.atanh(ratio) / self.gamma,
+                                  math.sqrt((blueFighting - redFighting) / blueLethality), 0.0)
+            elif redFighting > blueFighting:
+                ratio = blue * math.sqrt(blueLethality) / (red * math.sqrt(redLethality))
+                self._set_outcome(math.atanh(ratio) / self.gamma,
+                                  0.0, math.sqrt((redFighting - blueFighting) / redLethality))
+            else:
+                self._set_outcome(math.inf, 0.0, 0.0)
+
+    def _evaluate(self, times):
+        times = numpy.clip(times, 0, self.annihilationTime)
+        if self.annihilationTime == 0:
+            blue = numpy.full(times.shape, float(self.blueFinal))
+            red = numpy.full(times.shape, float(self.redFinal))
+        elif self.gamma == 0:
+            blue = self.blue0 - self.redLethality * self.red0 * times
+            red = self.red0 - self.blueLethality * self.blue0 * times
+        else:
+            # Exponential form of the hyperbolic solution, which stays accurate
+            # when both sides decay together.
+            blueScale = math.sqrt(self.redLethality / self.blueLethality)
+            growing = numpy.exp(self.gamma * times) / 2
+            decaying = numpy.exp(-self.gamma * times) / 2
+            blue = (self.blue0 - blueScale * self.red0) * growing + (self.blue0 + blueScale * self.red0) * decaying
+            red = (self.red0 - self.blue0 / blueScale) * growing + (self.red0 + self.blue0 / blueScale) * decaying
+        ended = times >= self.annihilationTime
+        blue = numpy.where(ended, self.blueFinal, numpy.maximum(blue, 0))
+        red = numpy.where(ended, self.redFinal, numpy.maximum(red, 0))
+        return blue, red
+
+
+class PiecewiseSolution(Solution):
+    """Exact solution of the Linear Law with a frontage constraint:
+
+        dBlue/dt = -redLethality * frontage
+        dRed/dt = -blueLethality * frontage
+
+    where the frontage is the number of units in contact, limited by the
+    remaining units of each side: min(frontage, ceil(blue), ceil(red)). The
+    attrition rates are constant between the moments at which a side drops
+    below the current frontage, which are stored as breakpoints.
+    """
+
+    def __init__(self, blue, red, blueLethality, redLethality, frontage=None):
+        self.blue0 = blue
+        self.red0 = red
+        limit = math.inf if frontage is None else frontage
+        times = [0.0]
+        blues = [float(blue)]
+        reds = [float(red)]
+        blueRates = []
+        redRates = []
+        time = 0.0
+        while blue > 0 and red > 0:
+            width = min(limit, math.ceil(blue), math.ceil(red))
+            blueRate = width * redLethality
+            redRate = width * blueLethality
+            # The frontage changes when either side drops to one unit below it.
+            level = width - 1
+            blueStep = (blue - level) / blueRate if blueRate > 0 else math.inf
+            redStep = (red - level) / redRate if redRate > 0 else math.inf
+            step = min(blueStep, redStep)
+            if step == math.inf:
+                break
+            time += step
+            blue = level if blueStep == step else max(level, blue - blueRate * step)
+            red = level if redStep == step else max(level, red - redRate * step)
+            times.append(time)
+            blues.append(float(blue))
+            reds.append(float(red))
+            blueRates.append(blueRate)
+            redRates.append(redRate)
+
+        self.times = numpy.array(times)
+        self.blues = numpy.array(blues)
+        self.reds = numpy.array(reds)
+        self.blueRates = numpy.array(blueRates + [0.0])
+        self.redRates = numpy.array(redRates + [0.0])
+        ended = blue <= 0 or red <= 0
+        self._set_outcome(time if ended else math.inf, max(blue, 0.0), max(red, 0.0))
+
+    def _evaluate(self, times):
+        times = numpy.maximum(times, 0)
+        index = numpy.searchsorted(self.times, times, side='right') - 1
+        elapsed = times - self.times[index]
+        blue = numpy.maximum(self.blues[index] - self.blueRates[index] * elapsed, 0)
+        red = numpy.maximum(self.reds[index] - self.redRates[index] * elapsed, 0)
+        return blue, red
+
+
+# Dormand-Prince 5(4) coefficients.
+_DP_C = (0, 1/5, 3/10, 4/5, 8/9, 1, 1)
+_DP_A = ((),
+         (1/5,),
+         (3/40, 9/40),
+         (44/45, -56/15, 32/9),
+         (19372/6561, -25360/2187, 64448/6561, -212/729),
+         (9017/3168, -355/33, 46732/5247, 49/176, -5103/18656),
+         (35/384, 0, 500/1113, 125/192, -2187/6784, 11/84))
+_DP_E = (71/57600, 0, -71/16695, 71/1920, -17253/339200, 22/525, -1/40)
+
+
+class DenseSolution(Solution):
+    """Adaptive Runge-Kutta (Dormand-Prince 5(4)) solution of a two-sided
+    attrition system, with cubic Hermite dense output between steps and
+    detection of the time at which either side is annihilated.
+
+    Arguments:
+        * derivative (function): maps (blue, red) to their time derivatives.
+        * timeEnd (float): integrate no further than this time. If infinite,
+          integrate until annihilation, or until both sides fall below atol.
+        * rtol, atol (float): relative and absolute error tolerances.
+    """
+
+    def __init__(self, blue, red, derivative, timeEnd=math.inf, rtol=1e-8, atol=1e-10, maxSteps=100000):
+        self.blue0 = blue
+        self.red0 = red
+        y = numpy.array([blue, red], dtype=float)
+        slope = numpy.asarray(derivative(*y), dtype=float)
+        times = [0.0]
+        values = [y]
+        slopes = [slope]
+        annihilationTime = 0.0 if min(blue, red) <= 0 else math.inf
+        time = 0.0
+        step = min(0.01 * (1 + abs(y).max()) / max(abs(slope).max(), 1e-300), timeEnd)
+
+        while annihilationTime == math.inf and time < timeEnd and len(times) < maxSteps:
+            if abs(y).max() < atol:
+                break
+            step = min(step, timeEnd - time)
+            stages = [slope]
+            for i in range(1, 7):
+                increment = sum(a * k for a, k in zip(_DP_A[i], stages))
+                stages.append(numpy.asarray(derivative(*(y + step * increment)), dtype=float))
+            yNew = y + step * sum(a * k for a, k in zip(_DP_A[6], stages))
+            error = step * sum(e * k for e, k in zip(_DP_E, stages))
+            scale = atol + rtol * numpy.maximum(abs(y), abs(yNew))
+            norm = math.sqrt(numpy.mean((error / scale) ** 2))
+            if norm > 1:
+                step *= max(0.2, 0.9 * norm ** -0.2)
+                continue
+
+            slopeNew = stages[6]
+            if yNew.min() <= 0:
+                # Locate the annihilation on the interpolant, and stop there.
+                eventTime, yNew = self._locate_event(time, step, y, yNew, slope, slopeNew)
+                yNew = numpy.maximum(yNew, 0.0)
+                annihilationTime = eventTime
+                time = eventTime
+            else:
+                time += step
+            y = yNew
+            slope = slopeNew
+            times.append(time)
+            values.append(y)
+            slopes.append(slope)
+            step *= min(5.0, 0.9 * norm ** -0.2) if norm > 0 else 5.0
+
+        self.times = numpy.array(times)
+        self.values = numpy.array(values)
+        self.slopes = numpy.array(slopes)
+        self._set_outcome(annihilationTime, max(y[0], 0.0), max(y[1], 0.0))
+
+    @staticmethod
+    def _hermite(theta, step, y0, y1, slope0, slope1):
+        h00 = (1 + 2 * theta) * (1 - theta) ** 2
+        h10 = theta * (1 - theta) ** 2
+        h01 = theta ** 2 * (3 - 2 * theta)
+        h11 = theta ** 2 * (theta - 1)
+        return h00 * y0 + h10 * step * slope0 + h01 * y1 + h11 * step * slope1
+
+    def _locate_event(self, time, step, y0, y1, slope0, slope1):
+        """Bisect the interpolant over the last step for the earliest time at
+        which a side reaches zero. Returns the time and the strengths then."""
+        low, high = 0.0, 1.0
+        for _ in range(60):
+            middle = (low + high) / 2
+            if self._hermite(middle, step, y0, y1, slope0, slope1).min() <= 0:
+                high = middle
+            else:
+                low = middle
+        return time + high * step, self._hermite(high, step, y0, y1, slope0, slope1)
+
+    def _evaluate(self, times):
+        times = numpy.clip(times, 0, self.times[-1])
+        index = numpy.clip(numpy.searchsorted(self.times, times, side='right') - 1, 0, len(self.times) - 2)
+        if len(self.times) == 1:
+            values = numpy.repeat(self.values[:1], len(times), axis=0)
+        else:
+            step = (self.times[index + 1] - self.times[index])[:, None]
+            theta = (times - self.times[index])[:, None] / step
+            values = self._hermite(theta, step, self.values[index], self.values[index + 1],
+                                   self.slopes[index], self.slopes[index + 1])
+        values = numpy.maximum(values, 0)
+        return values[:, 0], values[:, 1]
+
+
+def square_law(blue, red, blueLethality, redLethality, method='exact', **options):
+    """Solve a Square Law battle.
+
+    Arguments:
+        * blue, red (float): initial strengths.
+        * blueLethality (float): red casualties per blue unit per time unit.
+        * redLethality (float): blue casualties per red unit per time unit.
+        * method (str): 'exact' or 'adaptive'. Further keyword arguments
+          (timeEnd, rtol, atol) are passed to the adaptive solver.
+    """
+    if method == 'exact':
+        return SquareSolution(blue, red, blueLethality, redLethality)
+    if method == 'adaptive':
+        def derivative(b, r):
+            return (-redLethality * max(r, 0), -blueLethality * max(b, 0))
+        return DenseSolution(blue, red, derivative, **options)
+    raise ValueError("Unknown method: {}".format(method))
+
+
+def linear_law(blue, red, blueLethality, redLethality, frontage=None, method='exact', **options):
+    """Solve a Linear Law battle with an optional frontage constraint.
+
+    Arguments:
+        * blue, red (float): initial strengths.
+        * blueLethality (float): red casualties per engaged blue unit per time unit.
+        * redLethality (float): blue casualties per engaged red unit per time unit.
+        * frontage (int): the maximum number of units engaged at once. If None,
+          it is only limited by the remaining units of the smaller side.
+        * method (str): 'exact' or 'adaptive'. Further keyword arguments
+          (timeEnd, rtol, atol) are passed to the adaptive solver.
+    """
+    if method == 'exact':
+        return PiecewiseSolution(blue, red, blueLethality, redLethality, frontage)
+    if method == 'adaptive':
+        limit = math.inf if frontage is None else frontage
+
+        def derivative(b, r):
+            width = max(0, min(limit, math.ceil(b), math.ceil(r)))
+            return (-redLethality * width, -blueLethality * width)
+        return DenseSolution(blue, red, derivative, **options)
+    raise ValueError("Unknown method: {}".format(method))
+
+
+def _chunks(arrays, chunkSize):
+    """Broadcast a list of arrays together and yield (slice, flat chunks)
+    pieces of at most chunkSize elements, without materialising the full
+    broadcast inputs."""
+    arrays = [numpy.asarray(array, dtype=float) for array in arrays]
+    shape = numpy.broadcast_shapes(*(array.shape for array in arrays))
+    views = [numpy.broadcast_to(array, shape) for array in arrays]
+    size = int(numpy.prod(shape))
+    for start in range(0, size, chunkSize):
+        stop = min(start + chunkSize, size)
+        yield slice(start, stop), [view.flat[start:stop] for view in views]
+
+
+def _square_batch(blue, red, blueLethality, redLethality, timeEnd):
+    """Closed-form Square Law outcome for flat arrays of battles."""
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        gamma = numpy.sqrt(blueLethality * redLethality)
+        blueFighting = blueLethality * blue ** 2
+        redFighting = redLethality * red ** 2
+        blueWins = blueFighting > redFighting
+        redWins = redFighting > blueFighting
+
+        # Annihilation time, from the hyperbolic solution (or the linear one
+        # when only one side inflicts casualties).
+        ratio = numpy.where(blueWins,
+                            red * numpy.sqrt(redLethality) / (blue * numpy.sqrt(blueLethality)),
+                            blue * numpy.sqrt(blueLethality) / (red * numpy.sqrt(redLethality)))
+        hyperbolic = numpy.arctanh(ratio) / gamma
+        linear = numpy.where(blueWins, red / (blueLethality * blue), blue / (redLethality * red))
+        time = numpy.where(gamma > 0, hyperbolic, linear)
+        time = numpy.where(blueWins | redWins, time, numpy.inf)
+        time = numpy.where((blue <= 0) | (red <= 0), 0.0, time)
+
+        # Strengths at the end of the battle, or at timeEnd if it comes first.
+        stop = numpy.minimum(time, timeEnd)
+        blueScale = numpy.sqrt(redLethality / blueLethality)
+        growing = numpy.exp(gamma * stop) / 2
+        decaying = numpy.exp(-gamma * stop) / 2
+        blueEnd = numpy.where(gamma > 0,
+                              (blue - blueScale * red) * growing + (blue + blueScale * red) * decaying,
+                              blue - numpy.where(redLethality * red > 0, redLethality * red * stop, 0))
+        redEnd = numpy.where(gamma > 0,
+                             (red - blue / blueScale) * growing + (red + blue / blueScale) * decaying,
+                             red - numpy.where(blueLethality * blue > 0, blueLethality * blue * stop, 0))
+        blueEnd = numpy.where(stop == 0, blue, blueEnd)
+        redEnd = numpy.where(stop == 0, red, redEnd)
+        # Use the state equation for the survivors of a finished battle.
+        ended = time <= timeEnd
+        blueEnd = numpy.where(ended & blueWins & (gamma > 0), numpy.sqrt((blueFighting - redFighting) / blueLethality), blueEnd)
+        redEnd = numpy.where(ended & redWins & (gamma > 0), numpy.sqrt((redFighting - blueFighting) / redLethality), redEnd)
+        blueEnd = numpy.where(ended & redWins, 0.0, blueEnd)
+        redEnd = numpy.where(ended & blueWins, 0.0, redEnd)
+        blueEnd = numpy.where(numpy.isinf(time) & (gamma > 0) & numpy.isinf(timeEnd), 0.0, blueEnd)
+        redEnd = numpy.where(numpy.isinf(time) & (gamma > 0) & numpy.isinf(timeEnd), 0.0, redEnd)
+    return numpy.maximum(blueEnd, 0), numpy.maximum(redEnd, 0), time
+
+
+def _linear_batch(blue, red, blueLethality, redLethality, frontage, timeEnd):
+    """Piecewise-exact Linear Law outcome for flat arrays of battles. All
+    battles still running advance to their next frontage change together."""
+    blue = blue.copy()
+    red = red.copy()
+    time = numpy.zeros(len(blue))
+    running = (blue > 0) & (red > 0)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        while running.any():
+            width = numpy.minimum(frontage, numpy.minimum(numpy.ceil(blue), numpy.ceil(red)))
+            blueRate = width * redLethality
+            redRate = width * blueLethality
+            level = width - 1
+            blueStep = numpy.where(blueRate > 0, (blue - level) / blueRate, numpy.inf)
+            redStep = numpy.where(redRate > 0, (red - level) / redRate, numpy.inf)
+            step = numpy.minimum(numpy.minimum(blueStep, redStep), timeEnd - time)
+            # Battles in which nobody inflicts casualties, or past timeEnd, stop.
+            running &= numpy.isfinite(step) & (step > 0)
+            step = numpy.where(running, step, 0.0)
+            blue = numpy.where(running & (blueStep == step), level, numpy.maximum(level, blue - blueRate * step))
+            red = numpy.where(running & (redStep == step), level, numpy.maximum(level, red - redRate * step))
+            time += step
+            running &= (blue > 0) & (red > 0)
+    ended = (blue <= 0) | (red <= 0)
+    return numpy.maximum(blue, 0), numpy.maximum(red, 0), numpy.where(ended, time, numpy.inf)
+
+
+def battle_grid(blue, red, blueLethality, redLethality, law='square', frontage=None,
+                timeEnd=math.inf, chunkSize=1000000):
+    """Evaluate many battles at once.
+
+    The arguments are NumPy arrays (or scalars) broadcast against each other,
+    so a grid of combinations can be given as arrays of different shapes.
+    Battles are evaluated in chunks of chunkSize, to keep memory bounded.
+
+    Arguments:
+        * blue, red, blueLethality, redLethality: as in square_law.
+        * law (str): 'square' (closed form) or 'linear' (piecewise exact).
+        * frontage: the Linear Law frontage cap. None for no cap.
+        * timeEnd (float): stop battles still running at this time.
+
+    Returns a dict of arrays with the broadcast shape:
+        * 'blue', 'red': the strengths at the end of the battle (or at timeEnd).
+        * 'winner': 1 if blue annihilates red by timeEnd, -1 if red
+          annihilates blue, and 0 otherwise.
+        * 'time': the annihilation time, infinite if no side is annihilated
+          by timeEnd.
+    """
+    if law not in ('square', 'linear'):
+        raise ValueError("Unknown law: {}".format(law))
+    arrays = [blue, red, blueLethality, redLethality]
+    if law == 'linear':
+        arrays.append(numpy.inf if frontage is None else frontage)
+    shape = numpy.broadcast_shapes(*(numpy.shape(array) for array in arrays))
+    result = {key: numpy.empty(shape) for key in ('blue', 'red', 'time')}
+    result['winner'] = numpy.empty(shape, dtype=numpy.int8)
+
+    for part, chunk in _chunks(arrays, chunkSize):
+        if law == 'square':
+            blueEnd, redEnd, time = _square_batch(*chunk, timeEnd)
+        else:
+            blueEnd, redEnd, time = _linear_batch(*chunk, timeEnd)
+        result['blue'].flat[part] = blueEnd
+        result['red'].flat[part] = redEnd
+        decided = numpy.isfinite(time) & (time <= timeEnd)
+        result['time'].flat[part] = numpy.where(decided, time, numpy.inf)
+        result['winner'].flat[part] = numpy.where(decided & (blueEnd > 0), 1,
+                                                  numpy.where(decided & (redEnd > 0), -1, 0))
+    return result
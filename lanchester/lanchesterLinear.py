@@ -5,71 +5,69 @@ Created on Fri Aug 18 2017
 
 @author: Alvaro Radigales
 
-A simple Python implementation of the Lanchester Linear Law. Force
-strength for each time pulse of the simulation is stored in a NumPy
-array, and later plotted using MatPlotLib.
+A simple Python implementation of the Lanchester Linear Law. The battle
+is solved exactly by the lanchester module, and force strength is
+sampled at each time pulse into a NumPy array, later plotted using
+MatPlotLib.
 
 """
 
 import numpy
 
-import matplotlib.pyplot as plot
-
-from math import ceil
-
-# The length of the time step will not alter the end result.
-# Use only to determine the resolution of the graph.
-
-timeStart = 0.0
-timeEnd = 10.0
-timeStep = 0.01
-
-steps = int((timeEnd - timeStart) / timeStep)
-
-# Initialise numpy arrays covering each step of the simulation.
-
-blue = numpy.zeros(steps)
-red = numpy.zeros(steps)
-time = numpy.zeros(steps)
-
-# To remove the frontage constraint, change the frontage variable to
-# the smaller remaining force, both in its declaration and in the loop.
-
-blue[0] = 42
-red[0] = 30
-frontage = 5
-
-blueLethality = 1
-redLethality = 1
-
-time[0] = timeStart
-
-for i in range(steps -1):
-    frontage = min(frontage, ceil(red[i]), ceil(blue[i]))
-    blue[i+1] = max(0, blue[i] - timeStep * (frontage * redLethality))
-    red[i+1] = max(0, red[i] - timeStep * (frontage * blueLethality))
-    time[i+1] = time[i] + timeStep
-    
-# Remaining forces at the end of the simulation, for plot label purposes.
-    
-blueRemaining = int(blue[len(blue)-1])
-redRemaining = int(red[len(red)-1])
-
-# Plot code.
-    
-plot.figure()
-plot.step(time, blue, '-b', where = 'post', label = 'Blue army')
-plot.step(time, red, '-r', where = 'post', label = 'Red army')
-plot.ylabel('Strength')
-plot.xlabel('Time')
-plot.legend()
-plot.annotate(blueRemaining,
-              xy=(timeEnd, blue[len(blue)-1]),
-              xytext=(-15,10),
-              textcoords='offset points')
-plot.annotate(redRemaining,
-              xy=(timeEnd, red[len(red)-1]),
-              xytext=(-15,10),
-              textcoords='offset points')
-              
-plot.show()
\ No newline at end of file
+try:
+    from .lanchester import linear_law
+except ImportError:
+    from lanchester import linear_law
+
+if __name__ == "__main__":
+    import matplotlib.pyplot as plot
+
+    # The length of the time step will not alter the end result.
+    # Use only to determine the resolution of the graph.
+
+    timeStart = 0.0
+    timeEnd = 10.0
+    timeStep = 0.01
+
+    steps = int((timeEnd - timeStart) / timeStep)
+
+    # To remove the frontage constraint, set the frontage variable to None.
+    # The frontage is then the smaller remaining force.
+
+    blueStart = 42
+    redStart = 30
+    frontage = 5
+
+    blueLethality = 1
+    redLethality = 1
+
+    # Solve the battle, and sample both forces at each step of the graph.
+    # Use method = 'adaptive' for the Runge-Kutta solver instead.
+
+    battle = linear_law(blueStart, redStart, blueLethality, redLethality, frontage, method = 'exact')
+    time = timeStart + timeStep * numpy.arange(steps)
+    blue, red = battle.strengths(time)
+
+    # Remaining forces at the end of the simulation, for plot label purposes.
+
+    blueRemaining = int(blue[len(blue)-1])
+    redRemaining = int(red[len(red)-1])
+
+    # Plot code.
+
+    plot.figure()
+    plot.step(time, blue, '-b', where = 'post', label = 'Blue army')
+    plot.step(time, red, '-r', where = 'post', label = 'Red army')
+    plot.ylabel('Strength')
+    plot.xlabel('Time')
+    plot.legend()
+    plot.annotate(blueRemaining,
+                  xy=(timeEnd, blue[len(blue)-1]),
+                  xytext=(-15,10),
+                  textcoords='offset points')
+    plot.annotate(redRemaining,
+                  xy=(timeEnd, red[len(red)-1]),
+                  xytext=(-15,10),
+                  textcoords='offset points')
+
+    plot.show()
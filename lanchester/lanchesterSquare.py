@@ -5,69 +5,70 @@ Created on Fri Aug 18 2017
 
 @author: Alvaro Radigales
 
-A simple Python implementation of the Lanchester Square Law. Force
-strength for each time pulse of the simulation is stored in a NumPy
-array, and later plotted using MatPlotLib.
+A simple Python implementation of the Lanchester Square Law. The battle
+is solved in closed form by the lanchester module, and force strength
+is sampled at each time pulse into a NumPy array, later plotted using
+MatPlotLib.
 
 """
 
 import numpy
 
-import matplotlib.pyplot as plot
-import seaborn as sns
-
-# The length of the time step will not alter the end result.
-# Use only to determine the resolution of the graph.
-
-timeStart = 0.0
-timeEnd = 6.0
-timeStep = 0.01
-
-steps = int((timeEnd - timeStart) / timeStep)
-
-# Initialise numpy arrays covering each step of the simulation.
-
-blue = numpy.zeros(steps)
-red = numpy.zeros(steps)
-time = numpy.zeros(steps)
-
-# Iwo Jima sample values: blue (US) = 54000; red (Japanese) = 21500;
-# blueLethality = 0.0106; redLethality = 0.0544
-
-blue[0] = 1000
-red[0] = 500
-
-blueLethality = 0.1
-redLethality = 0.1
-
-time[0] = timeStart
-
-for i in range(steps -1):
-    blue[i+1] = max(0, blue[i] - timeStep * (red[i] * redLethality))
-    red[i+1] = max(0, red[i] - timeStep * (blue[i] * blueLethality))
-    time[i+1] = time[i] + timeStep
-    
-# Remaining forces at the end of the simulation, for plot label purposes.
-    
-blueRemaining = int(blue[len(blue)-1])
-redRemaining = int(red[len(red)-1])
-
-# Plot code.
-sns.set_theme(font='Times New Roman')
-plot.figure()
-plot.title("Lanchester Square Law", fontweight='bold', fontsize=16)
-plot.step(time, blue, '-b', where = 'post', label = 'Blue army')
-plot.step(time, red, '-r', where = 'post', label = 'Red army')
-plot.ylabel('Strength')
-plot.xlabel('Time')
-plot.legend()
-plot.annotate(blueRemaining,
-              xy=(timeEnd, blue[len(blue)-1]),
-              xytext=(-15,10),
-              textcoords='offset points')
-plot.annotate(redRemaining,
-              xy=(timeEnd, red[len(red)-1]),
-              xytext=(-15,10),
-              textcoords='offset points')
-              
-plot.show()
\ No newline at end of file
+try:
+    from .lanchester import square_law
+except ImportError:
+    from lanchester import square_law
+
+if __name__ == "__main__":
+    import matplotlib.pyplot as plot
+    import seaborn as sns
+
+    # The length of the time step will not alter the end result.
+    # Use only to determine the resolution of the graph.
+
+    timeStart = 0.0
+    timeEnd = 6.0
+    timeStep = 0.01
+
+    steps = int((timeEnd - timeStart) / timeStep)
+
+    # Iwo Jima sample values: blue (US) = 54000; red (Japanese) = 21500;
+    # blueLethality = 0.0106; redLethality = 0.0544
+
+    blueStart = 1000
+    redStart = 500
+
+    blueLethality = 0.1
+    redLethality = 0.1
+
+    # Solve the battle, and sample both forces at each step of the graph.
+    # Use method = 'adaptive' for the Runge-Kutta solver instead.
+
+    battle = square_law(blueStart, redStart, blueLethality, redLethality, method = 'exact')
+    time = timeStart + timeStep * numpy.arange(steps)
+    blue, red = battle.strengths(time)
+
+    # Remaining forces at the end of the simulation, for plot label purposes.
+
+    blueRemaining = int(blue[len(blue)-1])
+    redRemaining = int(red[len(red)-1])
+
+    # Plot code.
+    sns.set_theme(font='Times New Roman')
+    plot.figure()
+    plot.title("Lanchester Square Law", fontweight='bold', fontsize=16)
+    plot.step(time, blue, '-b', where = 'post', label = 'Blue army')
+    plot.step(time, red, '-r', where = 'post', label = 'Red army')
+    plot.ylabel('Strength')
+    plot.xlabel('Time')
+    plot.legend()
+    plot.annotate(blueRemaining,
+                  xy=(timeEnd, blue[len(blue)-1]),
+                  xytext=(-15,10),
+                  textcoords='offset points')
+    plot.annotate(redRemaining,
+                  xy=(timeEnd, red[len(red)-1]),
+                  xytext=(-15,10),
+                  textcoords='offset points')
+
+    plot.show()
@@ -0,0 +1,4 @@
+"""Lanchester's square law with reinforcements. See lanchesterLogic.py; lanchesterBattle.py is
+an example script."""
+
+from .lanchesterLogic import Battle, Side
@@ -9,8 +9,9 @@
 # @author: Alvaro Radigales, 2018
 # ================================================
 
+import math
+
 import numpy as np
-import matplotlib.pyplot as plt
 
 
 class Side:
@@ -34,13 +35,64 @@ class Side:
         self.strength -= min(amount, self.strength)
 
 
+def square_law_outcome(blue, red, blue_coefficient, red_coefficient):
+    """Return the time until one side is annihilated, and the strengths of both sides at that
+    moment, for a square law battle with no reinforcements. The time is infinite if neither side
+    is ever annihilated (the strengths are then the limits as time goes to infinity)."""
+    if blue <= 0 or red <= 0:
+        return 0.0, max(blue, 0.0), max(red, 0.0)
+
+    blue_fighting = blue_coefficient * blue ** 2
+    red_fighting = red_coefficient * red ** 2
+    gamma = math.sqrt(blue_coefficient * red_coefficient)
+
+    if gamma == 0:
+        # At most one side inflicts casualties, at a constant rate
+        blue_time = blue / (red_coefficient * red) if red_coefficient > 0 else math.inf
+        red_time = red / (blue_coefficient * blue) if blue_coefficient > 0 else math.inf
+        if blue_time < red_time:
+            return blue_time, 0.0, red
+        if red_time < blue_time:
+            return red_time, blue, 0.0
+        return math.inf, blue, red
+
+    if blue_fighting > red_fighting:
+        ratio = red * math.sqrt(red_coefficient) / (blue * math.sqrt(blue_coefficient))
+        return math.atanh(ratio) / gamma, math.sqrt((blue_fighting - red_fighting) / blue_coefficient), 0.0
+    if red_fighting > blue_fighting:
+        ratio = blue * math.sqrt(blue_coefficient) / (red * math.sqrt(red_coefficient))
+        return math.atanh(ratio) / gamma, 0.0, math.sqrt((red_fighting - blue_fighting) / red_coefficient)
+    return math.inf, 0.0, 0.0
+
+
+def square_law_strengths(blue, red, blue_coefficient, red_coefficient, elapsed):
+    """Return the strengths of both sides after 'elapsed' time units of a square law battle,
+    before either side is annihilated. All arguments may be numpy arrays."""
+    gamma = np.sqrt(blue_coefficient * red_coefficient)
+    if gamma == 0:
+        return blue - red_coefficient * red * elapsed, red - blue_coefficient * blue * elapsed
+    blue_scale = np.sqrt(red_coefficient / blue_coefficient)
+    growing = np.exp(gamma * elapsed) / 2
+    decaying = np.exp(-gamma * elapsed) / 2
+    blue_now = (blue - blue_scale * red) * growing + (blue + blue_scale * red) * decaying
+    red_now = (red - blue / blue_scale) * growing + (red + blue / blue_scale) * decaying
+    return blue_now, red_now
+
+
 class Battle:
     """A Lanchester battle between two fighting sides.
     - name (string): for labelling purposes only, has no effect in the calculations.
     - blue (side): the side operating as 'blue' in the battle.
     - red (side): the side operating as 'red' in the battle.
     - duration: how many time increments will be simulated.
-    – precision (fraction): battle resolution precision. 0.5 means two data points per time increment, 1 means one, etc.
+    – precision (fraction): battle resolution precision. 0.5 means two data points per time increment, 1 means one, etc.
+    Only used to sample the strengths for plotting; the battle itself is solved exactly.
+    - blue_replacements, red_replacements (list): (time, amount) tuples of reinforcements.
+
+    The battle is solved analytically between reinforcements. 'breakpoints' holds a (time, blue, red)
+    tuple for the start of the battle, every reinforcement, every annihilation and the end of the
+    battle. 'time', 'blue_plot' and 'red_plot' are only sampled, at every 'precision' time
+    increments, when first used, resolving the battle if needed.
     """
 
     def __init__(self, name, blue, red, duration, precision=-1, blue_replacements=None, red_replacements=None):
@@ -51,35 +103,99 @@ class Battle:
         self.precision = precision
         self.blue_replacements = blue_replacements
         self.red_replacements = red_replacements
-        self.blue_plot = np.zeros(int(duration / precision))
-        self.red_plot = np.zeros(int(duration / precision))
-        self.time = np.zeros(int(duration / precision))
+        self.breakpoints = []
+        self.segments = None
+        self._samples = None
+
+    def reinforcement_events(self):
+        """Return a sorted list of (time, blue amount, red amount) reinforcement events within
+        the duration of the battle."""
+        events = {}
+        for replacements, side in ((self.blue_replacements, 0), (self.red_replacements, 1)):
+            for replacement in replacements or ():
+                if isinstance(replacement, tuple) and 0 <= replacement[0] < self.duration:
+                    amounts = events.setdefault(replacement[0], [0, 0])
+                    amounts[side] += replacement[1]
+        return sorted((time, amounts[0], amounts[1]) for time, amounts in events.items())
 
     def resolve(self):
-        """Resolve the battle, storing strength values for each time pulse in a numpy array"""
-
-        if self.blue_replacements:
-            for replacements in self.blue_replacements:
-                if isinstance(replacements, tuple):
-                    self.blue_plot[int(replacements[0] / self.precision)] += replacements[1]
-                    print(self.blue_plot[replacements[0]])
-
-        if self.red_replacements:
-            for replacements in self.red_replacements:
-                if isinstance(replacements, tuple):
-                    self.red_plot[int(replacements[0] / self.precision)] = replacements[1]
-
-        self.blue_plot[0] = self.blue.strength
-        self.red_plot[0] = self.red.strength
-        self.time[0] = 0
-
-        for i in range(int(self.duration / self.precision) - 1):
-            self.blue_plot[i+1] += max(0, self.blue_plot[i] - self.precision * self.red_plot[i] * self.red.coefficient)
-            self.red_plot[i+1] += max(0, self.red_plot[i] - self.precision * self.blue_plot[i] * self.blue.coefficient)
-            self.time[i+1] = self.time[i] + self.precision
+        """Resolve the battle, integrating analytically from one reinforcement to the next."""
+        blue, red = self.blue.strength, self.red.strength
+        time = 0
+        self.breakpoints = [(0, blue, red)]
+        segments = []
+        events = self.reinforcement_events() + [(self.duration, 0, 0)]
+
+        for event_time, blue_amount, red_amount in events:
+            if event_time > time:
+                # Fight until the next event, or until one side is annihilated
+                end, blue_end, red_end = square_law_outcome(blue, red, self.blue.coefficient, self.red.coefficient)
+                segments.append((time, blue, red, end, blue_end, red_end))
+                if time + end < event_time:
+                    time += end
+                    blue, red = blue_end, red_end
+                    self.breakpoints.append((time, blue, red))
+                else:
+                    blue, red = square_law_strengths(blue, red, self.blue.coefficient, self.red.coefficient,
+                                                     event_time - time)
+                    blue, red = max(float(blue), 0.0), max(float(red), 0.0)
+                time = event_time
+
+            if event_time < self.duration:
+                blue += blue_amount
+                red += red_amount
+            self.breakpoints.append((time, blue, red))
+
+        # Anything after the last segment is a constant tail
+        segments.append((time, blue, red, 0.0, blue, red))
+        self.segments = np.array(segments)
+        self._samples = None
+
+    def strengths(self, times):
+        """Return the blue and red strengths at the given time(s), as numpy arrays. Resolves
+        the battle first if it has not been resolved yet."""
+        if self.segments is None:
+            self.resolve()
+        times = np.atleast_1d(np.asarray(times, dtype=float))
+        start, blue, red, end, blue_end, red_end = self.segments.T
+        index = np.clip(np.searchsorted(start, times, side='right') - 1, 0, len(start) - 1)
+        elapsed = times - start[index]
+        finished = elapsed >= end[index]
+        with np.errstate(over='ignore', invalid='ignore'):
+            blue_now, red_now = square_law_strengths(blue[index], red[index], self.blue.coefficient,
+                                                     self.red.coefficient, np.minimum(elapsed, end[index]))
+        blue_now = np.where(finished, blue_end[index], np.maximum(blue_now, 0))
+        red_now = np.where(finished, red_end[index], np.maximum(red_now, 0))
+        return blue_now, red_now
+
+    def _sample(self):
+        """Sample the strengths every 'precision' time increments, or at the breakpoints only
+        if no positive precision was given."""
+        if self.segments is None:
+            self.resolve()
+        if self._samples is None:
+            if self.precision > 0:
+                time = np.arange(int(self.duration / self.precision)) * self.precision
+            else:
+                time = np.array([breakpoint[0] for breakpoint in self.breakpoints], dtype=float)
+            self._samples = (time,) + self.strengths(time)
+        return self._samples
+
+    @property
+    def time(self):
+        return self._sample()[0]
+
+    @property
+    def blue_plot(self):
+        return self._sample()[1]
+
+    @property
+    def red_plot(self):
+        return self._sample()[2]
 
     def plot(self):
         """Plot the battle results as a function of time"""
+        import matplotlib.pyplot as plt
 
         fig, ax = plt.subplots()
         plt.title(self.name)
@@ -0,0 +1,3 @@
+"""Nathan Okun's shell obliquity calculator. See oblicalc.py."""
+
+from .oblicalc import oblicalc
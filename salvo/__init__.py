@@ -0,0 +1,6 @@
+"""Hughes' salvo model (salvoModel.py) with pluggable attrition policies: leakers
+(deterministicSalvo.py), no leakers (deterministicSalvoNoLeakers.py) and Armstrong's
+stochastic variant, and a batched engine for parameter sweeps (salvoSweep.py)."""
+
+from .salvoModel import LEAKERS, NO_LEAKERS, Battle, Group, Leakers, Missiles, NoLeakers, Ship, Stochastic
+from .salvoSweep import BLUFOR, REDFOR, Fleet, Replications, SweepResult, replicate, sweep
@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+The core of Hughes' Deterministic Salvo Model, shared by deterministicSalvo.py,
+deterministicSalvoNoLeakers.py and salvoSweep.py.
+
+The attrition rules of the model are pluggable policies, selected per battle:
+    * Leakers: a fraction of the missiles always bypasses the defences (deterministicSalvo.py).
+    * NoLeakers: SAM fire may stop every missile, and a stalemate is possible
+    (deterministicSalvoNoLeakers.py).
+    * Stochastic: launches, hits and SAM intercepts are binomial draws, after the stochastic
+    salvo model of Armstrong (2005).
+Every policy works on plain numbers as well as on NumPy arrays, so the same scenario can be
+evaluated under all of them in one batched pass (see salvoSweep.py).
+
+"""
+
+import numpy as np
+
+class Ship:
+    ''' A ship carrying anti-ship cruise missiles.
+    
+    Attributes:
+        * type (str): the type of ship, for labeling purposes only.
+        * op (int): the number of anti-ship cruise missiles the ship can fire in one salvo.
+        * dp (int): the number of SAM the ship can fire in one salvo against incoming missiles.
+        * sp (float): initial staying power in missile hits.
+        * hp (float): hit points remaining.
+        * status (fraction): fraction of its staying power remaining. 1 is intact, 0 is OOA.
+    '''
+    
+    def __init__(self, type, op, dp, sp):
+        self.type = type
+        self.op = op
+        self.dp = dp
+        self.sp = sp
+        self.hp = sp
+        self.status = 1
+        
+    def damage(self, damage):
+        ''' Lowers the ship's 'hp' attribute by the input amount.
+        
+        Args:
+            * damage (float): points of damage to subtract. HP cannot go below 0.
+        '''
+        damage = min(damage, self.hp)
+        damage = max(damage, 0)
+        self.hp -= damage
+        self.status = self.hp / self.sp
+        
+    def ascm_fire(self):
+        ''' Returns cruise missile salvo size based on status.'''
+        return self.op * self.status
+        
+    def sam_fire(self):
+        ''' Returns SAM salvo size based on status.'''
+        return self.dp * self.status
+        
+    def __str__(self):
+        ''' String override. Returns ship type, status as percentage, OP, and DP.'''
+        shipStatus = round(self.status * 100, 2)
+        shipOp = round(self.ascm_fire(), 2)
+        shipDp = round(self.sam_fire(), 2)
+        shipString = "{} ({}%) OP: {} DP: {}\n".format(self.type, shipStatus, shipOp, shipDp)
+        return shipString
+        
+class Missiles:
+    ''' The specification of the missile systems carried by a group of ships.
+    
+    Attributes:
+        * launch_reliability (fraction): fraction of cruise missiles that launch successfully.
+        * ascm_to_hit (fraction): fraction of cruise missiles that hit, in the absence of defences.
+        * sam_to_hit (fraction): fraction of SAM that successfully intercept incoming missiles.
+    '''
+    def __init__(self, launch_reliability = 1, ascm_to_hit = 1, sam_to_hit = 1):
+        self.launch_reliability = launch_reliability
+        self.ascm_to_hit = ascm_to_hit
+        self.sam_to_hit = sam_to_hit
+        
+    def offensive_modifier(self):
+        ''' Returns the fraction of missiles that launch AND hit.'''
+        return self.launch_reliability * self.ascm_to_hit
+
+class Leakers:
+    ''' Attrition with leakers: while the defences are overwhelmed, the missiles in excess
+    of the SAM fired hit, plus those SAM that miss; otherwise the fraction of missiles the
+    SAM fail to stop hits.
+    '''
+    name = 'leakers'
+    
+    def defensive_power(self, defensiveSalvoSize, readiness, samToHit):
+        ''' Returns the raw defensive power of a group firing (defensiveSalvoSize) SAM.'''
+        return defensiveSalvoSize * readiness
+        
+    def combat_power(self, salvoSize, scouting, launchReliability, ascmToHit,
+                     defensiveSalvoSize, readiness, samToHit):
+        ''' Returns the combat power of (salvoSize) missiles in excess of the defences of
+        a target group firing (defensiveSalvoSize) SAM.
+        '''
+        strikingPower = salvoSize * scouting * (launchReliability * ascmToHit)
+        defensivePower = self.defensive_power(defensiveSalvoSize, readiness, samToHit)
+        overwhelm = np.maximum(strikingPower - defensivePower, 0)
+        return np.where(overwhelm > 0, overwhelm + (1 - samToHit) * defensivePower,
+                        (1 - samToHit) * strikingPower)
+        
+    def can_hit(self, *args):
+        ''' Returns whether the salvo can cause any damage, with the arguments of
+        combat_power.
+        '''
+        return self.combat_power(*args) != 0
+        
+class NoLeakers(Leakers):
+    ''' Attrition without leakers: the missiles in excess of the successful SAM intercepts
+    hit, and none otherwise.
+    '''
+    name = 'no leakers'
+    
+    def defensive_power(self, defensiveSalvoSize, readiness, samToHit):
+        ''' Returns the raw defensive power of a group firing (defensiveSalvoSize) SAM.'''
+        return defensiveSalvoSize * readiness * samToHit
+        
+    def combat_power(self, salvoSize, scouting, launchReliability, ascmToHit,
+                     defensiveSalvoSize, readiness, samToHit):
+        ''' Returns the combat power of (salvoSize) missiles in excess of the defences of
+        a target group firing (defensiveSalvoSize) SAM.
+        '''
+        strikingPower = salvoSize * scouting * (launchReliability * ascmToHit)
+        defensivePower = self.defensive_power(defensiveSalvoSize, readiness, samToHit)
+        return np.maximum(strikingPower - defensivePower, 0)
+        
+class Stochastic(NoLeakers):
+    ''' Missile-level stochastic attrition (Armstrong, 2005). The missiles fired at located
+    targets and the SAM fired are rounded to whole numbers; each missile launches and hits
+    with probability launch_reliability * ascm_to_hit, and each SAM stops one of them with
+    probability sam_to_hit. While the defences are overwhelmed, the expected damage is that
+    of the no-leaker model.
+    
+    Attributes:
+        * rng (Generator): the NumPy random generator the draws are taken from.
+    '''
+    name = 'stochastic'
+    
+    def __init__(self, seed = None):
+        self.rng = np.random.default_rng(seed)
+        
+    def combat_power(self, salvoSize, scouting, launchReliability, ascmToHit,
+                     defensiveSalvoSize, readiness, samToHit):
+        ''' Returns the number of missile hits scored by one random salvo.'''
+        fired = np.rint(salvoSize * scouting).astype(np.int64)
+        intercepts = np.rint(defensiveSalvoSize * readiness).astype(np.int64)
+        hits = self.rng.binomial(fired, launchReliability * ascmToHit)
+        stopped = self.rng.binomial(intercepts, samToHit)
+        return np.maximum(hits - stopped, 0)
+        
+    def can_hit(self, salvoSize, scouting, launchReliability, ascmToHit,
+                defensiveSalvoSize, readiness, samToHit):
+        ''' Returns whether any missile of the salvo can possibly get through.'''
+        fired = np.rint(salvoSize * scouting)
+        intercepts = np.rint(defensiveSalvoSize * readiness)
+        return (fired > 0) & (launchReliability * ascmToHit > 0) & ((samToHit < 1) | (intercepts < fired))
+        
+LEAKERS = Leakers()
+NO_LEAKERS = NoLeakers()
+
+class ShipView:
+    ''' A read-only view of one ship in an array-backed Group, with the same attributes
+    and methods as Ship.
+    '''
+    def __init__(self, group, index):
+        self.group = group
+        self.index = index
+        self.type = group.type
+        
+    @property
+    def op(self):
+        return float(self.group.op[self.index])
+        
+    @property
+    def dp(self):
+        return float(self.group.dp[self.index])
+        
+    @property
+    def sp(self):
+        return float(self.group.sp[self.index])
+        
+    @property
+    def hp(self):
+        return float(self.group.hp[self.index])
+        
+    @property
+    def status(self):
+        return self.hp / self.sp
+        
+    def ascm_fire(self):
+        ''' Returns cruise missile salvo size based on status.'''
+        return self.op * self.status
+        
+    def sam_fire(self):
+        ''' Returns SAM salvo size based on status.'''
+        return self.dp * self.status
+        
+    def __str__(self):
+        return Ship.__str__(self)
+        
+class Group:
+    ''' A group of ships.
+    
+    Attributes:
+        * side (str): the group's side identifier, for labelling purposes.
+        * ship (Ship): the ship type the group is composed of.
+        * units (int): the number of ships of type (ship) in the group.
+            * oob (list): a list of views of the ships in the group (see ShipView).
+        * scouting (fraction): fraction of enemy group that can be located and targeted.
+        * readiness (fraction): efficiency of the group's defences.
+        * missiles (Missiles): the missile systems used by the group.
+        * policy: the attrition policy used by default for the group's salvos (Leakers).
+        
+    The ships are held in NumPy arrays (op, dp, sp and hp, one entry per ship). Damage is
+    always applied to the ships in order, so only the first ship still in action (at index
+    'first') can be partially damaged: every ship before it is out of action, and every
+    ship after it is intact. The status, salvo size and defensive salvo size of the group
+    are therefore kept as running aggregates, using cumulative sums over the intact ships.
+    '''
+    policy = LEAKERS
+    
+    def __init__(self, side, ship, units, scouting = 1, readiness = 1, missiles = Missiles()):
+        self.side = side
+        self.type = ship.type
+        self.op = np.full(units, ship.op, dtype=float)
+        self.dp = np.full(units, ship.dp, dtype=float)
+        self.sp = np.full(units, ship.sp, dtype=float)
+        self.hp = self.sp.copy()
+        self.scouting = scouting
+        self.readiness = readiness
+        self.missiles = missiles
+        # Staying power, missiles and SAM of the ships from each index onwards, intact
+        self.intactSp = np.concatenate((np.cumsum(self.sp[::-1])[::-1], [0]))
+        self.intactOp = np.concatenate((np.cumsum(self.op[::-1])[::-1], [0]))
+        self.intactDp = np.concatenate((np.cumsum(self.dp[::-1])[::-1], [0]))
+        self.first = 0
+        self.update_aggregates()
+        
+    @property
+    def oob(self):
+        return [ShipView(self, index) for index in range(len(self.hp))]
+        
+    def update_aggregates(self):
+        ''' Updates the running totals of status, salvo size and defensive salvo size.'''
+        first = self.first
+        if first == len(self.hp):
+            self.totalStatus = self.salvoSize = self.defensiveSalvoSize = 0.0
+            return
+        if first == 0 and self.hp[0] == self.sp[0]:
+            # No damage taken yet: every ship is still at full status
+            self.totalStatus = len(self.hp)
+            self.salvoSize = float(self.intactOp[0])
+            self.defensiveSalvoSize = float(self.intactDp[0])
+            return
+        status = self.hp[first] / self.sp[first]
+        intact = len(self.hp) - first - 1
+        self.totalStatus = float(status + intact)
+        self.salvoSize = float(self.op[first] * status + self.intactOp[first + 1])
+        self.defensiveSalvoSize = float(self.dp[first] * status + self.intactDp[first + 1])
+        
+    def missile_parameters(self, enemy):
+        ''' Returns the arguments of the policies' combat_power for a salvo fired at enemy.'''
+        return (self.salvoSize, self.scouting, self.missiles.launch_reliability,
+                self.missiles.ascm_to_hit, enemy.defensiveSalvoSize, enemy.readiness,
+                enemy.missiles.sam_to_hit)
+        
+    def striking_power(self):
+        ''' Returns the raw striking power of the group.'''
+        salvoSize = self.salvoSize
+        strikingPower = salvoSize * self.scouting * self.missiles.offensive_modifier()
+        return strikingPower
+        
+    def defensive_power(self, policy = None):
+        ''' Returns the raw defensive power of the group, under the group's own policy
+        unless another one is given.
+        '''
+        policy = policy or self.policy
+        return float(policy.defensive_power(self.defensiveSalvoSize, self.readiness, self.missiles.sam_to_hit))
+        
+    def combat_power(self, enemy, policy = None):
+        ''' Returns the combat power in excess of the enemy's defences.
+        
+        Arguments:
+            * enemy (Group): the target group.
+            * policy: the attrition policy, the group's own policy by default.
+        '''
+        policy = policy or self.policy
+        return float(policy.combat_power(*self.missile_parameters(enemy)))
+        
+    def total_status(self):
+        ''' Returns the sum of the 'status' attributes of all ships in the group.'''
+        return self.totalStatus
+        
+    def damage(self, damage):
+        ''' Damages the group. Applied to all ships consecutively until damage reaches
+        zero, or no more targets are available. Any damage in excess of a ship's hit points
+        spills over to the next ship.
+        
+        Arguments:
+            * damage (float): the total amount damage to inflict upon the group.
+        ''' 
+        first = self.first
+        if damage <= 0 or first == len(self.hp):
+            return
+        if damage < self.hp[first]:
+            self.hp[first] -= damage
+        else:
+            # The first ship is put out of action, and the rest of the damage spills over
+            # to the intact ships after it: those whose cumulative staying power is covered
+            # are put out of action too, and the next one takes the remainder.
+            damage -= self.hp[first]
+            self.hp[first] = 0
+            absorbed = self.intactSp[first + 1] - self.intactSp[first + 1:]
+            sunk = int(np.searchsorted(absorbed, damage, side='right')) - 1
+            self.hp[first + 1:first + 1 + sunk] = 0
+            self.first = first + 1 + sunk
+            if self.first < len(self.hp):
+                self.hp[self.first] -= damage - absorbed[sunk]
+                # Rounding in the cumulative sums must not leave a sliver of a ship afloat
+                # (or take a sliver from one) when the damage covers whole ships exactly.
+                if self.hp[self.first] <= self.sp[self.first] * 1e-9:
+                    self.hp[self.first] = 0
+                    self.first += 1
+                elif self.hp[self.first] >= self.sp[self.first] * (1 - 1e-9):
+                    self.hp[self.first] = self.sp[self.first]
+        self.update_aggregates()
+        
+    def __str__(self):
+        ''' String override. Returns the percentage of the original staying power remaining,
+        and the (equivalent) number of active ships.
+        '''
+        percentage = round((self.total_status() / len(self.hp)) * 100, 2)
+        activeShips = round(self.total_status(), 2)
+        groupString = "{}: {}% ({} active ships)".format(self.side, percentage, activeShips)
+        return groupString
+        
+class Battle:
+    ''' A battle between two groups.
+    
+    Attributes:
+        * blu (Group): the BLUFOR group.
+        * red (Group): the REDFOR group.
+        * duration (int): the duration of the battle in pulses. If zero (default) the
+        battle goes on until one side is wiped out.
+        * policy: the attrition policy (Leakers, NoLeakers or Stochastic). By default, the
+        policy of the BLUFOR group.
+        * verbose (bool): whether the status of both groups is printed after each pulse.
+    '''
+    def __init__(self, blu, red, duration = 0, policy = None, verbose = True):
+        self.blu = blu
+        self.red = red
+        self.duration = duration
+        self.policy = policy or blu.policy
+        self.verbose = verbose
+        self.pulse = 0
+        # Lists for plotting
+        self.bluPlot = [self.blu.total_status()]
+        self.redPlot = [self.red.total_status()]
+        self.time = [0]
+        
+    def add_to_plot(self):
+        self.bluPlot.append(self.blu.total_status())
+        self.redPlot.append(self.red.total_status())
+        self.time.append(self.pulse)
+        
+    def report(self, message):
+        if self.verbose:
+            print(message)
+        
+    def start(self):
+        ''' Announces the battle before the first pulse.'''
+        if self.pulse == 0:
+            self.report("\nBattle starts between {} and {}\n".format(self.blu.side, self.red.side))
+            self.report(self)
+        
+    def stalemate(self):
+        ''' Checks whether the battle has reached a stalemate, in which neither side can
+        damage the other. Only possible if SAM fire is 100% effective for both sides
+        (missile sam_to_hit = 1), or neither side can fire.
+        '''
+        bluHits = self.policy.can_hit(*self.blu.missile_parameters(self.red))
+        redHits = self.policy.can_hit(*self.red.missile_parameters(self.blu))
+        return not bluHits and not redHits
+        
+    def blu_surprise(self):
+        ''' Fires one BLUFOR salvo at REDFOR, without retaliation.'''
+        self.start()
+        self.pulse += 1
+        self.red.damage(self.blu.combat_power(self.red, self.policy))
+        self.report(self)
+        self.add_to_plot()
+        
+    def red_surprise(self):
+        ''' Fires one REDFOR salvo at BLUFOR, without retaliation.'''
+        self.start()
+        self.pulse += 1
+        self.blu.damage(self.red.combat_power(self.blu, self.policy))
+        self.report(self)
+        self.add_to_plot()
+        
+    def salvo(self):
+        ''' Both sides fire at each other simultaneously.'''
+        self.start()
+        bluDamageSustained = self.red.combat_power(self.blu, self.policy)
+        redDamageSustained = self.blu.combat_power(self.red, self.policy)
+        self.blu.damage(bluDamageSustained)
+        self.red.damage(redDamageSustained)
+        self.pulse += 1
+        self.report(self)
+        self.add_to_plot()
+        
+    def resolve(self):
+        ''' The battle is resolved for the specified duration, or until one side is wiped out.'''
+        if self.duration == 0:
+            while self.blu.total_status() != 0 and self.red.total_status() != 0:
+                self.salvo()
+                if self.stalemate():
+                    self.report("\nStalemate! Neither fleet can penetrate enemy missile defence.")
+                    break
+        else:
+            for _ in range(self.duration):
+                self.salvo()
+                
+    def replicate(self, replications, seed = None, maxPulses = 1000):
+        ''' Returns the outcome distribution of many replications of the battle with the
+        stochastic policy, from the current status of both groups (see salvoSweep.py).
+        '''
+        try:
+            from .salvoSweep import replicate
+        except ImportError:
+            from salvoSweep import replicate
+        return replicate(self.blu, self.red, replications, seed, maxPulses)
+        
+    def plot(self):
+        import matplotlib.pyplot as plt
+        
+        x = np.array(self.time)
+        y = np.array(self.bluPlot)
+        z = np.array(self.redPlot)
+        
+        width = 0.2
+        
+        fig, ax = plt.subplots()
+        rects1 = ax.bar(x-0.1, y, width, color='tab:blue', zorder=3)
+        rects2 = ax.bar(x+0.1, z, width, color='tab:red', zorder=3)
+        
+        ax.set_ylabel('Aggregated status')
+        ax.set_xlabel('Pulse')
+        
+        ax.set_xticks(x)
+        
+        ax.legend((rects1[0],rects2[0]),(self.blu.side,self.red.side), loc=9)
+        
+        ax.grid(which='major', axis='y', linestyle=':', alpha=0.5, zorder=0)
+        ax.grid(which='minor', axis='y', linestyle=':', alpha=0.25, zorder=0)
+        
+        def autolabel(rects):
+            for rect in rects:
+                height = rect.get_height()
+                ax.text(rect.get_x() + rect.get_width()/2., height,
+                '{}'.format(round(height,2)),
+                ha='center', va='bottom')
+        
+        autolabel(rects1)
+        autolabel(rects2)
+        plt.show()
+        
+    def __str__(self):
+        ''' String override. Returns the pulse number, and the status of the opposing groups.'''
+        battleString = "\nPulse {}:\n{} | {}".format(self.pulse, str(self.blu), str(self.red))
+        return(battleString)
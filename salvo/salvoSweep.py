@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+A batched engine for Hughes' Deterministic Salvo Model.
+
+Each parameter of the Ship, Missiles and Group classes (units, op, dp, sp, scouting,
+readiness, launch_reliability, ascm_to_hit and sam_to_hit) may be given as a NumPy array
+for both BLUFOR and REDFOR. All the parameters are broadcast together, and every
+combination is resolved at once, salvo by salvo, with the same rules as Battle.resolve()
+in salvoModel.py. Given a list of attrition policies (Leakers, NoLeakers, Stochastic),
+the same battles are resolved under each of them side by side, in the same pass.
+
+Since all the ships of a group are identical, the state of each group is its total status
+(the number of equivalent ships in action): a group with total status T fires op * T
+missiles and dp * T SAM, and damage d takes d / sp off its total status.
+
+"""
+
+import numpy as np
+
+try:
+    from .salvoModel import LEAKERS, NO_LEAKERS, Group, Missiles, Ship, Stochastic
+except ImportError:
+    from salvoModel import LEAKERS, NO_LEAKERS, Group, Missiles, Ship, Stochastic
+
+BLUFOR = 1
+REDFOR = -1
+
+class Fleet:
+    ''' The parameters of one side of the sweep. Every attribute may be a scalar or a
+    NumPy array; arrays are broadcast against each other and against the other side.
+
+    Attributes:
+        * units (int): the number of ships in the group.
+        * op (float): offensive power (cruise missiles fired) of each ship.
+        * dp (float): defensive power (SAM fired) of each ship.
+        * sp (float): staying power (hits taken before out of action) of each ship.
+        * scouting (fraction): fraction of enemy group that can be located and targeted.
+        * readiness (fraction): efficiency of the group's defences.
+        * launch_reliability (fraction): fraction of cruise missiles that launch successfully.
+        * ascm_to_hit (fraction): fraction of cruise missiles that hit, in the absence of defences.
+        * sam_to_hit (fraction): fraction of SAM that successfully intercept incoming missiles.
+    '''
+    def __init__(self, units, op, dp, sp, scouting = 1, readiness = 1, launch_reliability = 1,
+                 ascm_to_hit = 1, sam_to_hit = 1):
+        self.units = units
+        self.op = op
+        self.dp = dp
+        self.sp = sp
+        self.scouting = scouting
+        self.readiness = readiness
+        self.launch_reliability = launch_reliability
+        self.ascm_to_hit = ascm_to_hit
+        self.sam_to_hit = sam_to_hit
+
+    def parameters(self):
+        ''' Returns the parameters of the fleet, in the order of the class attributes.'''
+        return (self.units, self.op, self.dp, self.sp, self.scouting, self.readiness,
+                self.launch_reliability, self.ascm_to_hit, self.sam_to_hit)
+
+class SweepResult:
+    ''' The outcome of every battle in a sweep. All attributes are arrays with the
+    broadcast shape of the parameters.
+
+    Attributes:
+        * pulses (int): the number of salvos fired until the battle was decided, ended in
+        a stalemate, or reached its duration (or the maximum number of pulses).
+        * winner (int): BLUFOR (1) or REDFOR (-1) if only that side is left in action,
+        otherwise 0 (mutual destruction, stalemate or undecided).
+        * stalemate (bool): whether neither side could penetrate the enemy defences.
+        * bluStatus, redStatus (float): the total status (equivalent ships in action)
+        of each side at the end of the battle.
+        * bluFraction, redFraction (float): the same, as a fraction of the starting units.
+    '''
+    def __init__(self, pulses, winner, stalemate, bluStatus, redStatus, bluFraction, redFraction):
+        self.pulses = pulses
+        self.winner = winner
+        self.stalemate = stalemate
+        self.bluStatus = bluStatus
+        self.redStatus = redStatus
+        self.bluFraction = bluFraction
+        self.redFraction = redFraction
+
+    def __str__(self):
+        ''' String override. Returns a summary of the outcomes of the sweep.'''
+        total = self.winner.size
+        resultString = "{} battles: BLUFOR wins {}, REDFOR wins {}, stalemates {}, others {}".format(
+            total, np.count_nonzero(self.winner == BLUFOR), np.count_nonzero(self.winner == REDFOR),
+            np.count_nonzero(self.stalemate),
+            np.count_nonzero((self.winner == 0) & ~self.stalemate))
+        return resultString
+
+def sweep(blu, red, policy = LEAKERS, duration = 0, maxPulses = 1000):
+    ''' Resolves every battle of the sweep between BLUFOR and REDFOR.
+    
+    Arguments:
+        * blu, red (Fleet): the parameters of each side.
+        * policy: the attrition policy (see salvoModel.py), or a list of policies. With a
+        list, the results gain a leading axis with one entry per policy.
+        * duration (int): the duration of the battles in pulses. If zero (default) each
+        battle goes on until one side is wiped out, or a stalemate is reached.
+        * maxPulses (int): the limit on the number of pulses when no duration is given,
+        for battles in which both sides wear down without ever being wiped out.
+        
+    Returns a SweepResult.
+    '''
+    policies = list(policy) if isinstance(policy, (list, tuple)) else [policy]
+    arrays = np.broadcast_arrays(*(np.asarray(value, dtype=float)
+                                   for value in blu.parameters() + red.parameters()))
+    shape = arrays[0].shape
+    if isinstance(policy, (list, tuple)):
+        shape = (len(policies),) + shape
+    arrays = [np.tile(array.ravel(), len(policies)) for array in arrays]
+    (bluUnits, bluOp, bluDp, bluSp, bluScouting, bluReadiness, bluLaunch, bluAscm, bluSam,
+     redUnits, redOp, redDp, redSp, redScouting, redReadiness, redLaunch, redAscm, redSam) = arrays
+    
+    size = bluUnits.size
+    # The policy of each battle, as an index into the list of policies
+    policyIndex = np.repeat(np.arange(len(policies)), size // len(policies))
+    bluStatus = bluUnits.copy()
+    redStatus = redUnits.copy()
+    pulses = np.zeros(size, dtype=int)
+    stalemate = np.zeros(size, dtype=bool)
+    
+    def missile_parameters(firing, bluNow, redNow, active):
+        ''' Returns the arguments of the policies' combat_power for the salvos fired by
+        BLUFOR or REDFOR (firing) in the active battles.
+        '''
+        if firing == BLUFOR:
+            return (bluOp[active] * bluNow, bluScouting[active], bluLaunch[active], bluAscm[active],
+                    redDp[active] * redNow, redReadiness[active], redSam[active])
+        return (redOp[active] * redNow, redScouting[active], redLaunch[active], redAscm[active],
+                bluDp[active] * bluNow, bluReadiness[active], bluSam[active])
+        
+    def apply(method, firing, bluNow, redNow, active):
+        ''' Applies the method of each policy to the battles fought under it.'''
+        parameters = missile_parameters(firing, bluNow, redNow, active)
+        if len(policies) == 1:
+            return getattr(policies[0], method)(*parameters)
+        result = np.zeros(active.size, dtype=float if method == 'combat_power' else bool)
+        for index, battlePolicy in enumerate(policies):
+            chosen = policyIndex[active] == index
+            if chosen.any():
+                result[chosen] = getattr(battlePolicy, method)(*(value[chosen] for value in parameters))
+        return result
+        
+    # Battles still being fought, by index into the flat arrays
+    active = np.arange(size)
+    if duration == 0:
+        active = active[(bluStatus != 0) & (redStatus != 0)]
+    pulseLimit = duration if duration else maxPulses
+    
+    for pulse in range(1, pulseLimit + 1):
+        if active.size == 0:
+            break
+        bluNow = bluStatus[active]
+        redNow = redStatus[active]
+        bluDamage = apply('combat_power', REDFOR, bluNow, redNow, active)
+        redDamage = apply('combat_power', BLUFOR, bluNow, redNow, active)
+        bluNow = bluNow - bluDamage / bluSp[active]
+        redNow = redNow - redDamage / redSp[active]
+        # As in Group.damage, rounding must not leave a sliver of a ship afloat
+        bluNow[bluNow <= 1e-9] = 0
+        redNow[redNow <= 1e-9] = 0
+        bluStatus[active] = bluNow
+        redStatus[active] = redNow
+        pulses[active] = pulse
+        if duration == 0:
+            stuck = ~apply('can_hit', BLUFOR, bluNow, redNow, active) & ~apply('can_hit', REDFOR, bluNow, redNow, active)
+            # Sides wiped out in the same salvo are mutual destruction, not a stalemate
+            stuck &= (bluNow > 0) & (redNow > 0)
+            stalemate[active] = stuck
+            active = active[~stuck & (bluNow != 0) & (redNow != 0)]
+            
+    winner = np.where((bluStatus > 0) & (redStatus == 0), BLUFOR,
+                      np.where((redStatus > 0) & (bluStatus == 0), REDFOR, 0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bluFraction = np.where(bluUnits > 0, bluStatus / bluUnits, 0.0)
+        redFraction = np.where(redUnits > 0, redStatus / redUnits, 0.0)
+    return SweepResult(pulses.reshape(shape), winner.reshape(shape), stalemate.reshape(shape),
+                       bluStatus.reshape(shape), redStatus.reshape(shape),
+                       bluFraction.reshape(shape), redFraction.reshape(shape))
+
+class Replications:
+    ''' The outcome distribution of many replications of one stochastic battle.
+    
+    Attributes:
+        * result (SweepResult): the outcome of every replication.
+        * replications (int): the number of replications.
+    '''
+    def __init__(self, result):
+        self.result = result
+        self.replications = result.winner.size
+        
+    def probabilities(self):
+        ''' Returns a dictionary with the probability of each outcome: BLUFOR wins,
+        REDFOR wins, mutual destruction, stalemate, and undecided after the maximum
+        number of pulses.
+        '''
+        result = self.result
+        over = (result.winner == 0) & ~result.stalemate
+        destroyed = over & (result.bluStatus == 0) & (result.redStatus == 0)
+        counts = {
+            'BLUFOR': np.count_nonzero(result.winner == BLUFOR),
+            'REDFOR': np.count_nonzero(result.winner == REDFOR),
+            'mutual destruction': np.count_nonzero(destroyed),
+            'stalemate': np.count_nonzero(result.stalemate),
+            'undecided': np.count_nonzero(over & ~destroyed),
+        }
+        return {outcome: count / self.replications for outcome, count in counts.items()}
+        
+    def pulse_distribution(self):
+        ''' Returns the probability of the battle ending at each pulse, indexed by pulse.'''
+        return np.bincount(self.result.pulses.ravel()) / self.replications
+        
+    def status_distribution(self, side):
+        ''' Returns the distinct residual total status values of BLUFOR or REDFOR (side),
+        and the probability of each.
+        '''
+        status = self.result.bluStatus if side == BLUFOR else self.result.redStatus
+        values, counts = np.unique(np.round(status, 9), return_counts=True)
+        return values, counts / self.replications
+        
+    def win_trace(self):
+        ''' Returns the pulse numbers, and the probability that BLUFOR and REDFOR have won
+        by each pulse.
+        '''
+        result = self.result
+        length = result.pulses.max() + 1
+        bluWins = np.bincount(result.pulses[result.winner == BLUFOR], minlength=length)
+        redWins = np.bincount(result.pulses[result.winner == REDFOR], minlength=length)
+        return (np.arange(length), np.cumsum(bluWins) / self.replications,
+                np.cumsum(redWins) / self.replications)
+        
+    def __str__(self):
+        ''' String override. Returns the probability of each outcome.'''
+        return ", ".join("{}: {}%".format(outcome, round(probability * 100, 2))
+                         for outcome, probability in self.probabilities().items())
+        
+def group_fleet(group):
+    ''' Returns the Fleet with the parameters of a Group. The units are the group's
+    current total status.
+    '''
+    return Fleet(group.total_status(), float(group.op[0]), float(group.dp[0]), float(group.sp[0]),
+                 group.scouting, group.readiness, group.missiles.launch_reliability,
+                 group.missiles.ascm_to_hit, group.missiles.sam_to_hit)
+        
+def replicate(blu, red, replications, seed = None, maxPulses = 1000):
+    ''' Fights many replications of a battle between two groups with the stochastic
+    policy, all at once, until one side is wiped out or a stalemate is reached.
+    
+    Arguments:
+        * blu, red (Group): the BLUFOR and REDFOR groups, which are left untouched.
+        * replications (int): the number of replications.
+        * seed: the seed of the random draws.
+        * maxPulses (int): the limit on the number of pulses of each replication.
+        
+    Returns a Replications object.
+    '''
+    bluFleet = group_fleet(blu)
+    bluFleet.units = np.full(replications, bluFleet.units, dtype=float)
+    result = sweep(bluFleet, group_fleet(red), Stochastic(seed), maxPulses = maxPulses)
+    return Replications(result)
+
+if __name__ == "__main__":
+    # Sweep of Tiah, Yao Ming (2007), excursion A3: BLUFOR frigates against 1 to 20
+    # REDFOR corvettes, for scouting from 0.1 to 1 on both sides.
+    scouting = np.linspace(0.1, 1, 10)
+    blufor = Fleet(4, 8, 6, 1.5, scouting = scouting[:, None, None], launch_reliability = 0.9,
+                   ascm_to_hit = 0.7, sam_to_hit = 0.68)
+    redfor = Fleet(np.arange(1, 21), 4, 2, 1, scouting = scouting[None, :, None],
+                   launch_reliability = 0.9, ascm_to_hit = 0.7, sam_to_hit = 0.68)
+
+    result = sweep(blufor, redfor)
+    print(result)
+    # Excursion A3 itself: scouting 0.6 for both sides, 12 corvettes
+    print("Excursion A3: winner {}, {} pulses, BLUFOR status {}, REDFOR status {}".format(
+        result.winner[5, 5, 11], result.pulses[5, 5, 11], round(result.bluStatus[5, 5, 11], 2),
+        round(result.redStatus[5, 5, 11], 2)))
+
+    # The same sweep under the three formulations of the model, side by side
+    result = sweep(blufor, redfor, [LEAKERS, NO_LEAKERS, Stochastic(seed = 1)])
+    for policy, winner in zip(("Leakers", "No leakers", "Stochastic"), result.winner):
+        print("{}: BLUFOR wins {} of {} battles".format(policy, np.count_nonzero(winner == BLUFOR), winner.size))
+
+    # Replications of excursion A3 with missile-level random draws
+    frigates = Group("BLUFOR", Ship("Frigate", 8, 6, 1.5), 4, 0.6, 1, Missiles(0.9, 0.7, 0.68))
+    corvettes = Group("REDFOR", Ship("Corvette", 4, 2, 1), 12, 0.6, 1, Missiles(0.9, 0.7, 0.68))
+    replications = replicate(frigates, corvettes, 100000, seed = 1)
+    print(replications)
+    pulse, bluWins, redWins = replications.win_trace()
+    for i in pulse[1:6]:
+        print("Pulse {}: P(BLUFOR won) {}, P(REDFOR won) {}".format(i, round(bluWins[i], 3), round(redWins[i], 3)))
@@ -0,0 +1,6 @@
+"""Declarative scenario files (TOML or JSON) for the Beall, salvo and Lanchester models.
+
+See loader.py and README.md for the scenario schema.
+"""
+
+from .loader import build, clear_cache, load_directory, load_scenario, parse_scenario, read_scenario, validate
@@ -0,0 +1,352 @@
+# coding: utf-8
+
+# Scenario files for the combat models
+# ================================================
+# Loads battles from declarative TOML or JSON
+# scenario files, so that scenarios need not be
+# hard-coded at the end of each model's module.
+#
+# Supported models:
+# - "beall": Beall's naval combat model
+# - "salvo": Hughes' deterministic salvo model
+# - "lanchester": Lanchester's square law with
+#   reinforcements
+#
+# Scenarios are validated once and cached by the
+# hash of their contents; every load builds fresh
+# battle objects from the cached scenario.
+# ================================================
+
+import hashlib
+import json
+import os
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+
+FORMATS = {'.toml': 'toml', '.json': 'json'}
+
+# Validated scenarios, by the SHA-256 digest of their contents
+_cache = {}
+
+
+def clear_cache():
+    """Forget every cached scenario."""
+    _cache.clear()
+
+
+def parse_scenario(data, format='toml', source='<scenario>'):
+    """Parse and validate the contents (bytes or str) of a scenario file.
+
+    Returns the validated scenario as a dictionary. Scenarios already parsed are returned
+    from the cache without being parsed or validated again, so the dictionary must not be
+    modified. Raises ValueError if the scenario is invalid.
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    if format not in FORMATS.values():
+        raise ValueError("{}: unknown scenario format '{}'".format(source, format))
+    key = hashlib.sha256(format.encode('ascii') + b'\0' + data).hexdigest()
+    if key not in _cache:
+        if format == 'toml':
+            if tomllib is None:
+                raise ValueError("{}: TOML scenarios need Python 3.11 or the 'tomli' package".format(source))
+            try:
+                scenario = tomllib.loads(data.decode('utf-8'))
+            except tomllib.TOMLDecodeError as error:
+                raise ValueError("{}: {}".format(source, error)) from None
+        else:
+            try:
+                scenario = json.loads(data.decode('utf-8'))
+            except json.JSONDecodeError as error:
+                raise ValueError("{}: {}".format(source, error)) from None
+        _cache[key] = validate(scenario, source)
+    return _cache[key]
+
+
+def read_scenario(path):
+    """Read, parse and validate a scenario file. The format is given by its extension."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError("{}: scenario files must be .toml or .json".format(path))
+    with open(path, 'rb') as scenario_file:
+        return parse_scenario(scenario_file.read(), FORMATS[extension], path)
+
+
+def load_scenario(path, **options):
+    """Build a ready-to-resolve battle from a scenario file.
+
+    Keyword options are passed on to the battle constructor (such as 'recorder' for Beall
+    battles).
+    """
+    return build(read_scenario(path), **options)
+
+
+def load_directory(directory, **options):
+    """Build the battles of every scenario file (.toml or .json) in a directory.
+
+    Returns a dictionary mapping each file name to its battle, sorted by file name.
+    """
+    battles = {}
+    for file_name in sorted(os.listdir(directory)):
+        if os.path.splitext(file_name)[1].lower() in FORMATS:
+            battles[file_name] = load_scenario(os.path.join(directory, file_name), **options)
+    return battles
+
+
+# Validation
+# ------------------------------------------------
+
+def _require(table, key, kind, where, default=None):
+    """Return table[key], checking its type. Missing keys take the default if one is given."""
+    if not isinstance(table, dict):
+        raise ValueError("{}: must be a table".format(where))
+    if key not in table:
+        if default is not None:
+            return default
+        raise ValueError("{}: missing '{}'".format(where, key))
+    value = table[key]
+    kinds = kind if isinstance(kind, tuple) else (kind,)
+    # Booleans are ints in Python, but never valid numbers in a scenario
+    if isinstance(value, bool) and bool not in kinds or not isinstance(value, kinds):
+        names = " or ".join(kind.__name__ for kind in kinds)
+        raise ValueError("{}: '{}' must be {}".format(where, key, names))
+    return value
+
+
+def _number(table, key, where, default=None, minimum=None, maximum=None):
+    value = _require(table, key, (int, float), where, default)
+    if minimum is not None and value < minimum:
+        raise ValueError("{}: '{}' must be at least {}".format(where, key, minimum))
+    if maximum is not None and value > maximum:
+        raise ValueError("{}: '{}' must be at most {}".format(where, key, maximum))
+    return value
+
+
+def _selection(table, key, count, where, default=None):
+    """Return a group selection ('all', an int or a tuple), checking the group indices."""
+    value = _require(table, key, (str, int, list), where, default)
+    if value == 'all':
+        return value
+    indices = value if isinstance(value, list) else [value]
+    if not indices or not all(isinstance(index, int) and not isinstance(index, bool) for index in indices):
+        raise ValueError("{}: '{}' must be 'all', a group index or a list of group indices".format(where, key))
+    if any(index < 0 or index >= count for index in indices):
+        raise ValueError("{}: '{}' refers to a group that does not exist".format(where, key))
+    return tuple(value) if isinstance(value, list) else value
+
+
+def validate(scenario, source='<scenario>'):
+    """Validate a parsed scenario, returning it with defaults filled in and group selections
+    converted to the types the models expect. Raises ValueError if the scenario is invalid."""
+    if not isinstance(scenario, dict):
+        raise ValueError("{}: a scenario must be a table".format(source))
+    model = _require(scenario, 'model', str, source)
+    if model not in VALIDATORS:
+        raise ValueError("{}: unknown model '{}' (expected one of {})".format(source, model, ", ".join(VALIDATORS)))
+    return VALIDATORS[model](scenario, source)
+
+
+def _validate_beall(scenario, source):
+    sides = _require(scenario, 'sides', list, source)
+    if len(sides) != 2:
+        raise ValueError("{}: a Beall battle needs exactly two sides".format(source))
+    valid = {'model': 'beall', 'name': _require(scenario, 'name', str, source, 'Battle'), 'sides': []}
+    counts = []
+    for side_index, side in enumerate(sides):
+        where = "{}: sides[{}]".format(source, side_index)
+        groups = _require(side, 'groups', list, where)
+        if not groups:
+            raise ValueError("{}: a side needs at least one group".format(where))
+        valid_groups = []
+        for group_index, group in enumerate(groups):
+            group_where = "{}.groups[{}]".format(where, group_index)
+            pulse = []
+            for weapon in _require(group, 'pulse', list, group_where, []):
+                if (not isinstance(weapon, list) or len(weapon) != 2 or
+                        not all(isinstance(value, (int, float)) for value in weapon)):
+                    raise ValueError("{}: pulse weapons must be [power, number] pairs".format(group_where))
+                pulse.append(tuple(weapon))
+            valid_groups.append({
+                'name': _require(group, 'name', str, group_where),
+                'continuous': _number(group, 'continuous', group_where, 0, minimum=0),
+                'staying': _number(group, 'staying', group_where),
+                'pulse': pulse,
+            })
+            if valid_groups[-1]['staying'] <= 0:
+                raise ValueError("{}: 'staying' must be positive".format(group_where))
+        valid['sides'].append({'name': _require(side, 'name', str, where), 'groups': valid_groups})
+        counts.append(len(valid_groups))
+
+    for side_index, side in enumerate(sides):
+        where = "{}: sides[{}]".format(source, side_index)
+        own, enemy = counts[side_index], counts[1 - side_index]
+        continuous = []
+        for event_index, event in enumerate(_require(side, 'continuous_events', list, where, [])):
+            event_where = "{}.continuous_events[{}]".format(where, event_index)
+            continuous.append({
+                'firer': _selection(event, 'firer', own, event_where),
+                'target': _selection(event, 'target', enemy, event_where),
+                'efficiency': _number(event, 'efficiency', event_where, minimum=0),
+                'start': _require(event, 'start', int, event_where),
+                'duration': _require(event, 'duration', int, event_where),
+            })
+        pulse = []
+        for event_index, event in enumerate(_require(side, 'pulse_events', list, where, [])):
+            event_where = "{}.pulse_events[{}]".format(where, event_index)
+            firer = _selection(event, 'firer', own, event_where)
+            weapon = _require(event, 'type', (int, str), event_where, 'all')
+            size = _require(event, 'size', (int, str, list), event_where, 'all')
+            size = tuple(size) if isinstance(size, list) else size
+            # The combinations of firer, weapon type and salvo size accepted by Side.pulse_fire()
+            if firer == weapon == size == 'all':
+                firers = ()
+            elif all(isinstance(value, int) for value in (firer, weapon, size)):
+                firers = (firer,)
+            elif (isinstance(firer, tuple) and isinstance(weapon, int) and isinstance(size, tuple) and
+                  len(size) == len(firer) and all(isinstance(value, int) for value in size)):
+                firers = firer
+            else:
+                raise ValueError("{}: 'firer', 'type' and 'size' must all be 'all', all be integers, or be a list "
+                                 "of groups, a weapon type and a matching list of salvo sizes".format(event_where))
+            for group in firers:
+                if weapon >= len(valid['sides'][side_index]['groups'][group]['pulse']):
+                    raise ValueError("{}: group {} has no pulse weapon of type {}".format(event_where, group, weapon))
+            pulse.append({
+                'firer': firer,
+                'target': _selection(event, 'target', enemy, event_where),
+                'type': weapon,
+                'size': size,
+                'efficiency': _number(event, 'efficiency', event_where, minimum=0),
+                'start': _require(event, 'start', int, event_where),
+                'tui': _require(event, 'tui', int, event_where),
+            })
+        valid['sides'][side_index]['continuous_events'] = continuous
+        valid['sides'][side_index]['pulse_events'] = pulse
+    return valid
+
+
+def _validate_salvo(scenario, source):
+    valid = {
+        'model': 'salvo',
+        'leakers': _require(scenario, 'leakers', bool, source, True),
+        'duration': _require(scenario, 'duration', int, source, 0),
+    }
+    for key in ('blu', 'red'):
+        where = "{}: {}".format(source, key)
+        group = _require(scenario, key, dict, where)
+        ship = _require(group, 'ship', dict, where)
+        missiles = _require(group, 'missiles', dict, where, {})
+        valid[key] = {
+            'side': _require(group, 'side', str, where, key.upper()),
+            'ship': {
+                'type': _require(ship, 'type', str, where + '.ship'),
+                'op': _number(ship, 'op', where + '.ship', minimum=0),
+                'dp': _number(ship, 'dp', where + '.ship', minimum=0),
+                'sp': _number(ship, 'sp', where + '.ship'),
+            },
+            'units': _require(group, 'units', int, where),
+            'scouting': _number(group, 'scouting', where, 1, 0, 1),
+            'readiness': _number(group, 'readiness', where, 1, 0, 1),
+            'missiles': {
+                'launch_reliability': _number(missiles, 'launch_reliability', where + '.missiles', 1, 0, 1),
+                'ascm_to_hit': _number(missiles, 'ascm_to_hit', where + '.missiles', 1, 0, 1),
+                'sam_to_hit': _number(missiles, 'sam_to_hit', where + '.missiles', 1, 0, 1),
+            },
+        }
+        if valid[key]['ship']['sp'] <= 0 or valid[key]['units'] < 1:
+            raise ValueError("{}: groups need at least one ship with positive staying power".format(where))
+    return valid
+
+
+def _validate_lanchester(scenario, source):
+    valid = {
+        'model': 'lanchester',
+        'name': _require(scenario, 'name', str, source, 'Battle'),
+        'duration': _number(scenario, 'duration', source, minimum=0),
+        'precision': _number(scenario, 'precision', source, -1),
+    }
+    for key in ('blue', 'red'):
+        where = "{}: {}".format(source, key)
+        side = _require(scenario, key, dict, where)
+        replacements = []
+        for replacement in _require(side, 'replacements', list, where, []):
+            if (not isinstance(replacement, list) or len(replacement) != 2 or
+                    not all(isinstance(value, (int, float)) for value in replacement)):
+                raise ValueError("{}: replacements must be [time, amount] pairs".format(where))
+            replacements.append(tuple(replacement))
+        valid[key] = {
+            'name': _require(side, 'name', str, where),
+            'strength': _number(side, 'strength', where, minimum=0),
+            'coefficient': _number(side, 'coefficient', where, minimum=0),
+            'replacements': replacements,
+        }
+    return valid
+
+
+VALIDATORS = {'beall': _validate_beall, 'salvo': _validate_salvo, 'lanchester': _validate_lanchester}
+
+
+# Building
+# ------------------------------------------------
+
+def build(scenario, **options):
+    """Build fresh battle objects from a validated scenario."""
+    return BUILDERS[scenario['model']](scenario, **options)
+
+
+def _build_beall(scenario, **options):
+    from beall.beall import Battle, Group, Side
+
+    sides = []
+    for side in scenario['sides']:
+        groups = []
+        for group in side['groups']:
+            groups.append(Group(group['name'], group['continuous'], group['staying']))
+            for power, number in group['pulse']:
+                groups[-1].add_pulse_weapon(power, number)
+        sides.append(Side(side['name'], groups))
+    for side, events in zip(sides, scenario['sides']):
+        for event in events['continuous_events']:
+            side.continuous_fire_event(event['firer'], event['target'], event['efficiency'],
+                                       event['start'], event['duration'])
+        for event in events['pulse_events']:
+            side.pulse_fire_event(event['firer'], event['target'], event['type'], event['size'],
+                                  event['efficiency'], event['start'], event['tui'])
+    return Battle(scenario['name'], sides[0], sides[1], **options)
+
+
+def _build_salvo(scenario, **options):
+    if scenario['leakers']:
+        from salvo import deterministicSalvo as model
+    else:
+        from salvo import deterministicSalvoNoLeakers as model
+
+    groups = []
+    for key in ('blu', 'red'):
+        group = scenario[key]
+        ship = model.Ship(group['ship']['type'], group['ship']['op'], group['ship']['dp'], group['ship']['sp'])
+        missiles = model.Missiles(group['missiles']['launch_reliability'], group['missiles']['ascm_to_hit'],
+                                  group['missiles']['sam_to_hit'])
+        groups.append(model.Group(group['side'], ship, group['units'], group['scouting'], group['readiness'],
+                                  missiles))
+    return model.Battle(groups[0], groups[1], scenario['duration'], **options)
+
+
+def _build_lanchester(scenario, **options):
+    from lanchester_with_reinforcements.lanchesterLogic import Battle, Side
+
+    blue, red = scenario['blue'], scenario['red']
+    return Battle(scenario['name'], Side(blue['name'], blue['strength'], blue['coefficient']),
+                  Side(red['name'], red['strength'], red['coefficient']), scenario['duration'],
+                  scenario['precision'], list(blue['replacements']) or None, list(red['replacements']) or None,
+                  **options)
+
+
+BUILDERS = {'beall': _build_beall, 'salvo': _build_salvo, 'lanchester': _build_lanchester}
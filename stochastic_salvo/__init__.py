@@ -0,0 +1,5 @@
+"""The stochastic version of Hughes' salvo combat model (Armstrong, 2005). See stochastic_salvo.py."""
+
+from .stochastic_salvo import (AttackSquadron, Carrier, FighterSquadron, Fleet, LossStatistics, P2Quantile,
+                               run_experiment, run_parallel_experiment, run_streaming_experiment,
+                               run_vectorized_experiment)
@@ -10,10 +10,14 @@ J. Armstrong and Michael B. Powell in 2005 to analyse the Battle of the Coral Se
 
 """
 
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 import copy
 import logging
-import matplotlib.pyplot as plt
+import math
+import numpy as np
 import random
+from statistics import NormalDist
 
 debug_log = logging.getLogger("Debug")
 logging.basicConfig(level=logging.WARNING)
@@ -92,11 +96,220 @@ class FighterSquadron:
 	def interception_damage(self):
 		return (self.mean_damage + self.damage_deviation * (2 * random.random() - 1))
 	
-def run_experiment(us_fleet, jp_fleet, iterations):
+class P2Quantile:
+	"""A streaming estimator of the (p) quantile, using the P-square algorithm
+	of Jain and Chlamtac (1985). Keeps five markers, whatever the number of
+	observations.
+	"""
+	def __init__(self, p):
+		self.p = p
+		self.heights = []
+		self.positions = [1, 2, 3, 4, 5]
+		self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+		self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+	def update(self, value):
+		if len(self.heights) < 5:
+			self.heights.append(value)
+			self.heights.sort()
+			return
+
+		heights = self.heights
+		positions = self.positions
+		# Find the cell the new observation falls into, adjusting the extremes.
+		if value < heights[0]:
+			heights[0] = value
+			cell = 0
+		elif value >= heights[4]:
+			heights[4] = value
+			cell = 3
+		else:
+			cell = next(i for i in range(4) if value < heights[i + 1])
+		for i in range(cell + 1, 5):
+			positions[i] += 1
+		for i in range(5):
+			self.desired[i] += self.increments[i]
+
+		# Adjust the three middle markers if they are off their desired positions.
+		for i in range(1, 4):
+			offset = self.desired[i] - positions[i]
+			if (offset >= 1 and positions[i + 1] - positions[i] > 1) or (offset <= -1 and positions[i - 1] - positions[i] < -1):
+				step = 1 if offset > 0 else -1
+				height = heights[i] + step / (positions[i + 1] - positions[i - 1]) * (
+					(positions[i] - positions[i - 1] + step) * (heights[i + 1] - heights[i]) / (positions[i + 1] - positions[i])
+					+ (positions[i + 1] - positions[i] - step) * (heights[i] - heights[i - 1]) / (positions[i] - positions[i - 1]))
+				if not heights[i - 1] < height < heights[i + 1]:
+					# Fall back to linear interpolation if the parabola overshoots.
+					height = heights[i] + step * (heights[i + step] - heights[i]) / (positions[i + step] - positions[i])
+				heights[i] = height
+				positions[i] += step
+
+	def update_batch(self, values):
+		"""Add an array of observations at once, moving the markers once per
+		batch instead of once per observation. The old observations are
+		represented by the piecewise linear CDF through the markers, the new
+		ones by their exact order statistics, and the markers are placed at
+		their desired ranks in the union of both.
+		"""
+		values = np.sort(np.asarray(values, dtype=float))
+		start = min(max(5 - len(self.heights), 0), len(values))
+		for value in values[:start].tolist():
+			self.update(value)
+		values = values[start:]
+		if len(values) == 0:
+			return
+
+		heights = np.asarray(self.heights)
+		positions = np.asarray(self.positions, dtype=float)
+		count = positions[4] + len(values)
+		# The ranks of the marker heights and the new observations in the union
+		candidates = np.concatenate((heights, values))
+		candidates.sort(kind="mergesort")
+		ranks = (np.interp(candidates, heights, positions, left=0, right=positions[4])
+			+ np.searchsorted(values, candidates, side="right"))
+		self.desired = [d + len(values) * increment for d, increment in zip(self.desired, self.increments)]
+		# Whole, strictly increasing positions strictly between the extremes
+		targets = np.rint(self.desired[1:4])
+		for i in range(3):
+			targets[i] = min(max(targets[i], targets[i - 1] + 1 if i else 2), count - 3 + i)
+		self.heights = [float(min(heights[0], values[0]))] + np.interp(targets, ranks, candidates).tolist() + [float(max(heights[4], values[-1]))]
+		self.positions = [1] + targets.tolist() + [float(count)]
+
+	def value(self):
+		"""Return the current estimate of the quantile."""
+		if len(self.heights) < 5:
+			if not self.heights:
+				return float("nan")
+			return self.heights[min(int(self.p * len(self.heights)), len(self.heights) - 1)]
+		return self.heights[2]
+
+class LossStatistics:
+	"""Streaming statistics of the losses of one fleet, in O(1) memory.
+
+	Keeps the running mean and variance (Welford), and optionally a histogram
+	with fixed bin edges, the probabilities of exceeding a set of loss
+	thresholds and P-square estimators for a set of quantiles.
+
+	ARGUMENTS:
+		- bins (sequence): histogram bin edges. Losses outside them are
+		counted in 'outside'.
+		- thresholds (sequence): losses whose exceedance probabilities, P(loss > threshold),
+		are tracked.
+		- quantiles (sequence): probabilities of the quantiles to estimate.
+		These are updated once per batch by update_batch, and cannot be merged.
+	"""
+	def __init__(self, bins=None, thresholds=(), quantiles=()):
+		self.count = 0
+		self.total = 0.0
+		self.m2 = 0.0
+		self.bins = None if bins is None else np.asarray(bins, dtype=float)
+		self.histogram = None if bins is None else np.zeros(len(self.bins) - 1, dtype=np.int64)
+		self.outside = 0
+		self.thresholds = np.asarray(thresholds, dtype=float)
+		self.exceeding = np.zeros(len(self.thresholds), dtype=np.int64)
+		self.quantile_estimators = [P2Quantile(p) for p in quantiles]
+
+	def update(self, loss):
+		"""Add a single observation."""
+		previous_mean = self.mean
+		self.count += 1
+		self.total += loss
+		self.m2 += (loss - previous_mean) * (loss - self.mean)
+		if self.bins is not None:
+			if self.bins[0] <= loss <= self.bins[-1]:
+				self.histogram[min(np.searchsorted(self.bins, loss, side="right") - 1, len(self.histogram) - 1)] += 1
+			else:
+				self.outside += 1
+		self.exceeding += loss > self.thresholds
+		for estimator in self.quantile_estimators:
+			estimator.update(loss)
+
+	def update_batch(self, losses):
+		"""Add an array of observations at once."""
+		losses = np.asarray(losses, dtype=float)
+		if len(losses) == 0:
+			return
+		batch_total = float(losses.sum())
+		self.combine(len(losses), batch_total, float(((losses - batch_total / len(losses)) ** 2).sum()))
+		if self.bins is not None:
+			counts, _ = np.histogram(losses, self.bins)
+			self.histogram += counts
+			self.outside += len(losses) - int(counts.sum())
+		self.exceeding += (losses[:, None] > self.thresholds).sum(axis=0)
+		for estimator in self.quantile_estimators:
+			estimator.update_batch(losses)
+
+	def combine(self, count, total, m2):
+		"""Fold in the count, sum and sum of squared deviations of another
+		set of observations (Chan et al.)."""
+		delta = total / count - self.mean
+		self.m2 += m2 + delta ** 2 * self.count * count / (self.count + count)
+		self.count += count
+		self.total += total
+
+	def merge(self, other):
+		"""Merge the statistics of another LossStatistics object with the same
+		bins and thresholds into this one."""
+		if self.quantile_estimators or other.quantile_estimators:
+			raise ValueError("P-square quantile estimators cannot be merged")
+		if other.count == 0:
+			return
+		self.combine(other.count, other.total, other.m2)
+		if self.bins is not None:
+			self.histogram += other.histogram
+			self.outside += other.outside
+		self.exceeding += other.exceeding
+
+	@property
+	def mean(self):
+		"""The mean of the losses observed so far."""
+		return self.total / self.count if self.count else 0.0
+
+	def variance(self):
+		"""Return the sample variance of the losses."""
+		return self.m2 / (self.count - 1) if self.count > 1 else float("nan")
+
+	def half_width(self, level=0.95):
+		"""Return the half-width of the normal confidence interval of the mean."""
+		if self.count < 2:
+			return float("inf")
+		z = NormalDist().inv_cdf(0.5 + level / 2)
+		return z * math.sqrt(self.variance() / self.count)
+
+	def confidence_interval(self, level=0.95):
+		"""Return the (lower, upper) confidence interval of the mean loss."""
+		half_width = self.half_width(level)
+		return self.mean - half_width, self.mean + half_width
+
+	def exceedance(self):
+		"""Return a {threshold: P(loss > threshold)} dict."""
+		if self.count == 0:
+			return {threshold: float("nan") for threshold in self.thresholds.tolist()}
+		return {threshold: count / self.count for threshold, count in zip(self.thresholds.tolist(), self.exceeding.tolist())}
+
+	def quantiles(self):
+		"""Return a {p: estimated quantile} dict."""
+		return {estimator.p: estimator.value() for estimator in self.quantile_estimators}
+
+def converged(statistics, tolerance, level=0.95):
+	"""Return True once the confidence interval half-widths of all the given
+	LossStatistics objects are within (tolerance)."""
+	return all(fleet_statistics.half_width(level) <= tolerance for fleet_statistics in statistics)
+
+def run_experiment(us_fleet, jp_fleet, iterations, statistics=None, tolerance=None, check_every=1000):
+	"""Run up to (iterations) replications of the exchange of strikes, and
+	return the average US and JP losses.
+
+	The losses of every replication are fed to a pair of LossStatistics
+	objects (us, jp), which can be passed in as (statistics) to collect
+	histograms, exceedance probabilities or quantiles. If a (tolerance) is
+	given, the experiment stops early once the 95% confidence interval
+	half-widths of both means are within it, checked every (check_every)
+	iterations.
+	"""
 	us_staying_power = sum(ship.staying_power for ship in us_fleet.ships)
 	jp_staying_power = sum(ship.staying_power for ship in jp_fleet.ships)
-	us_losses = []
-	jp_losses = []
+	us_statistics, jp_statistics = statistics if statistics else (LossStatistics(), LossStatistics())
 	for i in range(iterations):
 		us_fleet_instance = copy.deepcopy(us_fleet)
 		jp_fleet_instance = copy.deepcopy(jp_fleet)
@@ -107,28 +320,234 @@ def run_experiment(us_fleet, jp_fleet, iterations):
 		us_new_staying_power = sum(ship.staying_power for ship in us_fleet_instance.ships)
 		jp_new_staying_power = sum(ship.staying_power for ship in jp_fleet_instance.ships)
 		
-		us_losses.append(us_staying_power - us_new_staying_power)
-		jp_losses.append(jp_staying_power - jp_new_staying_power)
+		us_statistics.update(us_staying_power - us_new_staying_power)
+		jp_statistics.update(jp_staying_power - jp_new_staying_power)
 		
-	average_us_losses = sum(us_losses) / len(us_losses)
-	average_jp_losses = sum(jp_losses) / len(jp_losses)
+		if tolerance is not None and (i + 1) % check_every == 0 and converged((us_statistics, jp_statistics), tolerance):
+			break
 	
-	return average_us_losses, average_jp_losses
+	return us_statistics.mean, jp_statistics.mean
+
+def fleet_layout(fleet):
+	"""Flatten a Fleet into the arrays used by the vectorized engine.
+
+	Squadrons and ships are listed in the same order in which Fleet.attack,
+	Fleet.intercept and Fleet.damage_fleet visit them. Repeated references to
+	the same object (such as [AttackSquadron(0.5)] * 3) share a single slot,
+	so that damage to one entry is seen by all of them, as it is in the
+	object model.
+	"""
+	fighters = [squadron for ship in fleet.ships for squadron in ship.fighter_squadrons]
+	attackers = [squadron for ship in fleet.ships for squadron in ship.attack_squadrons]
+
+	def slots(objects):
+		index = {}
+		slot = []
+		staying = []
+		for item in objects:
+			if id(item) not in index:
+				index[id(item)] = len(staying)
+				staying.append(item.staying_power)
+			slot.append(index[id(item)])
+		return np.array(slot, dtype=np.intp), np.array(staying, dtype=float)
+
+	attack_slot, attack_staying = slots(attackers)
+	ship_slot, ship_staying = slots(fleet.ships)
+
+	return {
+		"intercept_probability": np.array([s.intercept_probability for s in fighters], dtype=float),
+		"mean_damage": np.array([s.mean_damage for s in fighters], dtype=float),
+		"damage_deviation": np.array([s.damage_deviation for s in fighters], dtype=float),
+		"attack_probability": np.array([s.attack_probability for s in attackers], dtype=float),
+		"attack_slot": attack_slot,
+		"attack_staying": attack_staying,
+		"ship_slot": ship_slot,
+		"ship_staying": ship_staying,
+		"staying_power": sum(ship.staying_power for ship in fleet.ships),
+	}
+
+def strike_damage(attacker, defender, iterations, rng):
+	"""Return the strike damage scored by one fleet layout against another in
+	each of (iterations) independent replications, following Fleet.attack.
+	"""
+	# Fighter interception: one roll and one damage deviate per squadron.
+	shape = (iterations, len(defender["intercept_probability"]))
+	intercept_rolls = rng.random(shape)
+	deviates = rng.random(shape)
+	intercepted = intercept_rolls < defender["intercept_probability"]
+	damage_done = defender["mean_damage"] + defender["damage_deviation"] * (2 * deviates - 1)
+	interceptor_damage = np.where(intercepted, damage_done, 0).sum(axis=1)
+
+	# Attack squadrons absorb interceptor damage in order before attacking.
+	attack_rolls = rng.random((iterations, len(attacker["attack_probability"])))
+	staying = np.tile(attacker["attack_staying"], (iterations, 1))
+	damage_scored = np.zeros(iterations)
+	for k, slot in enumerate(attacker["attack_slot"]):
+		attacks = attack_rolls[:, k] < attacker["attack_probability"][k]
+		damage_sustained = np.where(attacks, np.minimum(staying[:, slot], interceptor_damage), 0)
+		staying[:, slot] -= damage_sustained
+		interceptor_damage -= damage_sustained
+		damage_scored += attacks & (staying[:, slot] > 0)
+
+	return damage_scored
+
+def fleet_losses(fleet, damage):
+	"""Apply (damage) to a fleet layout as Fleet.damage_fleet does, and return
+	the staying power lost in each replication.
+	"""
+	damage = damage.copy()
+	staying = np.tile(fleet["ship_staying"], (len(damage), 1))
+	for slot in fleet["ship_slot"]:
+		active = damage > 0
+		damage_caused = np.where(active, np.minimum(staying[:, slot], damage), 0)
+		staying[:, slot] -= damage_caused
+		damage = np.where(active, damage - np.minimum(damage_caused, damage), damage)
+
+	return fleet["staying_power"] - staying[:, fleet["ship_slot"]].sum(axis=1)
+
+def simulate_losses(us_fleet, jp_fleet, iterations, rng):
+	"""Run (iterations) replications of the exchange of strikes in one batch.
+
+	ARGUMENTS:
+		- us_fleet, jp_fleet (Fleet or the dict returned by fleet_layout).
+		- iterations (int): the number of replications.
+		- rng (numpy.random.Generator): the source of random numbers.
+
+	RETURNS:
+		- A tuple of two arrays of shape (iterations,) with the US and JP
+		staying power losses of each replication.
+	"""
+	us_layout = us_fleet if isinstance(us_fleet, dict) else fleet_layout(us_fleet)
+	jp_layout = jp_fleet if isinstance(jp_fleet, dict) else fleet_layout(jp_fleet)
+
+	jp_damage = strike_damage(us_layout, jp_layout, iterations, rng)
+	us_damage = strike_damage(jp_layout, us_layout, iterations, rng)
+
+	return fleet_losses(us_layout, us_damage), fleet_losses(jp_layout, jp_damage)
+
+def run_vectorized_experiment(us_fleet, jp_fleet, iterations, seed=None, chunk_size=1000000):
+	"""A batched equivalent of run_experiment. No Fleet objects are copied:
+	every roll is drawn as a NumPy array, (chunk_size) replications at a time.
+
+	RETURNS:
+		- The average US and JP losses, followed by the arrays holding the
+		losses of every replication.
+	"""
+	rng = np.random.default_rng(seed)
+	us_layout = fleet_layout(us_fleet)
+	jp_layout = fleet_layout(jp_fleet)
+	us_losses = np.empty(iterations)
+	jp_losses = np.empty(iterations)
+	for start in range(0, iterations, chunk_size):
+		stop = min(start + chunk_size, iterations)
+		us_losses[start:stop], jp_losses[start:stop] = simulate_losses(us_layout, jp_layout, stop - start, rng)
+
+	return float(us_losses.mean()), float(jp_losses.mean()), us_losses, jp_losses
+
+def run_streaming_experiment(us_fleet, jp_fleet, iterations, seed=None, chunk_size=100000, statistics=None, tolerance=None):
+	"""Run the vectorized engine (chunk_size) replications at a time, feeding
+	the losses to a pair of LossStatistics objects instead of keeping them.
+	Memory use does not grow with (iterations). If a (tolerance) is given,
+	stops after the first chunk at which both 95% confidence interval
+	half-widths are within it.
+
+	RETURNS:
+		- The US and JP LossStatistics objects.
+	"""
+	rng = np.random.default_rng(seed)
+	us_layout = fleet_layout(us_fleet)
+	jp_layout = fleet_layout(jp_fleet)
+	us_statistics, jp_statistics = statistics if statistics else (LossStatistics(), LossStatistics())
+	for start in range(0, iterations, chunk_size):
+		us_losses, jp_losses = simulate_losses(us_layout, jp_layout, min(chunk_size, iterations - start), rng)
+		us_statistics.update_batch(us_losses)
+		jp_statistics.update_batch(jp_losses)
+		if tolerance is not None and converged((us_statistics, jp_statistics), tolerance):
+			break
+
+	return us_statistics, jp_statistics
+
+def loss_tally(losses):
+	"""Return a {loss: count} dict of the losses in an array, sorted by loss."""
+	values, counts = np.unique(losses, return_counts=True)
+	return dict(zip(values.tolist(), counts.tolist()))
+
+def run_shard(us_layout, jp_layout, iterations, seed_sequence, chunk_size=1000000):
+	"""Run one shard of a parallel experiment with its own random stream, and
+	return the US and JP loss tallies.
+	"""
+	rng = np.random.default_rng(seed_sequence)
+	us_tally = Counter()
+	jp_tally = Counter()
+	for start in range(0, iterations, chunk_size):
+		us_losses, jp_losses = simulate_losses(us_layout, jp_layout, min(chunk_size, iterations - start), rng)
+		us_tally.update(loss_tally(us_losses))
+		jp_tally.update(loss_tally(jp_losses))
+
+	return us_tally, jp_tally
+
+def tally_mean(tally):
+	"""Return the mean loss of a {loss: count} tally."""
+	return sum(loss * count for loss, count in sorted(tally.items())) / sum(tally.values())
+
+def run_parallel_experiment(us_fleet, jp_fleet, iterations, seed, workers=None, shard_size=1000000):
+	"""Run the experiment across a pool of worker processes.
+
+	The iterations are split into shards of (shard_size). Each shard draws
+	from its own stream, spawned from numpy.random.SeedSequence(seed) by shard
+	index, and the shard tallies are merged in shard order. The results for a
+	given seed and shard size are therefore identical whatever the number of
+	workers.
+
+	ARGUMENTS:
+		- us_fleet, jp_fleet (Fleet objects).
+		- iterations (int): the total number of replications.
+		- seed (int): the master seed of the experiment.
+		- workers (int): the number of processes. Defaults to the CPU count;
+		1 runs every shard in the current process.
+		- shard_size (int): the number of iterations per shard.
+
+	RETURNS:
+		- The average US and JP losses, followed by the {loss: count} tallies
+		of both fleets.
+	"""
+	us_layout = fleet_layout(us_fleet)
+	jp_layout = fleet_layout(jp_fleet)
+	shards = [min(shard_size, iterations - start) for start in range(0, iterations, shard_size)]
+	seeds = np.random.SeedSequence(seed).spawn(len(shards))
+	arguments = ([us_layout] * len(shards), [jp_layout] * len(shards), shards, seeds)
+
+	if workers == 1:
+		results = list(map(run_shard, *arguments))
+	else:
+		with ProcessPoolExecutor(max_workers=workers) as executor:
+			results = list(executor.map(run_shard, *arguments))
+
+	us_tally = Counter()
+	jp_tally = Counter()
+	for us_shard, jp_shard in results:
+		us_tally.update(us_shard)
+		jp_tally.update(jp_shard)
+	us_tally = dict(sorted(us_tally.items()))
+	jp_tally = dict(sorted(jp_tally.items()))
+
+	return tally_mean(us_tally), tally_mean(jp_tally), us_tally, jp_tally
 
-us_f_squadron = [FighterSquadron(0.2857, 1, 0.3333)]
-us_attack_squadrons = [AttackSquadron(0.4762)] * 3
+if __name__ == "__main__":
+	us_f_squadron = [FighterSquadron(0.2857, 1, 0.3333)]
+	us_attack_squadrons = [AttackSquadron(0.4762)] * 3
 
-jp_f_squadron = [FighterSquadron(0.4286, 1, 0.3333)]
-jp_attack_squadrons = [AttackSquadron(0.6429)] * 2
+	jp_f_squadron = [FighterSquadron(0.4286, 1, 0.3333)]
+	jp_attack_squadrons = [AttackSquadron(0.6429)] * 2
 
-us_carrier = Carrier(us_attack_squadrons, us_f_squadron)
+	us_carrier = Carrier(us_attack_squadrons, us_f_squadron)
 
-jp_carrier = Carrier(jp_attack_squadrons, jp_f_squadron)
+	jp_carrier = Carrier(jp_attack_squadrons, jp_f_squadron)
 
-us_fleet = Fleet("US Fleet", [us_carrier] * 2)
+	us_fleet = Fleet("US Fleet", [us_carrier] * 2)
 
-jp_fleet = Fleet("JP Fleet", [jp_carrier] * 2)
+	jp_fleet = Fleet("JP Fleet", [jp_carrier] * 2)
 
-experiment_results = run_experiment(us_fleet, jp_fleet, 1000)
+	experiment_results = run_experiment(us_fleet, jp_fleet, 1000)
 
-print(experiment_results)
+	print(experiment_results)
@@ -0,0 +1,3 @@
+"""Kress' suicide bombing model. See sbombing.py."""
+
+from .sbombing import Area, ArrayArea, Target, density_sweep, load_sweep, plot_sweep, save_sweep
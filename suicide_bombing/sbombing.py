@@ -1,6 +1,8 @@
 #!/usr/bin/python
 
-import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import bisect
 import random
 import math
 
@@ -79,6 +81,39 @@ class Target:
 	def mark_as_hit(self):
 		self.hit = True
 			
+class TargetArrays:
+	"""
+	A sequence of Targets stored column by column in contiguous NumPy arrays,
+	as used by ArrayArea. Indexing or iterating returns Target objects built
+	from the arrays; these are copies, so marking them as hit has no effect.
+	
+	x, y, radius, angle, distance (arrays of floats): as in Target.
+	lower, higher (arrays of floats): the tangent angles given by get_arc().
+	hit (array of booleans): whether each target has been hit.
+	"""
+	
+	def __init__(self, targets):
+		self.x = np.array([target.x for target in targets], dtype=float)
+		self.y = np.array([target.y for target in targets], dtype=float)
+		self.radius = np.array([target.radius for target in targets], dtype=float)
+		self.angle = np.array([target.angle for target in targets], dtype=float)
+		self.distance = np.array([target.distance for target in targets], dtype=float)
+		tangentDelta = np.degrees(np.arcsin(self.radius / self.distance))
+		self.lower = self.angle - tangentDelta
+		self.higher = self.angle + tangentDelta
+		self.hit = np.array([target.hit for target in targets], dtype=bool)
+		
+	def __len__(self):
+		return len(self.x)
+		
+	def __getitem__(self, index):
+		target = Target(float(self.x[index]), float(self.y[index]), float(self.radius[index]))
+		target.hit = bool(self.hit[index])
+		return target
+		
+	def __iter__(self):
+		return (self[i] for i in range(len(self)))
+		
 class Area:
 	"""
 	An area (x * y) to be populated by Targets randomly.
@@ -90,6 +125,14 @@ class Area:
 	- targets (list): a list of all Targets in the area.
 	- overkill (int): number of fragments wasted hitting Targets that had
 	already been hit. Value 0 at init.
+	- grid (dict): the placed Targets, indexed by (column, row) cells of
+	side cellSize (minimumDistance + 2 * targetSize), so that a proposed
+	Target only needs checking against its neighbouring cells.
+	- segmentStarts, segmentOwners (lists): the angular segments visible from
+	the origin, and the index of the Target owning each one (-1 for none).
+	Built by build_visibility() after populating, and rebuilt when needed.
+	- random: the source of random numbers. The random module by default;
+	set it to a random.Random instance to leave the global state untouched.
 	"""
 	def __init__(self, x, y, minimumDistance, targetSize = 1):
 		self.x = x
@@ -98,6 +141,50 @@ class Area:
 		self.minimumDistance = minimumDistance
 		self.targets = []
 		self.overkill = 0
+		# Spatial grid of placed Targets. Two Targets closer than one cell
+		# size are always in the same or in adjacent cells.
+		self.cellSize = minimumDistance + targetSize * 2
+		self.grid = {}
+		# Reserve the middle spot for the origin of the blast.
+		self.origin = Target(0, 0, targetSize)
+		# Visible angular segments, built by build_visibility().
+		self.segmentStarts = [0]
+		self.segmentOwners = [-1]
+		self.visibilityBuilt = True
+		# Source of random numbers for placement and fragments.
+		self.random = random
+
+	def grid_cell(self, x, y):
+		"""Return the (column, row) index of the grid cell containing (x, y)."""
+		return (int(math.floor(x / self.cellSize)), int(math.floor(y / self.cellSize)))
+
+	def neighbours(self, target):
+		"""Return the Targets in the grid cell of a Target and in the eight
+		cells around it. These are the only ones that can be too close to it.
+		"""
+		column, row = self.grid_cell(target.x, target.y)
+		nearby = []
+		for i in (column - 1, column, column + 1):
+			for j in (row - 1, row, row + 1):
+				nearby.extend(self.grid.get((i, j), ()))
+		return nearby
+
+	def is_legal(self, target):
+		"""Return True if a Target can be placed without landing too close to
+		another, or to the origin of the blast.
+		"""
+		if target.is_too_close(self.origin, self.minimumDistance):
+			return False
+		for other in self.neighbours(target):
+			if target.is_too_close(other, self.minimumDistance):
+				return False
+		return True
+
+	def place_target(self, target):
+		"""Add a Target to the area and to the spatial grid."""
+		self.targets.append(target)
+		self.grid.setdefault(self.grid_cell(target.x, target.y), []).append(target)
+		self.visibilityBuilt = False
 
 	def add_random_target(self):
 		"""Attempt to add one random target to the area.
@@ -107,29 +194,31 @@ class Area:
 			illegal distance from another Target). False otherwise.
 		"""
 		# Propose a Target location at random inside the area.
-		attempted_x = random.uniform(-self.x//2, self.x//2)
-		attempted_y = random.uniform(-self.y//2, self.y//2)
+		attempted_x = self.random.uniform(-self.x//2, self.x//2)
+		attempted_y = self.random.uniform(-self.y//2, self.y//2)
 		attempted_target = Target(attempted_x, attempted_y, self.targetSize)
-		# Check distance of this proposed Target to all other Targets.
-		for target in self.targets:
-			# Return 'False' if the attempted Target is too close to another.
-			if attempted_target.is_too_close(target, self.minimumDistance):
-				return False
-			# Reserve the middle spot for the origin of the blast.
-			if attempted_target.is_too_close(Target(0,0,self.targetSize), self.minimumDistance):
-				return False
+		# Check the proposed Target against the neighbouring grid cells only.
+		if not self.is_legal(attempted_target):
+			return False
 		# Add the Target to the area if it is not too close to any other.
-		self.targets.append(attempted_target)
+		self.place_target(attempted_target)
 		return True
 		
-	def populate(self, targets):
+	def percent_covered(self):
+		"""Return the percentage of the area covered by Targets."""
+		targetArea = (self.targetSize**2 * math.pi) * len(self.targets)
+		return (targetArea / (self.x * self.y)) * 100
+
+	def populate(self, targets, verbose = True):
 		"""
 		Attempt to add (targets) amount of targets to the area.
 		
 		ARGUMENTS:
 			- targets (int): the number of targets to attempt to place.
+			- verbose (bool): whether to print placement progress.
 		"""
-		print("Attempting to place {} targets".format(targets))
+		if verbose:
+			print("Attempting to place {} targets".format(targets))
 		failed = 0
 		for _ in range(targets):
 			# Attempt to place one target.
@@ -138,19 +227,80 @@ class Area:
 			if attempt == False:
 				failed += 1
 		
-		# Print how many Targets failed placement.
-		print("Failed to place {} targets".format(failed))
-		# Calculate and print the percentage of the area covered by Targets.
-		targetArea = (self.targetSize**2 * math.pi) * len(self.targets)
-		percentCovered = (targetArea / (self.x * self.y)) * 100
-		print("Percent covered: {}".format(percentCovered))
-		# Sort all targets by proximity to the centre (0, 0).
-		print("Sorting targets by proximity to the centre")
+		if verbose:
+			# Print how many Targets failed placement.
+			print("Failed to place {} targets".format(failed))
+			# Calculate and print the percentage of the area covered by Targets.
+			print("Percent covered: {}".format(self.percent_covered()))
+			# Sort all targets by proximity to the centre (0, 0).
+			print("Sorting targets by proximity to the centre")
 		self.targets.sort(key=lambda x: x.distance)
-		print("Sorted!")
+		if verbose:
+			print("Sorted!")
+		self.build_visibility()
+
+	def populate_poisson(self, density = None, attempts = 30, verbose = True):
+		"""
+		Fill the area with Poisson-disk sampling (Bridson, 2007). Targets are
+		grown outwards from a random seed, each new one at a distance between
+		one and two cell sizes from an existing one, until no more fit.
+
+		ARGUMENTS:
+			- density (float): the percentage of the area to cover. If given,
+			a random subset of the Targets is kept. If None, the area is
+			filled as densely as the sampler allows.
+			- attempts (int): the number of proposals around each Target
+			before it is considered surrounded.
+			- verbose (bool): whether to print the result.
+		"""
+		halfX, halfY = self.x//2, self.y//2
+		# Find a legal seed to grow the sample from.
+		for _ in range(attempts):
+			seed = Target(self.random.uniform(-halfX, halfX), self.random.uniform(-halfY, halfY), self.targetSize)
+			if self.is_legal(seed):
+				self.place_target(seed)
+				break
+		active = list(self.targets)
+		while active:
+			index = self.random.randrange(len(active))
+			centre = active[index]
+			for _ in range(attempts):
+				# Propose a Target in the annulus around the active one.
+				angle = self.random.uniform(0, 2 * math.pi)
+				distance = self.random.uniform(self.cellSize, 2 * self.cellSize)
+				attempted_x = centre.x + distance * math.cos(angle)
+				attempted_y = centre.y + distance * math.sin(angle)
+				if not (-halfX <= attempted_x <= halfX and -halfY <= attempted_y <= halfY):
+					continue
+				attempted_target = Target(attempted_x, attempted_y, self.targetSize)
+				if self.is_legal(attempted_target):
+					self.place_target(attempted_target)
+					active.append(attempted_target)
+					break
+			else:
+				# No room left around this Target: retire it.
+				active[index] = active[-1]
+				active.pop()
+
+		if density is not None:
+			# Thin the sample down to the requested density.
+			wanted = int(density / 100 * self.x * self.y / (self.targetSize**2 * math.pi))
+			if wanted < len(self.targets):
+				kept = self.random.sample(self.targets, wanted)
+				self.targets = []
+				self.grid = {}
+				for target in kept:
+					self.place_target(target)
+
+		if verbose:
+			print("Placed {} targets".format(len(self.targets)))
+			print("Percent covered: {}".format(self.percent_covered()))
+		self.targets.sort(key=lambda x: x.distance)
+		self.build_visibility()
 		
 	def plot(self):
 		"""The area goes plot itself."""
+		import matplotlib.pyplot as plt
 		# Find the (x, y) coordinates of all intact Targets.
 		x = [target.x for target in self.targets if not target.is_hit()]
 		y = [target.y for target in self.targets if not target.is_hit()]
@@ -167,6 +317,66 @@ class Area:
 			plt.plot((0, i), (0, j), c="orange", linestyle=":")
 		plt.show()
 
+	def target_geometry(self):
+		"""Return the distances of all Targets from the origin, and their arcs."""
+		return [target.distance for target in self.targets], [target.get_arc() for target in self.targets]
+
+	def build_visibility(self):
+		"""
+		Preprocess the targets into the sequence of angular segments visible
+		from the origin (0, 0). Each segment is owned by the nearest Target
+		whose arc covers it, or by none (-1) if fragments in that bearing
+		leave the area. Arcs crossing 0/360 degrees are split in two.
+
+		Targets are painted onto the elementary segments between all arc
+		endpoints in increasing order of distance, skipping segments already
+		painted by a nearer Target, so every segment is painted only once.
+		"""
+		distances, tangents = self.target_geometry()
+		order = sorted(range(len(distances)), key=lambda i: distances[i])
+		arcs = []
+		for index in order:
+			lower, higher = tangents[index]
+			if lower < 0:
+				arcs.append((lower + 360, 360, index))
+				arcs.append((0, higher, index))
+			elif higher > 360:
+				arcs.append((lower, 360, index))
+				arcs.append((0, higher - 360, index))
+			else:
+				arcs.append((lower, higher, index))
+
+		bounds = sorted(set([0, 360] + [arc[0] for arc in arcs] + [arc[1] for arc in arcs]))
+		position = {bound: i for i, bound in enumerate(bounds)}
+		owners = [-1] * (len(bounds) - 1)
+		# nextFree[i] leads to the first unpainted segment from i onwards.
+		nextFree = list(range(len(bounds)))
+
+		def find(i):
+			root = i
+			while nextFree[root] != root:
+				root = nextFree[root]
+			while nextFree[i] != root:
+				nextFree[i], i = root, nextFree[i]
+			return root
+
+		for lower, higher, index in arcs:
+			i = find(position[lower])
+			stop = position[higher]
+			while i < stop:
+				owners[i] = index
+				nextFree[i] = i + 1
+				i = find(i + 1)
+
+		# Merge consecutive segments with the same owner.
+		self.segmentStarts = []
+		self.segmentOwners = []
+		for start, owner in zip(bounds, owners):
+			if not self.segmentOwners or self.segmentOwners[-1] != owner:
+				self.segmentStarts.append(start)
+				self.segmentOwners.append(owner)
+		self.visibilityBuilt = True
+
 	def check_LOS(self, angle):
 		"""
 		Check whether a Target would be hit by a fragment travelling down a
@@ -181,19 +391,21 @@ class Area:
 			- True (and hence stops execution) if a Target is hit.
 		"""
 		
-		# Iterate over all targets in increasing order of distance from (0, 0).
-		for target in self.targets:
-			lower, higher = target.get_arc()[0], target.get_arc()[1]
-			# Check whether the fragment angle lies between the tangents.
-			if lower <= angle <= higher:
-				# Mark the target as hit if it had not been hit before.
-				if not target.is_hit():
-					target.mark_as_hit()
-				# Otherwise, add 1 to the "overkill" counter.
-				else:
-					self.overkill += 1
-				# Stop execution if a target has been hit.
-				return True
+		if not self.visibilityBuilt:
+			self.build_visibility()
+		# Find the visible segment the fragment travels through.
+		segment = bisect.bisect_right(self.segmentStarts, angle) - 1
+		owner = self.segmentOwners[segment]
+		if owner >= 0:
+			target = self.targets[owner]
+			# Mark the target as hit if it had not been hit before.
+			if not target.is_hit():
+				target.mark_as_hit()
+			# Otherwise, add 1 to the "overkill" counter.
+			else:
+				self.overkill += 1
+			return True
+
 				
 	def explosion(self, fragments):
 		"""
@@ -205,19 +417,223 @@ class Area:
 		ARGUMENTS
 		– fragments (int): the number of fragments to generate.
 		"""
-		fragmentDirections = [random.uniform(0, 360) for _ in range(fragments)]
+		fragmentDirections = [self.random.uniform(0, 360) for _ in range(fragments)]
 		for fragment in fragmentDirections:
 			self.check_LOS(fragment)
 			
 	def get_kills(self):
 		return sum(1 for target in self.targets if target.is_hit())
+		
+	def reset(self):
+		"""Clear all hits and the overkill counter, keeping the Targets in place."""
+		for target in self.targets:
+			target.hit = False
+		self.overkill = 0
 
+class ArrayArea(Area):
+	"""
+	An Area whose Targets, once placed, live in a TargetArrays object, and
+	whose explosions are resolved in a single batch: all fragment bearings
+	are drawn at once and matched to the visible segments with searchsorted.
+	get_kills(), overkill and plot() work as in Area.
+	
+	- seed (int): seed for the NumPy generator drawing fragment bearings.
+	"""
+	def __init__(self, x, y, minimumDistance, targetSize = 1, seed = None):
+		super().__init__(x, y, minimumDistance, targetSize)
+		self.rng = np.random.default_rng(seed)
+		# The Targets are packed into arrays by build_visibility().
+		self.visibilityBuilt = False
+		
+	def unpack_targets(self):
+		"""Go back to a list of Targets if the area had already been packed
+		into arrays, so that more can be placed."""
+		if isinstance(self.targets, TargetArrays):
+			self.targets = list(self.targets)
+			self.visibilityBuilt = False
+			
+	def place_target(self, target):
+		"""Add a Target to the area, unpacking the arrays first if needed."""
+		self.unpack_targets()
+		super().place_target(target)
+		
+	def populate(self, targets, verbose = True):
+		self.unpack_targets()
+		super().populate(targets, verbose)
+		
+	def populate_poisson(self, density = None, attempts = 30, verbose = True):
+		self.unpack_targets()
+		super().populate_poisson(density, attempts, verbose)
+		
+	def target_geometry(self):
+		return self.targets.distance.tolist(), list(zip(self.targets.lower.tolist(), self.targets.higher.tolist()))
+		
+	def build_visibility(self):
+		"""Pack the Targets into arrays, and build the visible segment table
+		as NumPy arrays."""
+		if not isinstance(self.targets, TargetArrays):
+			self.targets = TargetArrays(self.targets)
+		super().build_visibility()
+		self.segmentStarts = np.array(self.segmentStarts, dtype=float)
+		self.segmentOwners = np.array(self.segmentOwners, dtype=np.intp)
+		
+	def first_hits(self, angles):
+		"""Return the index of the Target first hit along each of an array of
+		angles, or -1 where the fragment leaves the area."""
+		if not self.visibilityBuilt:
+			self.build_visibility()
+		segments = np.searchsorted(self.segmentStarts, angles, side="right") - 1
+		return self.segmentOwners[segments]
+		
+	def register_hits(self, owners):
+		"""Mark the Targets in an array of hit indices as hit, and add the
+		fragments wasted on Targets already hit to the overkill counter."""
+		owners = owners[owners >= 0]
+		hits = np.bincount(owners, minlength=len(self.targets)) > 0
+		newlyHit = hits & ~self.targets.hit
+		self.overkill += int(len(owners) - newlyHit.sum())
+		self.targets.hit |= hits
+		
+	def check_LOS(self, angle):
+		owner = self.first_hits(np.array([angle]))
+		self.register_hits(owner)
+		if owner[0] >= 0:
+			return True
+			
+	def explosion(self, fragments):
+		"""
+		Create an explosion with a given number of fragments, resolving all
+		of them at once.
+		
+		ARGUMENTS
+		– fragments (int): the number of fragments to generate.
+		"""
+		self.register_hits(self.first_hits(self.rng.uniform(0, 360, fragments)))
+		
+	def get_kills(self):
+		if not self.visibilityBuilt:
+			self.build_visibility()
+		return int(self.targets.hit.sum())
+		
+	def reset(self):
+		if isinstance(self.targets, TargetArrays):
+			self.targets.hit[:] = False
+			self.overkill = 0
+		else:
+			super().reset()
+		
 
+# Columns of the table returned by density_sweep().
+SWEEP_FIELDS = [("targets", int), ("minimumDistance", float), ("targetSize", float),
+				("fragments", int), ("replications", int), ("placed", float),
+				("covered", float), ("kills", float), ("killsStd", float),
+				("overkill", float), ("overkillStd", float)]
 
-area = Area(200, 200, 1, 1)
-area.populate(300)
-area.explosion(200)
-print(area.get_kills())
+def sweep_point(x, y, targets, minimumDistance, targetSize, fragments, replications, seedSequence):
+	"""
+	Run (replications) independent arenas for one point of a density sweep.
+	Each arena is populated once and then exploded once for every fragment
+	count, clearing the hits in between. Every fragment count thus gets an
+	unbiased estimate from independent explosions, while the arenas shared
+	across fragment counts make comparisons between them less noisy.
+	
+	RETURNS:
+		- A list of SWEEP_FIELDS tuples, one per fragment count.
+	"""
+	kills = np.zeros((replications, len(fragments)))
+	overkill = np.zeros((replications, len(fragments)))
+	placed = np.zeros(replications)
+	covered = np.zeros(replications)
+	for replication, child in enumerate(seedSequence.spawn(replications)):
+		# Independent streams for target placement (random.Random) and fragments
+		placeSeed, fragmentSeed = child.spawn(2)
+		area = ArrayArea(x, y, minimumDistance, targetSize, seed=fragmentSeed)
+		area.random = random.Random(int(placeSeed.generate_state(1)[0]))
+		area.populate(targets, verbose=False)
+		placed[replication] = len(area.targets)
+		covered[replication] = area.percent_covered()
+		for column, fragmentCount in enumerate(fragments):
+			area.reset()
+			area.explosion(fragmentCount)
+			kills[replication, column] = area.get_kills()
+			overkill[replication, column] = area.overkill
+	
+	ddof = 1 if replications > 1 else 0
+	killsStd = kills.std(axis=0, ddof=ddof)
+	overkillStd = overkill.std(axis=0, ddof=ddof)
+	return [(targets, minimumDistance, targetSize, fragmentCount, replications, placed.mean(),
+			 covered.mean(), kills[:, column].mean(), killsStd[column],
+			 overkill[:, column].mean(), overkillStd[column])
+			for column, fragmentCount in enumerate(fragments)]
+	
+def density_sweep(targets, minimumDistances, targetSizes, fragments, replications, x = 200, y = 200, seed = None, workers = None):
+	"""
+	Run the model repeatedly over a grid of crowd densities.
+	
+	Every combination of (targets, minimumDistances, targetSizes) is a grid
+	point, run as one task on a process pool, with its own random stream
+	spawned from numpy.random.SeedSequence(seed). Results do not depend on
+	the number of workers.
+	
+	ARGUMENTS:
+		- targets, minimumDistances, targetSizes (sequences): the values of
+		Area.populate(targets) and of the Area arguments to sweep over.
+		- fragments (sequence of ints): the fragment counts to explode in
+		every arena.
+		- replications (int): the number of arenas per grid point.
+		- x, y (int): the arena dimensions.
+		- seed (int): the master seed.
+		- workers (int): the number of processes. 1 runs in this process.
+		
+	RETURNS:
+		- A NumPy structured array with SWEEP_FIELDS columns, one row per grid
+		point and fragment count. Kills and overkill are replication means,
+		with their standard deviations.
+	"""
+	grid = [(t, d, s) for t in targets for d in minimumDistances for s in targetSizes]
+	seeds = np.random.SeedSequence(seed).spawn(len(grid))
+	arguments = [(x, y, t, d, s, list(fragments), replications, child) for (t, d, s), child in zip(grid, seeds)]
+	if workers == 1:
+		rows = [sweep_point(*argument) for argument in arguments]
+	else:
+		with ProcessPoolExecutor(max_workers=workers) as executor:
+			rows = list(executor.map(sweep_point, *zip(*arguments)))
+	
+	return np.array([row for point in rows for row in point], dtype=SWEEP_FIELDS)
+	
+def save_sweep(results, path):
+	"""Save a density sweep table to a .npz file, or to CSV otherwise."""
+	if str(path).endswith(".npz"):
+		np.savez_compressed(path, results=results)
+	else:
+		formats = ["%d" if kind is int else "%.6g" for _, kind in SWEEP_FIELDS]
+		np.savetxt(path, results, fmt=formats, delimiter=",", header=",".join(results.dtype.names), comments="")
+		
+def load_sweep(path):
+	"""Load a density sweep table saved by save_sweep()."""
+	if str(path).endswith(".npz"):
+		with np.load(path) as data:
+			return data["results"]
+	return np.genfromtxt(path, delimiter=",", names=True, dtype=SWEEP_FIELDS)
+	
+def plot_sweep(results):
+	"""Plot the mean number of casualties as a function of the percentage of
+	the arena covered, one line per fragment count."""
+	import matplotlib.pyplot as plt
+	for fragmentCount in np.unique(results["fragments"]):
+		rows = np.sort(results[results["fragments"] == fragmentCount], order="covered")
+		plt.errorbar(rows["covered"], rows["kills"], yerr=rows["killsStd"], marker="o", capsize=3,
+					 label="{} fragments".format(fragmentCount))
+	plt.xlabel("Percent covered")
+	plt.ylabel("Casualties")
+	plt.legend()
+	plt.show()
+	
+if __name__ == "__main__":
+	area = Area(200, 200, 1, 1)
+	area.populate(300)
+	area.explosion(200)
+	print(area.get_kills())
 
-area.plot()
-print(area.overkill)
\ No newline at end of file
+	area.plot()
+	print(area.overkill)